@@ -0,0 +1,96 @@
+"""Compares evaluating deep plans on the explicit stack of IterativeEvaluator
+against plain recursion through Plan.evaluate -- which can only reach the same
+depth with the recursion limit, and the stack of the thread it runs in, raised.
+Each evaluator runs on chains of nested Steps of increasing depth, both ways.
+
+    python -m benchmarks.bench_deep
+"""
+
+import sys
+import threading
+import time
+from random import Random
+from typing import Callable, Dict, List
+
+from plans.plan import Plan, Action, Steps, IterativeEvaluator
+from plans.context import Context
+from plans.evaluations.success import SuccessEvaluator
+from plans.evaluations.outcomes import OutcomeSampler
+from plans.evaluations.histories import HistorySampler
+from plans.evaluations.serialization import DictTranslator
+
+DEPTHS = (1000, 10000, 100000)
+
+# the evaluators compared, each made fresh for every run
+EVALUATORS: Dict[str, Callable[[], IterativeEvaluator]] = {
+    'success_probability': SuccessEvaluator,
+    'sample_outcome': lambda: OutcomeSampler(Random(0)),
+    'sample_history': lambda: HistorySampler(rand=Random(0)),
+    'to_dict': DictTranslator,
+}
+
+def deep_chain(depth: int) -> Plan:
+    p = Action("leaf", success_prob=0.99, duration=1)
+    for i in range(depth):
+        p = Steps(f"s{i}", p, Action("x", success_prob=0.99, duration=1))
+    return p
+
+def time_evaluation(make: Callable[[], IterativeEvaluator], plan: Plan, recursive: bool, repeat: int = 3) -> float:
+    """The fastest of 'repeat' evaluations of plan, in seconds"""
+    best = None
+    for _ in range(repeat):
+        evaluator = make()
+        if recursive:
+            evaluator.max_recursion_depth = sys.maxsize
+        start = time.perf_counter()
+        evaluator.evaluate_plan(plan, Context())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def time_recursively(make: Callable[[], IterativeEvaluator], plan: Plan, depth: int) -> float:
+    """time_evaluation by recursion, in a thread with room for it"""
+    result: List = []
+    def run():
+        try:
+            result.append(time_evaluation(make, plan, True))
+        except RecursionError as e:
+            result.append(e)
+    limit, stack_size = sys.getrecursionlimit(), threading.stack_size()
+    # each level of the chain takes a few Python frames
+    sys.setrecursionlimit(max(limit, 8 * depth + 1000))
+    threading.stack_size(1 << 30)
+    try:
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+    finally:
+        threading.stack_size(stack_size)
+        sys.setrecursionlimit(limit)
+    return result[0]
+
+def compare(depths=DEPTHS, evaluators: List[str] = None) -> Dict[str, Dict]:
+    """Seconds per evaluation on the explicit stack and by recursion, for each
+    evaluator and depth; a RecursionError in place of a time if recursion fails"""
+    results = {}
+    for depth in depths:
+        plan = deep_chain(depth)
+        for name in evaluators or list(EVALUATORS):
+            make = EVALUATORS[name]
+            results[f"{name}/{depth}"] = {
+                'stack': time_evaluation(make, plan, False),
+                'recursive': time_recursively(make, plan, depth),
+            }
+    return results
+
+def main():
+    print(f"{'':32s} {'explicit stack':>16s} {'recursion':>16s}")
+    for key, r in compare().items():
+        stack, recursive = r['stack'], r['recursive']
+        if isinstance(recursive, Exception):
+            print(f"{key:32s} {stack:15.3f}s {type(recursive).__name__:>16s}")
+        else:
+            print(f"{key:32s} {stack:15.3f}s {recursive:15.3f}s   {recursive / stack:5.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Compares the slotted Outcome/Start/End/Event value objects against the 
+dict-based classes they replaced: per-object memory, construction time, and 
+time and peak memory when sampling histories of a large plan.
+
+    python -m benchmarks.bench_value_objects
+"""
+
+import timeit
+import tracemalloc
+from random import Random
+
+import plans.plan
+import plans.evaluations.histories
+from plans.plan import Plan, Action, Steps, Requirements, Options, Alternatives, Event, Start, End
+from plans.outcomes import Outcome, Status
+from plans.evaluations.histories import HistorySampler
+
+# The value classes as they were before they were slotted, for comparison
+
+class DictOutcome: 
+    def __init__(self, status, duration=0): 
+        self.status = status 
+        self.duration = duration 
+
+class DictStart: 
+    def __init__(self, plan, time): 
+        self.plan = plan 
+        self.time = time 
+    def __lt__(self, other): 
+        return (self.time, self.plan.id) < (other.time, other.plan.id)
+
+class DictEnd: 
+    def __init__(self, time, status): 
+        self.time = time 
+        self.status = status 
+    def __lt__(self, other): 
+        return (self.time, self.status.value) < (other.time, other.status.value)
+
+class DictEvent: 
+    @staticmethod 
+    def complete(plan, start, end, status): 
+        return DictEvent(DictStart(plan, start), DictEnd(end, status))
+    def __init__(self, start, end): 
+        self.start = start 
+        self.end = end 
+    def abort(self, end_time): 
+        status = self.end.status if end_time >= self.end.time else Status.FAILURE
+        return DictEvent.complete(self.start.plan, self.start.time, min(self.end.time, end_time), status)
+    start_time = property(lambda self: self.start.time)
+    end_time = property(lambda self: self.end.time)
+    plan = property(lambda self: self.start.plan)
+    status = property(lambda self: self.end.status)
+    def __lt__(self, other): 
+        return (self.start, self.end) < (other.start, other.end)
+
+def random_plan(rand: Random, size: int) -> Plan: 
+    if size <= 1: 
+        return Action("a", success_prob=0.99, duration=rand.randint(1, 10))
+    width = rand.randint(2, 5) 
+    kind = rand.choice([Steps, Requirements, Options, Alternatives]) 
+    return kind("p", *[random_plan(rand, (size - 1) // width) for i in range(width)])
+
+def bytes_per_object(factory, n: int = 100000) -> float: 
+    tracemalloc.start() 
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(i) for i in range(n)] 
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop() 
+    del objects 
+    return (after - before) / n 
+
+def sample_histories(n: int, plan: Plan): 
+    sampler = HistorySampler(rand=Random(0)) 
+    return [sampler.copy(0).evaluate_plan(plan) for i in range(n)]
+
+def peak_memory(fn) -> int: 
+    tracemalloc.start() 
+    result = fn() 
+    peak = tracemalloc.get_traced_memory()[1] 
+    tracemalloc.stop() 
+    del result 
+    return peak 
+
+def with_value_classes(outcome_class, event_class, fn): 
+    saved = plans.plan.Outcome, plans.evaluations.histories.Event, plans.plan.Event
+    plans.plan.Outcome = outcome_class 
+    plans.evaluations.histories.Event = plans.plan.Event = event_class
+    try: 
+        return fn() 
+    finally: 
+        plans.plan.Outcome, plans.evaluations.histories.Event, plans.plan.Event = saved
+
+def main(): 
+    plan = Action("a") 
+    print("bytes per object (list slot included)")
+    for name, slotted, dict_based in [
+        ("Outcome", lambda i: Outcome(Status.SUCCESS, i), lambda i: DictOutcome(Status.SUCCESS, i)), 
+        ("Event", lambda i: Event.complete(plan, i, i + 1, Status.SUCCESS), lambda i: DictEvent.complete(plan, i, i + 1, Status.SUCCESS)), 
+    ]: 
+        print(f"  {name:8s} slotted {bytes_per_object(slotted):7.1f}   dict-based {bytes_per_object(dict_based):7.1f}")
+
+    print("construction time, microseconds per object")
+    for name, slotted, dict_based in [
+        ("Outcome", lambda: Outcome(Status.SUCCESS, 3), lambda: DictOutcome(Status.SUCCESS, 3)), 
+        ("Event", lambda: Event.complete(plan, 1, 2, Status.SUCCESS), lambda: DictEvent.complete(plan, 1, 2, Status.SUCCESS)), 
+    ]: 
+        t1 = min(timeit.repeat(slotted, number=100000, repeat=5)) * 10
+        t2 = min(timeit.repeat(dict_based, number=100000, repeat=5)) * 10
+        print(f"  {name:8s} slotted {t1:7.3f}   dict-based {t2:7.3f}")
+
+    big = random_plan(Random(1), 2000) 
+    for name, outcome_class, event_class in [("slotted", Outcome, Event), ("dict-based", DictOutcome, DictEvent)]: 
+        run = lambda: with_value_classes(outcome_class, event_class, lambda: sample_histories(200, big))
+        start = timeit.default_timer() 
+        histories = run() 
+        elapsed = timeit.default_timer() - start 
+        events = sum(len(h.events) + 1 for h in histories)
+        del histories 
+        peak = peak_memory(run)
+        print(f"sampling 200 histories ({events} events), {name}: {elapsed:.2f}s, peak {peak / 2**20:.1f} MiB")
+
+if __name__ == '__main__': 
+    main()
@@ -0,0 +1,114 @@
+"""Synthetic plans for benchmarking, generated from a seed with a controllable
+size, depth, branching and mix of node types.  SHAPES names the shapes the
+benchmark suite runs on."""
+
+from random import Random
+from typing import Dict, Tuple, Type
+
+from plans.plan import Plan, Action, Steps, Requirements, Options, Alternatives, Ensure, Loop, IfElse, Optional
+from plans.math import UniformRange
+
+DEFAULT_MIX: Dict[Type[Plan], float] = {
+    Steps: 3, Requirements: 2, Options: 1, Alternatives: 1,
+    Loop: 1, Ensure: 0.5, IfElse: 0.5, Optional: 0.5,
+}
+
+SHAPES: Dict[str, Dict] = {
+    'balanced': dict(size=2000, depth=8, branching=(2, 5)),
+    'wide_requirements': dict(
+        size=5000, depth=2, branching=(50, 100), mix={Requirements: 1}, success_range=(0.999, 1.0)
+    ),
+    'deep_steps': dict(
+        size=1000, depth=400, branching=(2, 4), mix={Steps: 1}, spine=True, success_range=(0.995, 1.0)
+    ),
+    'loop_heavy': dict(size=2000, depth=10, branching=(2, 4), mix={Loop: 3, Ensure: 1, Steps: 2}),
+    'alternatives_aborts': dict(
+        size=2000, depth=8, branching=(2, 5), mix={Alternatives: 3, Requirements: 3, Steps: 1},
+        success_range=(0.3, 0.9)
+    ),
+}
+
+def shape_plan(shape: str, seed: int = 0, scale: float = 1.0) -> Plan:
+    """The plan of a named shape, with its size multiplied by 'scale'"""
+    params = dict(SHAPES[shape])
+    params['size'] = max(1, int(params['size'] * scale))
+    return generate_plan(seed, **params)
+
+def _split(rand: Random, budget: int, width: int, spine: bool):
+    """Splits budget nodes between width children, each getting at least one"""
+    if spine:
+        return [1] * (width - 1) + [budget - width + 1]
+    cuts = sorted(rand.sample(range(1, budget), width - 1))
+    return [b - a for a, b in zip([0] + cuts, cuts + [budget])]
+
+def generate_plan(
+    seed: int,
+    size: int = 1000,
+    depth: int = 8,
+    branching: Tuple[int, int] = (2, 5),
+    mix: Dict[Type[Plan], float] = None,
+    spine: bool = False,
+    success_range: Tuple[float, float] = (0.5, 1.0),
+    duration_range: Tuple[int, int] = (0, 10)
+) -> Plan:
+    """A random plan of about 'size' nodes and at most 'depth' levels of compound
+    nodes, whose compound nodes are drawn from 'mix' (node type to weight) and have
+    between branching[0] and branching[1] children.  With 'spine' set, every
+    compound node's last child gets all of its remaining nodes, making the plan as
+    deep as possible.  Loop, Ensure and Optional don't count towards the depth; and
+    Ensure only ever wraps a single Action (elsewhere, a Loop is used instead), so
+    that it ends quickly.
+
+    The tree is laid out top-down and built bottom-up, without recursion, so that
+    deep plans can be generated."""
+    rand = Random(seed)
+    kinds, weights = zip(*(mix or DEFAULT_MIX).items())
+    # [node type, node budget, remaining depth, child node indices]
+    nodes = [[None, size, depth, []]]
+    i = 0
+    while i < len(nodes):
+        node = nodes[i]
+        _, budget, d, children = node
+        kind = Action if budget <= 1 or d <= 0 else rand.choices(kinds, weights)[0]
+        if kind is IfElse and budget < 4:
+            kind = Steps
+        if kind is Ensure and budget > 2:
+            kind = Loop
+        node[0] = kind
+        if kind is Action:
+            splits = []
+        elif kind is Ensure:
+            splits = [1]
+        elif kind is Loop or kind is Optional:
+            splits = [budget - 1]
+        elif kind is IfElse:
+            splits = _split(rand, budget - 1, 3, spine)
+        else:
+            width = min(rand.randint(*branching), budget - 1)
+            splits = _split(rand, budget - 1, width, spine)
+        child_depth = d if len(splits) == 1 else d - 1
+        for b in splits:
+            children.append(len(nodes))
+            nodes.append([None, b, child_depth, []])
+        i += 1
+
+    built = [None] * len(nodes)
+    for i in range(len(nodes) - 1, -1, -1):
+        kind, _, _, children = nodes[i]
+        name = f"{kind.__name__.lower()}{i}"
+        if kind is Action:
+            low = rand.randint(*duration_range)
+            built[i] = Action(
+                name,
+                success_prob=round(rand.uniform(*success_range), 3),
+                duration=UniformRange(low, rand.randint(low, duration_range[1]))
+            )
+        elif kind is Loop:
+            built[i] = Loop(built[children[0]], rand.randint(2, 4), name=name)
+        elif kind is Ensure or kind is Optional:
+            built[i] = kind(built[children[0]], name=name)
+        elif kind is IfElse:
+            built[i] = IfElse(*[built[c] for c in children], name=name)
+        else:
+            built[i] = kind(name, *[built[c] for c in children])
+    return built[0]
@@ -0,0 +1,184 @@
+"""Times the evaluators and I/O paths of plans on the synthetic plan SHAPES, and
+records the throughput and peak memory of each to JSON.  Given a stored baseline,
+it fails when any result regresses by more than a threshold.  A benchmark that
+raises is reported as FAILED, without stopping the others, and also fails the run.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline baseline.json --threshold 0.25
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from random import Random
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from plans.plan import Plan
+from plans.evaluations.outcomes import OutcomeSampler
+from plans.evaluations.batch import sample_outcomes
+from plans.evaluations.histories import HistorySampler
+from plans.evaluations.serialization import serialize, deserialize
+from plans.evaluations.binary import serialize_binary, deserialize_binary
+from plans.timelines.event import Event
+from plans.timelines.timeline import Timeline, TrackedTimeline, Window
+from .generators import SHAPES, shape_plan
+
+# A benchmark is called as fn(plan, n) and returns the number of units (outcomes,
+# events, nodes...) of work it did; its throughput is units per second.
+
+def bench_sample_outcome(plan: Plan, n: int) -> int:
+    sampler = OutcomeSampler(Random(0))
+    for _ in range(n):
+        sampler.evaluate_plan(plan)
+    return n
+
+def bench_sample_outcomes(plan: Plan, n: int) -> int:
+    sample_outcomes(plan, 100 * n, np.random.default_rng(0))
+    return 100 * n
+
+def bench_sample_history(plan: Plan, n: int) -> int:
+    sampler = HistorySampler(rand=Random(0))
+    return sum(len(sampler.copy(0).evaluate_plan(plan).events) + 1 for _ in range(n))
+
+def _nodes(plan: Plan) -> int:
+    return sum(1 for _ in plan.descendants())
+
+def bench_serialize(plan: Plan, n: int) -> int:
+    for _ in range(n):
+        serialize(plan)
+    return n * _nodes(plan)
+
+def bench_deserialize(plan: Plan, n: int) -> int:
+    text = serialize(plan)
+    for _ in range(n):
+        deserialize(text)
+    return n * _nodes(plan)
+
+def bench_binary_round_trip(plan: Plan, n: int) -> int:
+    for _ in range(n):
+        deserialize_binary(serialize_binary(plan))
+    return n * _nodes(plan)
+
+def bench_timeline_layout(plan: Plan, n: int) -> int:
+    sampler = HistorySampler(rand=Random(0))
+    events = []
+    offset = 0
+    for _ in range(n):
+        h = sampler.copy(offset).evaluate_plan(plan)
+        events.extend(Event(e.start_time, e.end_time, e) for e in h.all_events())
+        offset = h.end_time + 1
+    TrackedTimeline(Timeline(events), Window(0, max(offset, 1), 0, 200))
+    return len(events)
+
+BENCHMARKS: Dict[str, Callable[[Plan, int], int]] = {
+    'sample_outcome': bench_sample_outcome,
+    'sample_outcomes': bench_sample_outcomes,
+    'sample_history': bench_sample_history,
+    'serialize': bench_serialize,
+    'deserialize': bench_deserialize,
+    'binary_round_trip': bench_binary_round_trip,
+    'timeline_layout': bench_timeline_layout,
+}
+
+def measure(fn: Callable[[Plan, int], int], plan: Plan, n: int, repeat: int = 3) -> Dict:
+    """The best throughput of fn(plan, n) over 'repeat' runs, and its peak memory
+    (traced separately, as tracing slows the run down)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        units = fn(plan, n)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    fn(plan, n)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'units': units,
+        'seconds': best,
+        'throughput': units / best if best > 0 else float('inf'),
+        'peak_bytes': peak,
+    }
+
+def run_suite(
+    benchmarks: List[str] = None, shapes: List[str] = None, n: int = 20, scale: float = 1.0,
+    seed: int = 0, repeat: int = 3
+) -> Dict:
+    """Measures every benchmark on every shape.  A benchmark that raises is
+    recorded with its 'error' in place of measurements, and the run goes on"""
+    results = {}
+    for shape in shapes or list(SHAPES):
+        plan = shape_plan(shape, seed, scale)
+        for name in benchmarks or list(BENCHMARKS):
+            try:
+                results[f"{name}/{shape}"] = measure(BENCHMARKS[name], plan, n, repeat)
+            except Exception as e:
+                results[f"{name}/{shape}"] = {'error': f"{type(e).__name__}: {e}"}
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'parameters': {'n': n, 'scale': scale, 'seed': seed},
+        'results': results,
+    }
+
+def failures(current: Dict) -> List[str]:
+    """Describes every benchmark that raised an error"""
+    return [f"{key}: {r['error']}" for key, r in current['results'].items() if 'error' in r]
+
+def regressions(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Describes every result whose throughput fell, or whose peak memory rose, by
+    more than 'threshold' (a fraction) relative to the baseline, or which failed
+    where the baseline didn't"""
+    found = []
+    for key, base in baseline['results'].items():
+        result = current['results'].get(key)
+        if result is None or 'error' in base:
+            continue
+        if 'error' in result:
+            found.append(f"{key}: failed with {result['error']}")
+            continue
+        if result['throughput'] < base['throughput'] * (1.0 - threshold):
+            found.append(f"{key}: throughput {result['throughput']:.4g}/s, baseline {base['throughput']:.4g}/s")
+        if result['peak_bytes'] > base['peak_bytes'] * (1.0 + threshold):
+            found.append(f"{key}: peak memory {result['peak_bytes']} bytes, baseline {base['peak_bytes']}")
+    return found
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', action='append', choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument('--shape', action='append', choices=list(SHAPES), help="run only on these shapes")
+    parser.add_argument('-n', type=int, default=20, help="repetitions of the work within each run")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiplies the size of every shape")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="runs per benchmark; the fastest is kept")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare against the results in this JSON file")
+    parser.add_argument('--threshold', type=float, default=0.2, help="the regression that fails the run, as a fraction")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.benchmark, args.shape, args.n, args.scale, args.seed, args.repeat)
+    for key, r in current['results'].items():
+        if 'error' in r:
+            print(f"{key:40s} FAILED {r['error']}")
+        else:
+            print(f"{key:40s} {r['throughput']:12.4g}/s  {r['seconds']:8.3f}s  peak {r['peak_bytes'] / 2**20:7.1f} MiB")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+    status = 1 if failures(current) else 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(current, json.load(f), args.threshold)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            status = 1
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,35 @@
 """PyPlan: Simple tools for creating and manipulating human-evaluable plans
 """
 
+from importlib import import_module
+
 from .plan import ( 
     Plan, Action, Requirements, Steps, Options, Ensure, IfElse, Fail, Optional
 )
-from .evaluations import success_probability, sample_outcome, average_duration
 
+# The evaluation functions, and the subpackages and submodules, are imported 
+# on first use (PEP 562), so that importing plans stays cheap for short-lived 
+# processes
+_EVALUATIONS = ['success_probability', 'sample_outcome', 'average_duration']
+
+__all__ = [
+    'Plan', 'Action', 'Requirements', 'Steps', 'Options', 'Ensure', 'IfElse', 'Fail', 'Optional'
+] + _EVALUATIONS
+
+def __getattr__(name: str): 
+    if name in _EVALUATIONS: 
+        value = getattr(import_module(".evaluations", __name__), name) 
+        globals()[name] = value 
+        return value 
+    if not name.startswith('_'): 
+        # subpackages (evaluations, timelines, parsing) and submodules, as 
+        # attributes of the package
+        try: 
+            return import_module(f".{name}", __name__) 
+        except ModuleNotFoundError as e: 
+            if e.name != f"{__name__}.{name}": 
+                raise 
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__(): 
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,129 @@
+
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from plans.plan import Plan, Event, History
+from plans.outcomes import Status
+from plans.compiled import CompiledPlan, compile_plan
+
+class ColumnarHistory:
+
+    """A History held as parallel arrays -- the CompiledPlan node index, start
+    time, end time and status (1 for SUCCESS) of every event -- instead of a list
+    of Event objects.  Row 'result_row' is the top-level event.
+
+    Filtering and sorting work on whole columns at once, and Event objects are
+    only created on demand (see events() and to_history()).
+    """
+
+    compiled: CompiledPlan
+    node: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    status: np.ndarray
+    result_row: int
+
+    def __init__(
+        self,
+        compiled: CompiledPlan,
+        node: np.ndarray,
+        start: np.ndarray,
+        end: np.ndarray,
+        status: np.ndarray,
+        result_row: int = None
+    ):
+        if len(node) == 0:
+            raise ValueError("top level event in History must be non-None")
+        self.compiled = compiled
+        self.node = np.asarray(node, dtype=np.int32)
+        self.start = np.asarray(start, dtype=np.int64)
+        self.end = np.asarray(end, dtype=np.int64)
+        self.status = np.asarray(status, dtype=np.uint8)
+        self.result_row = len(node) - 1 if result_row is None else result_row
+
+    @staticmethod
+    def from_records(compiled: CompiledPlan, records: List[Tuple[int, int, int, bool]]) -> 'ColumnarHistory':
+        """Builds a ColumnarHistory from CompiledSampler records, whose last record
+        is the top-level event"""
+        columns = np.array(records, dtype=np.int64).reshape(-1, 4)
+        return ColumnarHistory(compiled, columns[:, 0], columns[:, 1], columns[:, 2], columns[:, 3])
+
+    @staticmethod
+    def from_events(compiled: CompiledPlan, result: Event, events: Iterable[Event] = ()) -> 'ColumnarHistory':
+        rows = [e for e in events] + [result]
+        return ColumnarHistory(
+            compiled,
+            np.fromiter((compiled.index_of(e.plan) for e in rows), dtype=np.int32, count=len(rows)),
+            np.fromiter((e.start_time for e in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter((e.end_time for e in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter((e.status == Status.SUCCESS for e in rows), dtype=np.uint8, count=len(rows))
+        )
+
+    @staticmethod
+    def from_history(history: History, compiled: CompiledPlan = None) -> 'ColumnarHistory':
+        compiled = compiled or compile_plan(history.result.plan)
+        return ColumnarHistory.from_events(compiled, history.result, history.events)
+
+    def __len__(self) -> int: return len(self.node)
+
+    def event_at(self, row: int) -> Event:
+        return Event.complete(
+            self.compiled.plans[self.node[row]],
+            int(self.start[row]),
+            int(self.end[row]),
+            Status.SUCCESS if self.status[row] else Status.FAILURE
+        )
+
+    @property
+    def result(self) -> Event: return self.event_at(self.result_row)
+
+    @property
+    def result_status(self) -> Status:
+        return Status.SUCCESS if self.status[self.result_row] else Status.FAILURE
+
+    @property
+    def start_time(self) -> int: return int(self.start[self.result_row])
+
+    @property
+    def end_time(self) -> int: return int(self.end[self.result_row])
+
+    @property
+    def durations(self) -> np.ndarray: return self.end - self.start
+
+    def events(self) -> Iterator[Event]:
+        """All events but the top-level result, as Event objects"""
+        for row in range(len(self.node)):
+            if row != self.result_row:
+                yield self.event_at(row)
+
+    def to_history(self) -> History:
+        return History(self.result, *self.events())
+
+    def select(self, rows: np.ndarray) -> 'ColumnarHistory':
+        """The history restricted to the given rows (a boolean mask, or an array of
+        row indices) -- the top-level event is always kept"""
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        rows = rows[rows != self.result_row]
+        rows = np.append(rows, self.result_row)
+        return ColumnarHistory(
+            self.compiled, self.node[rows], self.start[rows], self.end[rows], self.status[rows]
+        )
+
+    def sorted(self) -> 'ColumnarHistory':
+        """Orders the events by (start, end), keeping the result last"""
+        return self.select(np.lexsort((self.end, self.start)))
+
+    def mask_for_plan(self, plan: Plan) -> np.ndarray:
+        return self.node == self.compiled.index_of(plan)
+
+    def for_plan(self, plan: Plan) -> 'ColumnarHistory':
+        return self.select(self.mask_for_plan(plan))
+
+    def mask_overlapping(self, t1: int, t2: int) -> np.ndarray:
+        return (self.start <= t2) & (self.end >= t1)
+
+    def mask_status(self, status: Status) -> np.ndarray:
+        return self.status == (1 if status == Status.SUCCESS else 0)
@@ -0,0 +1,136 @@
+
+from enum import IntEnum
+from typing import Dict, List
+
+import numpy as np
+
+from plans.plan import Plan
+from plans.math import Constant, UniformRange
+
+class NodeKind(IntEnum):
+
+    ACTION = 0
+    STEPS = 1
+    REQUIREMENTS = 2
+    OPTIONS = 3
+    ALTERNATIVES = 4
+    ENSURE = 5
+    LOOP = 6
+    IFELSE = 7
+    FAIL = 8
+    OPTIONAL = 9
+
+class DurationKind(IntEnum):
+
+    CONSTANT = 0
+    UNIFORM = 1
+    OTHER = 2
+
+class CompiledPlan:
+
+    """A flat, array-backed form of a Plan tree, for evaluators that want to run
+    in tight loops rather than through recursive Evaluator dispatch.
+
+    Nodes are numbered in post-order -- every child has a smaller index than its
+    parent, and the root is the last node.  A Plan object that appears in several
+    places in the tree is compiled only once, so the children arrays describe a
+    DAG.  The children of node i are children[child_offset[i]:child_offset[i] +
+    child_count[i]].  Action parameters live in success_prob and the duration_*
+    arrays (UniformRange is [duration_low, duration_high], Constant has equal
+    low and high, and any other IntDist is kept only in 'plans'), and Loop bounds
+    in max_loops.
+    """
+
+    kind: np.ndarray
+    child_offset: np.ndarray
+    child_count: np.ndarray
+    children: np.ndarray
+    success_prob: np.ndarray
+    duration_kind: np.ndarray
+    duration_low: np.ndarray
+    duration_high: np.ndarray
+    max_loops: np.ndarray
+    plans: List[Plan]
+    ids: List[str]
+    index: Dict[str, int]
+
+    def __init__(self, plan: Plan):
+        self.plans = _post_order(plan)
+        self.ids = [p.id for p in self.plans]
+        self.index = {plan_id: i for i, plan_id in enumerate(self.ids)}
+
+        n = len(self.plans)
+        self.kind = np.zeros(n, dtype=np.int8)
+        self.child_offset = np.zeros(n, dtype=np.int32)
+        self.child_count = np.zeros(n, dtype=np.int32)
+        self.success_prob = np.full(n, np.nan)
+        self.duration_kind = np.full(n, -1, dtype=np.int8)
+        self.duration_low = np.zeros(n, dtype=np.int64)
+        self.duration_high = np.zeros(n, dtype=np.int64)
+        self.max_loops = np.full(n, -1, dtype=np.int64)
+
+        children: List[int] = []
+        for i, p in enumerate(self.plans):
+            kind_name = p.plan_type.upper()
+            if kind_name not in NodeKind.__members__:
+                raise ValueError(f"Can't compile plan {p} of type {p.plan_type}")
+            kind = NodeKind[kind_name]
+            self.kind[i] = kind
+            self.child_offset[i] = len(children)
+            self.child_count[i] = len(p.children)
+            children.extend(self.index[c.id] for c in p.children)
+            if kind == NodeKind.ACTION:
+                self.success_prob[i] = p.success_prob
+                self._compile_duration(i, p)
+            elif kind == NodeKind.LOOP:
+                self.max_loops[i] = p.max_loops
+        self.children = np.array(children, dtype=np.int32)
+
+    def _compile_duration(self, i: int, action: Plan):
+        d = action.duration
+        if isinstance(d, Constant):
+            self.duration_kind[i] = DurationKind.CONSTANT
+            self.duration_low[i] = self.duration_high[i] = d.value
+        elif isinstance(d, UniformRange):
+            self.duration_kind[i] = DurationKind.UNIFORM
+            self.duration_low[i] = d.lower_value
+            self.duration_high[i] = d.upper_value
+        else:
+            self.duration_kind[i] = DurationKind.OTHER
+
+    def __len__(self) -> int: return len(self.plans)
+
+    @property
+    def root(self) -> int: return len(self.plans) - 1
+
+    def child_indices(self, i: int) -> np.ndarray:
+        offset = self.child_offset[i]
+        return self.children[offset:offset + self.child_count[i]]
+
+    def index_of(self, plan: Plan) -> int:
+        return self.index[plan.id]
+
+    def plan_at(self, i: int) -> Plan:
+        return self.plans[i]
+
+def compile_plan(plan: Plan) -> CompiledPlan:
+    return CompiledPlan(plan)
+
+def _post_order(root: Plan) -> List[Plan]:
+    """Lists the distinct nodes of the plan in post-order, without recursion"""
+    seen = set()
+    ordered: List[Plan] = []
+    stack = [(root, False)]
+    while stack:
+        plan, expanded = stack.pop()
+        if plan.id in seen:
+            continue
+        if expanded:
+            seen.add(plan.id)
+            ordered.append(plan)
+        else:
+            stack.append((plan, True))
+            for child in reversed(plan.children):
+                if child.id not in seen:
+                    stack.append((child, False))
+    return ordered
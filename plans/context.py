@@ -41,6 +41,11 @@ class Context:
         for key in self.env: 
             yield key, self.env[key]
     
+    def cache_key(self) -> Tuple: 
+        """A hashable summary of the contents of this Context, for use in keys of 
+        memoized evaluations"""
+        return tuple(sorted(self.key_values()))
+    
     def as_dict(self) -> Dict[str, any]: 
         return { 
             k: v for k, v in self.key_values()
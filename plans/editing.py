@@ -0,0 +1,90 @@
+from typing import List
+
+from plans.plan import Plan, Action, MemoizingEvaluator, bottom_up
+from plans.context import Context
+from plans.evaluations.success import SuccessEvaluator
+from plans.evaluations.duration import MaxDurationEvaluator
+
+def edit_plan(root: Plan) -> 'PlanEditor':
+    return PlanEditor(root)
+
+class SubtreeSizeEvaluator(MemoizingEvaluator[int]):
+
+    """The number of nodes in each subtree, counting a shared node once for each
+    place it appears"""
+
+    def evaluate_action(self, action: Action, c: Context = None) -> int:
+        return 1
+
+    @bottom_up
+    def evaluate_subtree(self, plan: Plan, children: List[int], c: Context = None) -> int:
+        return 1 + sum(children)
+
+    evaluate_steps = evaluate_requirements = evaluate_options = evaluate_alternatives = evaluate_subtree
+    evaluate_ensure = evaluate_loop = evaluate_ifelse = evaluate_fail = evaluate_optional = evaluate_subtree
+
+class PlanEditor:
+
+    """Interactive what-if changes to a plan tree.  A mutation of a node
+    (re-assigning success_prob, duration or name, say, or Steps.number_steps)
+    increments the versions of the node and its ancestors (see Plan.touch).  The
+    editor's evaluators cache the value of every node, not only of shared ones,
+    keyed on those versions -- so after an edit, only the nodes on the path to the
+    root are evaluated again, while the values (and structural digests) of every
+    other subtree are kept.
+
+    Change children through the editor's methods (or by re-assigning a node's
+    children), which keep the parent links up to date.  close() drops the
+    editor's cached values.
+    """
+
+    root: Plan
+    success: SuccessEvaluator
+    durations: MaxDurationEvaluator
+    sizes: SubtreeSizeEvaluator
+
+    def __init__(self, root: Plan, max_cache_size: int = 1000000):
+        self.root = root
+        self.success = SuccessEvaluator(max_cache_size, shared_only=False)
+        self.durations = MaxDurationEvaluator(max_cache_size, shared_only=False)
+        self.sizes = SubtreeSizeEvaluator(max_cache_size, shared_only=False)
+
+    def parents(self, plan: Plan) -> List[Plan]:
+        return plan.parents()
+
+    def set_children(self, plan: Plan, children: List[Plan]):
+        """Replaces the children of plan, updating the parent links"""
+        plan.children = list(children)
+
+    def replace_child(self, plan: Plan, index: int, child: Plan):
+        children = list(plan.children)
+        children[index] = child
+        self.set_children(plan, children)
+
+    def insert_child(self, plan: Plan, index: int, child: Plan):
+        children = list(plan.children)
+        children.insert(index, child)
+        self.set_children(plan, children)
+
+    def remove_child(self, plan: Plan, index: int) -> Plan:
+        children = list(plan.children)
+        removed = children.pop(index)
+        self.set_children(plan, children)
+        return removed
+
+    def success_probability(self, plan: Plan = None) -> float:
+        return self.success.evaluate_plan(plan or self.root, Context())
+
+    def max_duration(self, plan: Plan = None) -> int:
+        return self.durations.evaluate_plan(plan or self.root, Context())
+
+    def size(self, plan: Plan = None) -> int:
+        return self.sizes.evaluate_plan(plan or self.root, Context())
+
+    def structural_digest(self, plan: Plan = None) -> str:
+        return (plan or self.root).structural_digest()
+
+    def close(self):
+        """Drops the values cached by the editor's evaluators"""
+        for evaluator in (self.success, self.durations, self.durations.success, self.sizes):
+            evaluator.cache.clear()
@@ -1,5 +1,33 @@
+from importlib import import_module
 
-from .success import success_probability
-from .outcomes import sample_outcome
-from .duration import average_duration
-from .histories import sample_history
\ No newline at end of file
+# The functions exported here, by the submodule that defines them.  Submodules 
+# (and numpy, which most of them need) are imported on first use, via PEP 562. 
+_EXPORTS = {
+    'success_probability': 'success', 
+    'sample_outcome': 'outcomes', 
+    'average_duration': 'duration', 
+    'sample_outcomes': 'batch', 
+    'sample_history': 'histories', 
+    'iter_events': 'streaming', 
+    'check_trace': 'conformance', 
+    'compare_plans': 'comparison', 
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name: str): 
+    if name in _EXPORTS: 
+        value = getattr(import_module(f".{_EXPORTS[name]}", __name__), name) 
+        globals()[name] = value 
+        return value 
+    if not name.startswith('_'): 
+        # submodules, as attributes of the package
+        try: 
+            return import_module(f".{name}", __name__) 
+        except ModuleNotFoundError as e: 
+            if e.name != f"{__name__}.{name}": 
+                raise 
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__(): 
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,248 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from plans.plan import Plan
+from plans.outcomes import Outcome, Status
+from .batch import SHARD_SIZE, sample_outcomes
+from .parallel import shard_map, shard_rng
+
+# Streaming summaries of sampled durations, which take a fixed amount of memory
+# however many samples they're fed, and which can be merged -- e.g. across the
+# shards of shard_map.  DurationAccumulator keeps an exact histogram while the
+# durations it's seen fall in a small range, and a KLLSketch once they don't;
+# OutcomeAccumulator keeps one of each for successes and failures.
+
+def accumulate_outcomes(p: Plan, n: int, workers: int = None, seed: int = None, max_bins: int = 4096) -> 'OutcomeAccumulator':
+    """Samples n outcomes of p, in shards (as sample_outcome_sums), and summarizes
+    them in an OutcomeAccumulator -- without holding more than one shard's samples
+    in memory at a time"""
+    shards = shard_map(_accumulate_shard, n, SHARD_SIZE, workers, seed, p, max_bins)
+    acc = OutcomeAccumulator(max_bins)
+    for s in shards:
+        acc.merge(s)
+    return acc
+
+def _accumulate_shard(size: int, seed: np.random.SeedSequence, p: Plan, max_bins: int) -> 'OutcomeAccumulator':
+    acc = OutcomeAccumulator(max_bins)
+    acc.add(*sample_outcomes(p, size, shard_rng(seed)))
+    return acc
+
+class KLLSketch:
+
+    """A KLL quantile sketch of a stream of integers.  Values are held in a stack
+    of compactors, where each value at level h stands for 2**h of the values
+    seen; a level that outgrows its capacity is sorted, and every other value
+    (from a random offset) is promoted to the next level.  Quantiles are accurate
+    to within a rank error of about 1.7 / k, in O(k log(n / k)) memory."""
+
+    k: int
+    levels: List[np.ndarray]
+    count: int
+    rng: np.random.Generator
+
+    def __init__(self, k: int = 200, seed: int = None):
+        if k < 8:
+            raise ValueError(f"k {k} must be at least 8")
+        self.k = k
+        self.levels = [np.zeros(0, dtype=np.int64)]
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int: return sum(len(level) for level in self.levels)
+
+    def capacity(self, h: int) -> int:
+        return max(2, int(self.k * (2.0 / 3.0) ** (len(self.levels) - 1 - h)))
+
+    def add(self, values: np.ndarray, level: int = 0):
+        """Adds an array of values, each standing for 2**level samples"""
+        if len(values) == 0:
+            return
+        while len(self.levels) <= level:
+            self.levels.append(np.zeros(0, dtype=np.int64))
+        self.levels[level] = np.concatenate([self.levels[level], np.asarray(values, dtype=np.int64)])
+        self.count += len(values) << level
+        self._compress()
+
+    def add_counts(self, values: np.ndarray, counts: np.ndarray):
+        """Adds each of values[i], counts[i] times -- one level per bit of the count"""
+        counts = np.asarray(counts, dtype=np.int64)
+        h = 0
+        while (counts >> h).any():
+            self.add(values[(counts >> h) & 1 == 1], h)
+            h += 1
+
+    def merge(self, other: 'KLLSketch'):
+        for h, level in enumerate(other.levels):
+            if h < len(self.levels):
+                self.levels[h] = np.concatenate([self.levels[h], level])
+            else:
+                self.levels.append(level.copy())
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self.capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.zeros(0, dtype=np.int64))
+                level = np.sort(level)
+                # an odd value out stays behind, so no weight is lost
+                keep, level = level[:len(level) % 2], level[len(level) % 2:]
+                promoted = level[int(self.rng.integers(2))::2]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.levels[h] = keep
+            h += 1
+
+    def weighted_values(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The values held, in sorted order, with the number of samples each stands for"""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 1 << h, dtype=np.int64) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], weights[order]
+
+    def quantile(self, q: float) -> int:
+        values, weights = self.weighted_values()
+        c = np.cumsum(weights) / self.count
+        return int(values[min(np.searchsorted(c, q - 1e-12), len(values) - 1)])
+
+class DurationAccumulator:
+
+    """Summarizes a stream of durations: exactly, as a histogram of counts by
+    duration, while every duration lies in [0, max_bins) -- and approximately, in
+    a KLLSketch, from the first one that doesn't.  The count, total, min and max
+    are always exact."""
+
+    max_bins: int
+    counts: np.ndarray
+    sketch: KLLSketch
+    count: int
+    total: int
+    min_value: int
+    max_value: int
+
+    def __init__(self, max_bins: int = 4096):
+        self.max_bins = max_bins
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.sketch = None
+        self.count = 0
+        self.total = 0
+        self.min_value = None
+        self.max_value = None
+
+    @property
+    def is_exact(self) -> bool: return self.sketch is None
+
+    def add(self, durations: np.ndarray):
+        durations = np.asarray(durations, dtype=np.int64)
+        if len(durations) == 0:
+            return
+        low, high = int(durations.min()), int(durations.max())
+        self.count += len(durations)
+        self.total += int(durations.sum())
+        self.min_value = low if self.min_value is None else min(self.min_value, low)
+        self.max_value = high if self.max_value is None else max(self.max_value, high)
+        if self.is_exact and (low < 0 or high >= self.max_bins):
+            self._to_sketch()
+        if self.is_exact:
+            self._add_counts(np.bincount(durations))
+        else:
+            self.sketch.add(durations)
+
+    def add_value(self, duration: int):
+        self.add(np.array([duration]))
+
+    def _add_counts(self, counts: np.ndarray):
+        if len(counts) > len(self.counts):
+            self.counts = np.pad(self.counts, (0, len(counts) - len(self.counts)))
+        self.counts[:len(counts)] += counts
+
+    def _to_sketch(self):
+        # a fixed seed keeps seeded runs reproducible
+        self.sketch = KLLSketch(seed=0)
+        self.sketch.add_counts(np.flatnonzero(self.counts), self.counts[self.counts > 0])
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def merge(self, other: 'DurationAccumulator'):
+        if other.count == 0:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+        self.max_value = other.max_value if self.max_value is None else max(self.max_value, other.max_value)
+        if self.is_exact and other.is_exact and self.max_value < self.max_bins:
+            self._add_counts(other.counts)
+            return
+        if self.is_exact:
+            self._to_sketch()
+        if other.is_exact:
+            self.sketch.add_counts(np.flatnonzero(other.counts), other.counts[other.counts > 0])
+        else:
+            self.sketch.merge(other.sketch)
+
+    def mean(self) -> float:
+        return self.total / self.count
+
+    def quantile(self, q: float) -> int:
+        """The smallest duration d such that at least a fraction q of the durations
+        are <= d (exact, or to within the sketch's rank error)"""
+        if not 0.0 <= q <= 1.0:
+            raise ValueError(f"quantile {q} must be between 0 and 1")
+        if self.count == 0:
+            raise ValueError("No durations have been accumulated")
+        if not self.is_exact:
+            return self.sketch.quantile(q)
+        c = np.cumsum(self.counts) / self.count
+        return int(min(np.searchsorted(c, q - 1e-12), len(c) - 1))
+
+class OutcomeAccumulator:
+
+    """A DurationAccumulator each for the successful and the failed outcomes of a
+    stream of samples.  It can be fed batches from sample_outcomes (or from
+    BatchOutcomeSampler, with any Draws) via add, or single Outcomes via
+    add_outcome."""
+
+    success: DurationAccumulator
+    failure: DurationAccumulator
+
+    def __init__(self, max_bins: int = 4096):
+        self.success = DurationAccumulator(max_bins)
+        self.failure = DurationAccumulator(max_bins)
+
+    @property
+    def count(self) -> int: return self.success.count + self.failure.count
+
+    def add(self, statuses: np.ndarray, durations: np.ndarray):
+        self.success.add(durations[statuses])
+        self.failure.add(durations[~statuses])
+
+    def add_outcome(self, outcome: Outcome):
+        (self.success if outcome.status else self.failure).add_value(outcome.duration)
+
+    def merge(self, other: 'OutcomeAccumulator'):
+        self.success.merge(other.success)
+        self.failure.merge(other.failure)
+
+    def durations(self, status: Status = None) -> DurationAccumulator:
+        """The accumulator for the given status -- or, if status is None, a new one
+        merging both"""
+        if status == Status.SUCCESS: return self.success
+        if status == Status.FAILURE: return self.failure
+        both = DurationAccumulator(self.success.max_bins)
+        both.merge(self.success)
+        both.merge(self.failure)
+        return both
+
+    def probability(self, status: Status = None) -> float:
+        return self.durations(status).count / self.count
+
+    def mean(self, status: Status = None) -> float:
+        return self.durations(status).mean()
+
+    def quantile(self, q: float, status: Status = None) -> int:
+        return self.durations(status).quantile(q)
+
+    def __repr__(self):
+        return f"OutcomeAccumulator(count={self.count}, success={self.probability(Status.SUCCESS)})"
@@ -0,0 +1,186 @@
+
+from typing import List, Tuple
+
+import numpy as np
+
+from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Fail, IterativeEvaluator
+from plans.context import Context
+from .parallel import shard_map, shard_rng, merge_sums
+from .draws import Draws, IndependentDraws
+
+# samples per shard, when sampling is split across workers
+SHARD_SIZE = 65536
+
+# A batch of sampled outcomes: a boolean array of statuses (True for SUCCESS) and
+# an integer array of durations, both indexed by sample.
+Batch = Tuple[np.ndarray, np.ndarray]
+
+def sample_outcomes(
+    p: Plan, n: int, rng: np.random.Generator = None, workers: int = None, seed: int = None
+) -> Batch:
+    """Samples n independent outcomes of the plan p at once, returning a pair of
+    (status_array, duration_array).  
+
+    Given 'workers' or 'seed', the samples are drawn in fixed-size shards with
+    their own random streams derived from seed, spread over that many processes;
+    the result then depends only on the seed, and not on the number of workers.
+    """
+    if n <= 0:
+        raise ValueError(f"n {n} cannot be zero or negative")
+    if workers is not None or seed is not None:
+        shards = shard_map(_sample_shard, n, SHARD_SIZE, workers, seed, p)
+        return (
+            np.concatenate([s for s, _ in shards]),
+            np.concatenate([d for _, d in shards])
+        )
+    v = BatchOutcomeSampler(np.arange(n), rng)
+    c = Context()
+    return v.evaluate_plan(p, c)
+
+def sample_outcome_sums(p: Plan, n: int, workers: int = None, seed: int = None) -> Tuple[int, int]:
+    """The number of successes, and the total duration, of n sampled outcomes --
+    as sample_outcomes, but without holding all n samples in memory at once"""
+    return merge_sums(shard_map(_sum_shard, n, SHARD_SIZE, workers, seed, p))
+
+def _sample_shard(size: int, seed: np.random.SeedSequence, p: Plan) -> Batch:
+    return sample_outcomes(p, size, shard_rng(seed))
+
+def _sum_shard(size: int, seed: np.random.SeedSequence, p: Plan) -> Tuple[int, int]:
+    statuses, durations = sample_outcomes(p, size, shard_rng(seed))
+    return int(statuses.sum()), int(durations.sum())
+
+def estimate_success_probability(
+    p: Plan, n: int = 1000, rng: np.random.Generator = None, workers: int = None, seed: int = None
+) -> float:
+    """Estimates the success probability of p from n sampled outcomes -- useful
+    when cross-checking success_probability, which is computed exactly"""
+    if workers is not None or seed is not None:
+        successes, _ = sample_outcome_sums(p, n, workers, seed)
+        return successes / n
+    statuses, _ = sample_outcomes(p, n, rng)
+    return float(statuses.mean())
+
+class BatchOutcomeSampler(IterativeEvaluator[Batch]):
+
+    """Samples outcomes for a whole batch of independent executions of a plan at
+    once.  The batch is identified by 'index', an array of sample indices -- compound
+    plans evaluate their children on sub-batches (e.g. only the samples for which
+    every earlier step has succeeded), and use array masks and reductions in place
+    of the per-sample control flow of OutcomeSampler.
+
+    Actions take their random draws from 'draws' -- by default, independent draws
+    from rng.
+
+    The methods are generators (see IterativeEvaluator), so that plans of any
+    depth can be sampled.  A sub-batch is evaluated by pointing 'index' at it for
+    the duration of the child's evaluation (see evaluate_subset): every method
+    leaves 'index' as it found it.
+    """
+
+    index: np.ndarray
+    draws: Draws
+
+    def __init__(self, index: np.ndarray, rng: np.random.Generator = None, draws: Draws = None):
+        self.index = index
+        self.draws = draws if draws is not None else IndependentDraws(rng)
+
+    @property
+    def n(self) -> int: return len(self.index)
+
+    def empty(self) -> Batch:
+        return np.zeros(self.n, dtype=bool), np.zeros(self.n, dtype=np.int64)
+
+    def sample_action(self, action: Action) -> Batch:
+        return self.draws.sample_action(action, self.index)
+
+    def evaluate_subset(self, plan: Plan, positions: np.ndarray, c: Context) -> Batch:
+        """Evaluates plan on the samples at the given positions of this batch, as
+        part of a generator method (with yield from)"""
+        index = self.index
+        self.index = index[positions]
+        try:
+            return (yield plan, c)
+        finally:
+            self.index = index
+
+    def evaluate_action(self, action: Action, c: Context = None) -> Batch:
+        return self.sample_action(action)
+
+    def evaluate_sequence(self, children: List[Plan], stop_on: bool, c: Context) -> Batch:
+        """Serial evaluation, with each sample stopping at the first child whose
+        status is 'stop_on' (failure for Steps, success for Options)"""
+        success = np.full(self.n, not stop_on)
+        duration = np.zeros(self.n, dtype=np.int64)
+        active = np.arange(self.n)
+        for child in children:
+            if len(active) == 0:
+                break
+            child_success, child_duration = yield from self.evaluate_subset(child, active, c)
+            duration[active] += child_duration
+            stopped = child_success == stop_on
+            success[active[stopped]] = stop_on
+            active = active[~stopped]
+        return success, duration
+
+    def evaluate_steps(self, steps: Steps, c: Context = None) -> Batch:
+        return (yield from self.evaluate_sequence(steps.children, False, c))
+
+    def evaluate_options(self, options: Options, c: Context = None) -> Batch:
+        return (yield from self.evaluate_sequence(options.children, True, c))
+
+    def evaluate_parallel(self, children: List[Plan], c: Context) -> Tuple[np.ndarray, np.ndarray]:
+        results = yield children
+        statuses = np.stack([s for s, _ in results])
+        durations = np.stack([d for _, d in results])
+        return statuses, durations
+
+    def evaluate_requirements(self, reqs: Requirements, c: Context = None) -> Batch:
+        statuses, durations = yield from self.evaluate_parallel(reqs.children, c)
+        success = statuses.all(axis=0)
+        first_failure = np.where(statuses, np.iinfo(np.int64).max, durations).min(axis=0)
+        return success, np.where(success, durations.max(axis=0), first_failure)
+
+    def evaluate_alternatives(self, alternatives: Alternatives, c: Context = None) -> Batch:
+        statuses, durations = yield from self.evaluate_parallel(alternatives.children, c)
+        success = statuses.any(axis=0)
+        first_success = np.where(statuses, durations, np.iinfo(np.int64).max).min(axis=0)
+        return success, np.where(success, first_success, durations.max(axis=0))
+
+    def evaluate_retries(self, child: Plan, max_loops: int, c: Context) -> Batch:
+        success, duration = self.empty()
+        active = np.arange(self.n)
+        tries = 0
+        while len(active) > 0 and (max_loops is None or tries < max_loops):
+            child_success, child_duration = yield from self.evaluate_subset(child, active, c)
+            duration[active] += child_duration
+            success[active[child_success]] = True
+            active = active[~child_success]
+            tries += 1
+        return success, duration
+
+    def evaluate_ensure(self, ensure: Ensure, c: Context = None) -> Batch:
+        return (yield from self.evaluate_retries(ensure.children[0], None, c))
+
+    def evaluate_loop(self, loop: Loop, c: Context = None) -> Batch:
+        return (yield from self.evaluate_retries(loop.children[0], loop.max_loops, c))
+
+    def evaluate_ifelse(self, ifelse: IfElse, c: Context = None) -> Batch:
+        test_success, duration = yield ifelse.children[0]
+        success = np.zeros(self.n, dtype=bool)
+        for branch, positions in [
+            (ifelse.children[1], np.flatnonzero(test_success)),
+            (ifelse.children[2], np.flatnonzero(~test_success))
+        ]:
+            if len(positions) == 0:
+                continue
+            branch_success, branch_duration = yield from self.evaluate_subset(branch, positions, c)
+            success[positions] = branch_success
+            duration[positions] += branch_duration
+        return success, duration
+
+    def evaluate_fail(self, failure: Fail, c: Context = None) -> Batch:
+        return self.empty()
+
+    def evaluate_optional(self, opt: Optional, c: Context = None) -> Batch:
+        _, duration = yield opt.children[0]
+        return np.ones(self.n, dtype=bool), duration
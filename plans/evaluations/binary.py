@@ -0,0 +1,373 @@
+
+import io
+import struct
+from typing import BinaryIO, Dict, List, Tuple, Union
+
+from plans.plan import Action, Alternatives, Choices, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Event, History
+from plans.math import IntDist, Constant, UniformRange, DistributionSum
+from plans.outcomes import Status
+
+# A compact, versioned binary format for plans (and, optionally, one History of
+# the plan).  The layout is
+#
+#   header:   MAGIC, then the format VERSION as a little-endian uint16 and a
+#             reserved uint16
+#   sections: any number of (4-byte tag, uint64 length, payload), in the order
+#             STRS, DIST, NODE and optionally EVTS
+#
+# STRS is a string table -- a uint32 count, count + 1 uint32 offsets into the
+# UTF-8 blob that follows, and the blob -- holding every name and description
+# once.  DIST is a table of packed IntDist descriptors (kind, a, b), with the
+# operands of a DistributionSum coming before it.  NODE is the plan tree in
+# pre-order, as fixed-size records carrying the size of each node's subtree, so
+# a reader can skip over (or seek straight to) any subtree.  A Plan object that
+# appears more than once is written in full only the first time, and as a REF
+# record after that.  EVTS holds the events of a History, each naming its plan
+# by NODE index, with the top-level event first.
+
+MAGIC = b'PLNB'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHH')
+SECTION = struct.Struct('<4sQ')
+# kind, child count, subtree size, name, description, duration, success
+# probability, and max_loops (for a Loop) or the referenced node (for a REF)
+NODE = struct.Struct('<BIIiiidq')
+DIST = struct.Struct('<Bqq')
+EVENT = struct.Struct('<IqqB')
+COUNT = struct.Struct('<I')
+
+PLAN_TYPES = [
+    'Action', 'Steps', 'Requirements', 'Options', 'Alternatives',
+    'Ensure', 'Loop', 'IfElse', 'Fail', 'Optional', 'Choices'
+]
+PLAN_KINDS = {t: k for k, t in enumerate(PLAN_TYPES)}
+REF = 255
+
+CONSTANT, UNIFORM_RANGE, DISTRIBUTION_SUM = 0, 1, 2
+
+def serialize_binary(plan: Plan, history: History = None) -> bytes:
+    out = io.BytesIO()
+    write_binary(plan, out, history)
+    return out.getvalue()
+
+def deserialize_binary(data: Union[bytes, BinaryIO]) -> Plan:
+    return BinaryPlanReader(data).load()
+
+def deserialize_binary_history(data: Union[bytes, BinaryIO]) -> History:
+    return BinaryPlanReader(data).load_history()
+
+def write_binary(plan: Plan, out: BinaryIO, history: History = None):
+    """Writes plan (and the history, if given -- which must be a history of events
+    of plan and its descendants) to a binary file"""
+    writer = BinaryPlanWriter()
+    writer.add_plan(plan)
+    if history is not None:
+        writer.add_history(history)
+    writer.write(out)
+
+class BinaryPlanWriter:
+
+    """Builds the sections of the binary format, walking the plan tree with an
+    explicit stack rather than recursing"""
+
+    strings: List[str]
+    string_index: Dict[str, int]
+    dists: List[Tuple[int, int, int]]
+    dist_index: Dict[Tuple[int, int, int], int]
+    nodes: List[list]
+    node_index: Dict[str, int]
+    events: List[Tuple[int, int, int, int]]
+
+    def __init__(self):
+        self.strings = []
+        self.string_index = {}
+        self.dists = []
+        self.dist_index = {}
+        self.nodes = []
+        self.node_index = {}
+        self.events = None
+
+    def add_string(self, s: str) -> int:
+        if s is None:
+            return -1
+        if s not in self.string_index:
+            self.string_index[s] = len(self.strings)
+            self.strings.append(s)
+        return self.string_index[s]
+
+    def add_dist(self, dist: IntDist) -> int:
+        stack = [(dist, False)]
+        indices: List[int] = []
+        while stack:
+            d, expanded = stack.pop()
+            if isinstance(d, Constant):
+                record = (CONSTANT, d.value, 0)
+            elif isinstance(d, UniformRange):
+                record = (UNIFORM_RANGE, d.lower_value, d.upper_value)
+            elif isinstance(d, DistributionSum):
+                if not expanded:
+                    stack.extend([(d, True), (d.right, False), (d.left, False)])
+                    continue
+                right = indices.pop()
+                left = indices.pop()
+                record = (DISTRIBUTION_SUM, left, right)
+            else:
+                raise ValueError(f"Can't serialize a duration of type {type(d).__name__}")
+            if record not in self.dist_index:
+                self.dist_index[record] = len(self.dists)
+                self.dists.append(record)
+            indices.append(self.dist_index[record])
+        return indices[0]
+
+    def add_plan(self, plan: Plan):
+        # entries are (plan, None) to write a node, or (None, record) to fill in
+        # a node's subtree size once all of its descendants are written
+        stack = [(plan, None)]
+        while stack:
+            p, pending = stack.pop()
+            if p is None:
+                pending[2] = len(self.nodes) - pending[2]
+                continue
+            if p.id in self.node_index:
+                self.nodes.append([REF, 0, 1, -1, -1, -1, 0.0, self.node_index[p.id]])
+                continue
+            if p.plan_type not in PLAN_KINDS:
+                raise ValueError(f"Can't serialize a plan of type {p.plan_type}")
+            self.node_index[p.id] = len(self.nodes)
+            record = [PLAN_KINDS[p.plan_type], len(p.children), len(self.nodes), self.add_string(p.name), -1, -1, 0.0, 0]
+            if isinstance(p, Action):
+                record[4] = self.add_string(p.description)
+                record[5] = self.add_dist(p.duration)
+                record[6] = p.success_prob
+            elif isinstance(p, Loop):
+                record[7] = p.max_loops
+            self.nodes.append(record)
+            stack.append((None, record))
+            stack.extend((c, None) for c in reversed(p.children))
+
+    def add_history(self, history: History):
+        events = [history.result] + history.events
+        try:
+            self.events = [
+                (self.node_index[e.plan.id], e.start_time, e.end_time, int(e.status == Status.SUCCESS))
+                for e in events
+            ]
+        except KeyError as e:
+            raise ValueError(f"History contains an event for a plan outside the serialized plan") from e
+
+    def write(self, out: BinaryIO):
+        out.write(HEADER.pack(MAGIC, VERSION, 0))
+
+        encoded = [s.encode('utf-8') for s in self.strings]
+        offsets = [0]
+        for s in encoded:
+            offsets.append(offsets[-1] + len(s))
+        self.write_section(out, b'STRS', b''.join([
+            COUNT.pack(len(encoded)),
+            struct.pack(f'<{len(offsets)}I', *offsets),
+        ] + encoded))
+
+        self.write_section(out, b'DIST', b''.join(DIST.pack(*d) for d in self.dists))
+        self.write_section(out, b'NODE', b''.join(NODE.pack(*n) for n in self.nodes))
+        if self.events is not None:
+            self.write_section(out, b'EVTS', b''.join(EVENT.pack(*e) for e in self.events))
+
+    def write_section(self, out: BinaryIO, tag: bytes, payload: bytes):
+        out.write(SECTION.pack(tag, len(payload)))
+        out.write(payload)
+
+class BinaryPlanReader:
+
+    """Reads the binary format from bytes or a seekable binary file.  Opening a
+    reader only reads the header and the section headers; node records, strings
+    and durations are read on demand, so load_subtree(i) touches only the part of
+    the file that describes node i and its descendants (plus the nodes of any
+    shared plans it refers to).
+
+    Nodes are numbered in pre-order, with the root at 0.
+    """
+
+    source: BinaryIO
+    version: int
+    sections: Dict[bytes, Tuple[int, int]]
+
+    def __init__(self, source: Union[bytes, BinaryIO]):
+        self.source = io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+        self.base = self.source.tell()
+        magic, self.version, _ = HEADER.unpack(self.read(0, HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("Not a binary plan file")
+        if self.version > VERSION:
+            raise ValueError(f"Unsupported binary plan format version {self.version}")
+        self.sections = {}
+        position = HEADER.size
+        while True:
+            header = self.read(position, SECTION.size)
+            if len(header) < SECTION.size:
+                break
+            tag, length = SECTION.unpack(header)
+            self.sections[tag] = (position + SECTION.size, length)
+            position += SECTION.size + length
+        for tag in (b'STRS', b'DIST', b'NODE'):
+            if tag not in self.sections:
+                raise ValueError(f"Binary plan file is missing its {tag.decode()} section")
+        self._string_count = COUNT.unpack(self.read(self.sections[b'STRS'][0], COUNT.size))[0]
+        self._strings: Dict[int, str] = {}
+        self._dists: List[IntDist] = None
+
+    def read(self, offset: int, size: int) -> bytes:
+        self.source.seek(self.base + offset)
+        return self.source.read(size)
+
+    @property
+    def node_count(self) -> int:
+        return self.sections[b'NODE'][1] // NODE.size
+
+    @property
+    def has_history(self) -> bool:
+        return b'EVTS' in self.sections
+
+    def node_records(self, start: int, count: int) -> List[tuple]:
+        if start < 0 or start + count > self.node_count:
+            raise IndexError(f"Node range [{start}, {start + count}) is outside the plan")
+        offset = self.sections[b'NODE'][0] + start * NODE.size
+        return list(NODE.iter_unpack(self.read(offset, count * NODE.size)))
+
+    def node_record(self, i: int) -> tuple:
+        return self.node_records(i, 1)[0]
+
+    def subtree_size(self, i: int) -> int:
+        return self.node_record(i)[2]
+
+    def plan_type(self, i: int) -> str:
+        kind = self.node_record(i)[0]
+        return 'Ref' if kind == REF else PLAN_TYPES[kind]
+
+    def name(self, i: int) -> str:
+        return self.string(self.node_record(i)[3])
+
+    def children(self, i: int) -> List[int]:
+        """The node indices of the children of node i, found by skipping over
+        each child's subtree"""
+        count = self.node_record(i)[1]
+        indices = []
+        j = i + 1
+        for _ in range(count):
+            indices.append(j)
+            j += self.subtree_size(j)
+        return indices
+
+    def string(self, k: int) -> str:
+        if k < 0:
+            return None
+        if k not in self._strings:
+            if k >= self._string_count:
+                raise IndexError(f"String {k} is outside the string table")
+            table = self.sections[b'STRS'][0] + COUNT.size
+            start, end = struct.unpack('<2I', self.read(table + 4 * k, 8))
+            blob = table + 4 * (self._string_count + 1)
+            self._strings[k] = self.read(blob + start, end - start).decode('utf-8')
+        return self._strings[k]
+
+    def load_strings(self):
+        """Reads the whole string table at once"""
+        offset, length = self.sections[b'STRS']
+        data = self.read(offset, length)
+        n = self._string_count
+        offsets = struct.unpack_from(f'<{n + 1}I', data, COUNT.size)
+        blob = COUNT.size + 4 * (n + 1)
+        for k in range(n):
+            if k not in self._strings:
+                self._strings[k] = data[blob + offsets[k]:blob + offsets[k + 1]].decode('utf-8')
+
+    def dist(self, k: int) -> IntDist:
+        if self._dists is None:
+            self._dists = []
+            for kind, a, b in DIST.iter_unpack(self.read(*self.sections[b'DIST'])):
+                if kind == CONSTANT:
+                    self._dists.append(Constant(a))
+                elif kind == UNIFORM_RANGE:
+                    self._dists.append(UniformRange(a, b))
+                elif kind == DISTRIBUTION_SUM:
+                    self._dists.append(DistributionSum(self._dists[a], self._dists[b]))
+                else:
+                    raise ValueError(f"Unknown duration kind {kind}")
+        return self._dists[k]
+
+    def load(self) -> Plan:
+        self.load_strings()
+        return self.load_subtree(0)
+
+    def load_subtree(self, i: int, built: Dict[int, Plan] = None) -> Plan:
+        """Builds the plan at node i, reading only the records of its subtree"""
+        built = {} if built is None else built
+        if i in built:
+            return built[i]
+        records = self.node_records(i, self.node_record(i)[2])
+        # frames are [node index, record, children built so far]
+        stack: List[list] = []
+        result = None
+        for offset, record in enumerate(records):
+            j = i + offset
+            if record[0] == REF:
+                target = record[7]
+                plan = built[target] if target in built else self.load_subtree(target, built)
+            elif record[1] > 0:
+                stack.append([j, record, []])
+                continue
+            else:
+                plan = self.make_plan(j, record, [], built)
+            while True:
+                if not stack:
+                    result = plan
+                    break
+                frame = stack[-1]
+                frame[2].append(plan)
+                if len(frame[2]) < frame[1][1]:
+                    break
+                stack.pop()
+                plan = self.make_plan(frame[0], frame[1], frame[2], built)
+        return result
+
+    def make_plan(self, j: int, record: tuple, children: List[Plan], built: Dict[int, Plan]) -> Plan:
+        kind, _, _, name, description, duration, success_prob, max_loops = record
+        t = PLAN_TYPES[kind]
+        name = self.string(name)
+        if t == 'Action':
+            plan = Action(name, self.string(description), success_prob, self.dist(duration))
+        elif t == 'Steps':
+            plan = Steps(name, *children)
+        elif t == 'Requirements':
+            plan = Requirements(name, *children)
+        elif t == 'Options':
+            plan = Options(name, *children)
+        elif t == 'Alternatives':
+            plan = Alternatives(name, *children)
+        elif t == 'Choices':
+            plan = Choices(name, *children)
+        elif t == 'Ensure':
+            plan = Ensure(children[0], name=name)
+        elif t == 'Loop':
+            plan = Loop(children[0], max_loops, name=name)
+        elif t == 'Optional':
+            plan = Optional(children[0], name=name)
+        elif t == 'IfElse':
+            plan = IfElse(children[0], children[1], children[2], name=name)
+        else:
+            plan = Fail()
+        built[j] = plan
+        return plan
+
+    def load_history(self) -> History:
+        """Builds the plan, and the History stored with it"""
+        if not self.has_history:
+            raise ValueError("Binary plan file has no history")
+        built: Dict[int, Plan] = {}
+        self.load_strings()
+        self.load_subtree(0, built)
+        events = [
+            Event.complete(built[node], start, end, Status.SUCCESS if status else Status.FAILURE)
+            for node, start, end, status in EVENT.iter_unpack(self.read(*self.sections[b'EVTS']))
+        ]
+        return History(events[0], *events[1:])
@@ -0,0 +1,99 @@
+from statistics import NormalDist
+from typing import Callable, List
+
+import numpy as np
+
+from plans.plan import Action, Plan
+from plans.context import Context
+from .batch import BatchOutcomeSampler
+from .draws import CommonDraws
+
+def compare_plans(
+    *plans: Plan, n: int = 10000, seed: int = None, key: Callable[[Action], str] = None,
+    confidence: float = 0.95
+) -> 'PlanComparison':
+    """Samples n outcomes of each of the given plans, driving them all from the same
+    random streams (see CommonDraws) -- so that the differences between the plans'
+    success rates and durations are estimated from paired samples, and need far
+    fewer samples to resolve than independent runs of each plan would."""
+    if len(plans) == 0:
+        raise ValueError("compare_plans needs at least one plan")
+    if n <= 1:
+        raise ValueError(f"n {n} must be at least 2")
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy)
+    statuses, durations = [], []
+    for p in plans:
+        v = BatchOutcomeSampler(np.arange(n), draws=CommonDraws(n, seed, key))
+        s, d = v.evaluate_plan(p, Context())
+        statuses.append(s)
+        durations.append(d)
+    return PlanComparison(list(plans), np.stack(statuses), np.stack(durations), confidence)
+
+class Difference:
+
+    """An estimate of the mean difference between two plans in some measure, with
+    its standard error and confidence interval"""
+
+    estimate: float
+    stderr: float
+    low: float
+    high: float
+
+    def __init__(self, estimate: float, stderr: float, low: float, high: float):
+        self.estimate = estimate
+        self.stderr = stderr
+        self.low = low
+        self.high = high
+
+    def __repr__(self):
+        return f"Difference({self.estimate:.4g}, [{self.low:.4g}, {self.high:.4g}])"
+
+class PlanComparison:
+
+    """Paired samples of the outcomes of several plans: 'statuses' and 'durations'
+    are (plans, n) arrays, and column i holds the outcomes of every plan under the
+    same random draws.  Differences are taken between plan i and plan j (by
+    default the first plan, as a baseline), with normal-approximation confidence
+    intervals at the given 'confidence' level.
+    """
+
+    plans: List[Plan]
+    statuses: np.ndarray
+    durations: np.ndarray
+    confidence: float
+
+    def __init__(self, plans: List[Plan], statuses: np.ndarray, durations: np.ndarray, confidence: float = 0.95):
+        if not 0.0 < confidence < 1.0:
+            raise ValueError(f"confidence {confidence} must be between 0 and 1")
+        self.plans = plans
+        self.statuses = statuses
+        self.durations = durations
+        self.confidence = confidence
+
+    @property
+    def n(self) -> int: return self.statuses.shape[1]
+
+    @property
+    def success_rates(self) -> np.ndarray: return self.statuses.mean(axis=1)
+
+    @property
+    def mean_durations(self) -> np.ndarray: return self.durations.mean(axis=1)
+
+    def success_difference(self, i: int, j: int = 0) -> Difference:
+        """The success rate of plan i, less that of plan j"""
+        return self._difference(self.statuses.astype(np.float64), i, j)
+
+    def duration_difference(self, i: int, j: int = 0) -> Difference:
+        """The mean duration of plan i, less that of plan j"""
+        return self._difference(self.durations.astype(np.float64), i, j)
+
+    def _difference(self, values: np.ndarray, i: int, j: int) -> Difference:
+        d = values[i] - values[j]
+        estimate = float(d.mean())
+        stderr = float(d.std(ddof=1) / np.sqrt(self.n))
+        z = NormalDist().inv_cdf((1.0 + self.confidence) / 2.0)
+        return Difference(estimate, stderr, estimate - z * stderr, estimate + z * stderr)
+
+    def __repr__(self):
+        return f"PlanComparison(success_rates={self.success_rates}, mean_durations={self.mean_durations})"
@@ -0,0 +1,290 @@
+
+from typing import List, Tuple
+from random import Random
+
+import numpy as np
+
+from plans.compiled import CompiledPlan, NodeKind, DurationKind
+from plans.columnar import ColumnarHistory
+from plans.plan import Event, History
+from plans.outcomes import Outcome, Status
+
+# Evaluators over a CompiledPlan.  The deterministic evaluations are a single
+# loop over the nodes in post-order; the samplers run an explicit stack of
+# frames instead of recursing through Plan.evaluate.
+
+ACTION = int(NodeKind.ACTION)
+STEPS = int(NodeKind.STEPS)
+REQUIREMENTS = int(NodeKind.REQUIREMENTS)
+OPTIONS = int(NodeKind.OPTIONS)
+ALTERNATIVES = int(NodeKind.ALTERNATIVES)
+ENSURE = int(NodeKind.ENSURE)
+LOOP = int(NodeKind.LOOP)
+IFELSE = int(NodeKind.IFELSE)
+FAIL = int(NodeKind.FAIL)
+OPTIONAL = int(NodeKind.OPTIONAL)
+
+# A sampled event, as (node index, start time, end time, success)
+Record = Tuple[int, int, int, bool]
+
+def success_probabilities(cp: CompiledPlan) -> np.ndarray:
+    """The success probability of every node of the compiled plan"""
+    kinds = cp.kind.tolist()
+    offsets = cp.child_offset.tolist()
+    counts = cp.child_count.tolist()
+    children = cp.children.tolist()
+    prob = cp.success_prob.tolist()
+    loops = cp.max_loops.tolist()
+    values = [0.0] * len(kinds)
+    for i, k in enumerate(kinds):
+        cs = children[offsets[i]:offsets[i] + counts[i]]
+        if k == ACTION:
+            v = prob[i]
+        elif k == STEPS or k == REQUIREMENTS:
+            v = 1.0
+            for j in cs: v *= values[j]
+        elif k == OPTIONS or k == ALTERNATIVES:
+            v = 1.0
+            for j in cs: v *= 1.0 - values[j]
+            v = 1.0 - v
+        elif k == ENSURE:
+            if values[cs[0]] <= 0.0:
+                raise ValueError("Cannot ENSURE the execution of a child plan with a 0 success probability")
+            v = 1.0
+        elif k == LOOP:
+            v = 1.0 - (1.0 - values[cs[0]]) ** loops[i]
+        elif k == IFELSE:
+            t = values[cs[0]]
+            v = t * values[cs[1]] + (1.0 - t) * values[cs[2]]
+        elif k == FAIL:
+            v = 0.0
+        else:
+            v = 1.0
+        values[i] = v
+    return np.array(values)
+
+def compiled_success_probability(cp: CompiledPlan) -> float:
+    return float(success_probabilities(cp)[cp.root])
+
+def max_durations(cp: CompiledPlan) -> List[int]:
+    """The maximum duration of every node of the compiled plan, with None for
+    nodes whose duration is unbounded -- matches MaxDurationEvaluator"""
+    kinds = cp.kind.tolist()
+    offsets = cp.child_offset.tolist()
+    counts = cp.child_count.tolist()
+    children = cp.children.tolist()
+    loops = cp.max_loops.tolist()
+    dkinds = cp.duration_kind.tolist()
+    highs = cp.duration_high.tolist()
+    probs = None
+    values: List[int] = [None] * len(kinds)
+    for i, k in enumerate(kinds):
+        cs = [values[j] for j in children[offsets[i]:offsets[i] + counts[i]]]
+        if k == ACTION:
+            v = highs[i] if dkinds[i] != DurationKind.OTHER else cp.plans[i].duration.max_value()
+        elif k == FAIL:
+            v = 0
+        elif None in cs:
+            v = None
+        elif k == STEPS or k == OPTIONS or k == ALTERNATIVES:
+            v = sum(cs)
+        elif k == REQUIREMENTS:
+            v = max(cs)
+        elif k == ENSURE:
+            if probs is None: probs = success_probabilities(cp)
+            v = cs[0] if probs[children[offsets[i]]] >= 1.0 else None
+        elif k == LOOP:
+            v = cs[0] * loops[i]
+        elif k == IFELSE:
+            v = cs[0] + max(cs[1], cs[2])
+        else:
+            v = cs[0]
+        values[i] = v
+    return values
+
+def compiled_max_duration(cp: CompiledPlan) -> int:
+    return max_durations(cp)[cp.root]
+
+class CompiledSampler:
+
+    """Samples outcomes and histories of a CompiledPlan with an explicit stack of
+    frames, one per running node.  Random draws happen in the same order as in
+    OutcomeSampler and HistorySampler, so a sampler seeded with the same Random
+    reproduces their results.
+    """
+
+    cp: CompiledPlan
+    rand: Random
+
+    def __init__(self, cp: CompiledPlan, rand: Random = None):
+        self.cp = cp
+        self.rand = rand or Random()
+        self._kinds = cp.kind.tolist()
+        self._offsets = cp.child_offset.tolist()
+        self._counts = cp.child_count.tolist()
+        self._children = cp.children.tolist()
+        self._prob = cp.success_prob.tolist()
+        self._dkinds = cp.duration_kind.tolist()
+        self._lows = cp.duration_low.tolist()
+        self._highs = cp.duration_high.tolist()
+        self._loops = cp.max_loops.tolist()
+
+    def run(self, start_time: int = 0, records: List[Record] = None) -> Tuple[bool, int]:
+        """Runs one execution of the plan from start_time, returning (success,
+        end time).  If a 'records' list is given, every event is appended to it,
+        children before their parents."""
+        kinds, offsets, counts, children = self._kinds, self._offsets, self._counts, self._children
+        rand = self.rand
+        # frame: [node, position, start, time, status, best, mark]
+        root = self.cp.root
+        stack = [[root, 0, start_time, start_time, True, None, 0]]
+        result = None
+        while stack:
+            f = stack[-1]
+            node = f[0]
+            k = kinds[node]
+            push = -1
+            done = False
+
+            if k == ACTION:
+                status = rand.random() <= self._prob[node]
+                dk = self._dkinds[node]
+                if dk == DurationKind.CONSTANT:
+                    d = self._lows[node]
+                elif dk == DurationKind.UNIFORM:
+                    d = rand.randint(self._lows[node], self._highs[node])
+                else:
+                    d = self.cp.plans[node].duration.sample(rand)
+                f[3] = f[2] + d
+                f[4] = status
+                done = True
+
+            elif k == STEPS or k == OPTIONS:
+                stop_on = k == OPTIONS
+                if result is not None:
+                    f[3] = result[1]
+                    if result[0] == stop_on:
+                        f[4] = stop_on
+                        done = True
+                if not done:
+                    if f[1] == counts[node]:
+                        f[4] = not stop_on
+                        done = True
+                    else:
+                        push = children[offsets[node] + f[1]]
+                        f[1] += 1
+
+            elif k == REQUIREMENTS or k == ALTERNATIVES:
+                resolve_on = k == ALTERNATIVES
+                if result is not None:
+                    # f[5] is the earliest end of a child with status 'resolve_on',
+                    # f[3] the latest end of any child
+                    if result[0] == resolve_on and (f[5] is None or result[1] < f[5]):
+                        f[5] = result[1]
+                    if result[1] > f[3]:
+                        f[3] = result[1]
+                if f[1] == counts[node]:
+                    if f[5] is not None:
+                        f[3] = f[5]
+                        f[4] = resolve_on
+                        if records is not None:
+                            _abort(records, f[6], f[5])
+                    else:
+                        f[4] = not resolve_on
+                    done = True
+                else:
+                    push = children[offsets[node] + f[1]]
+                    f[1] += 1
+
+            elif k == ENSURE or k == LOOP:
+                if result is not None:
+                    f[3] = result[1]
+                    if result[0]:
+                        f[4] = True
+                        done = True
+                    elif k == LOOP and f[1] >= self._loops[node]:
+                        f[4] = False
+                        done = True
+                if not done:
+                    if k == LOOP and self._loops[node] <= 0:
+                        f[4] = False
+                        done = True
+                    else:
+                        push = children[offsets[node]]
+                        f[1] += 1
+
+            elif k == IFELSE:
+                if f[1] == 0:
+                    push = children[offsets[node]]
+                    f[1] = 1
+                elif f[1] == 1:
+                    f[3] = result[1]
+                    push = children[offsets[node] + (1 if result[0] else 2)]
+                    f[1] = 2
+                else:
+                    f[3] = result[1]
+                    f[4] = result[0]
+                    done = True
+
+            elif k == FAIL:
+                f[4] = False
+                done = True
+
+            else:
+                if result is None:
+                    push = children[offsets[node]]
+                else:
+                    f[3] = result[1]
+                    f[4] = True
+                    done = True
+
+            if done:
+                stack.pop()
+                if records is not None:
+                    records.append((node, f[2], f[3], f[4]))
+                result = (f[4], f[3])
+            else:
+                child_start = f[2] if (k == REQUIREMENTS or k == ALTERNATIVES) else f[3]
+                mark = len(records) if records is not None else 0
+                stack.append([push, 0, child_start, child_start, True, None, mark])
+                result = None
+        return result
+
+    def sample_outcome(self) -> Outcome:
+        status, end = self.run()
+        return Outcome(Status.SUCCESS if status else Status.FAILURE, end)
+
+    def sample_records(self, start_time: int = 0) -> List[Record]:
+        records: List[Record] = []
+        self.run(start_time, records)
+        return records
+
+    def sample_history(self, start_time: int = 0) -> History:
+        return self.history_from_records(self.sample_records(start_time))
+
+    def sample_columnar_history(self, start_time: int = 0) -> ColumnarHistory:
+        return ColumnarHistory.from_records(self.cp, self.sample_records(start_time))
+
+    def history_from_records(self, records: List[Record]) -> History:
+        plans = self.cp.plans
+        events = [
+            Event.complete(plans[node], start, end, Status.SUCCESS if status else Status.FAILURE)
+            for node, start, end, status in records
+        ]
+        return History(events[-1], *events[:-1])
+
+def _abort(records: List[Record], mark: int, abort_end: int):
+    """Aborts the events recorded since 'mark' at the time abort_end, as
+    History.with_abortable_children does"""
+    aborted = [
+        (node, start, min(end, abort_end), status if end <= abort_end else False)
+        for node, start, end, status in records[mark:] if start <= abort_end
+    ]
+    del records[mark:]
+    records.extend(aborted)
+
+def compiled_average_duration(cp: CompiledPlan, n: int = 100, rand: Random = None) -> float:
+    if n <= 0:
+        raise ValueError(f"n {n} cannot be zero or negative")
+    sampler = CompiledSampler(cp, rand)
+    return sum(sampler.run()[1] for i in range(n)) / n
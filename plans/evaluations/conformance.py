@@ -0,0 +1,812 @@
+
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heappop, heappush
+from typing import Dict, Iterable, List, Tuple, Union
+
+from plans.plan import Plan, Event, History
+from plans.compiled import CompiledPlan, compile_plan
+from .streaming import replay_history
+from .compiled import (
+    ACTION, STEPS, REQUIREMENTS, OPTIONS, ALTERNATIVES, ENSURE, LOOP, IFELSE, FAIL
+)
+
+# events per shard, when checking is split across workers
+SHARD_SIZE = 50000
+
+# Conformance of traces to plans.  A trace is a stream of Events in order of
+# their end times, as iter_events produces them; events which end at the same
+# time may come in any order, so long as children come before their parents.
+# The checker runs the plan alongside the trace,
+# the way EventSimulator does, with one frame per running node: an event must
+# complete a running node, and a compound node's event must match the status
+# and end time which its children's events decide.  Memory is bounded by the
+# number of nodes running at once (plus the events of one end time).
+#
+# When Requirements fail (or Alternatives succeed) early, the children still
+# running are aborted, and their events all end at that time.  An aborted node
+# fails, unless it finished at that very time anyway -- and the children which
+# an aborted Steps (etc.) starts at the abort time may or may not appear, since
+# EventSimulator and HistorySampler break that tie differently.
+#
+# Ties can arrive out of the order they happened in, and the events of nodes
+# which can run more than once at a time (beneath a Loop or an Ensure, or in
+# several places) can belong to more than one running frame.  Such events are
+# held until every event of their end time is in, and then matched in a fixed
+# order -- by their start times, and for each held Action event, to the frame
+# and status which fit the other held events best, judged by walking up
+# through the frames it would end (so each costs O(depth)): a match which lets
+# a frame whose event is held end comes first, then one which starts plans
+# with events held, then one which leaves its parent waiting; among equals,
+# the frame which started first, as EventSimulator completes them.  Compound
+# events go to whichever frame they fit once its children are matched (a
+# frame which would leave the held events of its optional children behind
+# waits until nothing else can be matched), and the frames of alike plans
+# (the same kind of plan over the same children, e.g. several Steps of one
+# shared action beneath a Requirements) which started together trade places
+# when an event fits the other's: their runs only differ in which of them
+# made them.  Histories are checked in an order EventSimulator could have
+# emitted their events in.  Action durations and statuses are not checked
+# against their distributions.
+
+def check_trace(p: Plan, events: Iterable[Event], start_time: int = None) -> 'Violation':
+    """The first event of the trace which does not fit an execution of p, or
+    None if the trace is a complete execution of p"""
+    return ConformanceChecker(p).check(events, start_time)
+
+def check_history(p: Plan, history: History) -> 'Violation':
+    # in an order EventSimulator could have completed the events in
+    return ConformanceChecker(p).check(replay_history(history), history.start_time)
+
+def check_traces(
+    p: Plan, traces: Iterable[Iterable[Event]], workers: int = None
+) -> List['Violation']:
+    """Checks many traces of p, in shards spread across 'workers' processes,
+    returning the first violation of each trace (or None where it conforms)"""
+    checker = ConformanceChecker(p)
+    traces = [list(trace) for trace in traces]
+    if workers is None or workers <= 1 or sum(len(trace) for trace in traces) <= SHARD_SIZE:
+        return [checker.check(trace) for trace in traces]
+    # workers get plain records, and the violations are rebuilt around the
+    # calling process's own Events
+    index = checker.cp.index
+    shards = [[]]
+    size = 0
+    for trace in traces:
+        if size >= SHARD_SIZE:
+            shards.append([])
+            size = 0
+        shards[-1].append([
+            (index.get(e.plan.id, -1), e.start_time, e.end_time, bool(e.status)) for e in trace
+        ])
+        size += len(trace)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_check_shard, checker.cp, shard) for shard in shards]
+        found = [v for f in futures for v in f.result()]
+    return [
+        None if v is None else Violation(v[0], trace[v[0]] if v[0] < len(trace) else None, v[1])
+        for trace, v in zip(traces, found)
+    ]
+
+def _check_shard(cp: CompiledPlan, traces: List[List[tuple]]) -> List[Tuple[int, str]]:
+    checker = ConformanceChecker(cp)
+    found = []
+    for records in traces:
+        monitor = checker.monitor()
+        for record in records:
+            if monitor.observe_record(*record) is not None:
+                break
+        v = monitor.finish()
+        found.append(None if v is None else (v.index, v.reason))
+    return found
+
+class Violation:
+
+    """The first event of a trace which does not fit the plan: its position in
+    the trace, and why.  A trace that ends too early has a Violation whose index
+    is the length of the trace, and whose event is None."""
+
+    index: int
+    event: Event
+    reason: str
+
+    def __init__(self, index: int, event: Event, reason: str):
+        self.index = index
+        self.event = event
+        self.reason = reason
+
+    def __repr__(self):
+        return f"Violation({self.index}, {self.event}, {self.reason!r})"
+
+class ConformanceChecker:
+
+    """A plan compiled once for checking any number of traces against it"""
+
+    cp: CompiledPlan
+
+    def __init__(self, plan: Union[Plan, CompiledPlan]):
+        self.cp = plan if isinstance(plan, CompiledPlan) else compile_plan(plan)
+        self.kinds = self.cp.kind.tolist()
+        self.offsets = self.cp.child_offset.tolist()
+        self.counts = self.cp.child_count.tolist()
+        self.children = self.cp.children.tolist()
+        self.loops = self.cp.max_loops.tolist()
+        n = len(self.kinds)
+        # whether a node can run more than once with the same start time: it is
+        # retried, or is beneath a node which is, or appears in several places
+        uses = [0] * n
+        for node in range(n):
+            for child in self.node_children(node):
+                uses[child] += 1
+        self.repeats = [count > 1 for count in uses]
+        for node in reversed(range(n)):
+            retried = self.repeats[node] or self.kinds[node] == LOOP or self.kinds[node] == ENSURE
+            for child in self.node_children(node):
+                self.repeats[child] = self.repeats[child] or retried
+        # the nodes alike each node, itself first: compound plans of the same
+        # kind over the same children, whose frames can trade places
+        groups: Dict[tuple, List[int]] = {}
+        for node in range(n):
+            if self.kinds[node] != ACTION and self.kinds[node] != FAIL:
+                shape = (self.kinds[node], self.loops[node], tuple(self.node_children(node)))
+                groups.setdefault(shape, []).append(node)
+        self.alike = [(node,) for node in range(n)]
+        for nodes in groups.values():
+            for node in nodes if len(nodes) > 1 else ():
+                self.alike[node] = (node,) + tuple(other for other in nodes if other != node)
+
+    def monitor(self, start_time: int = None) -> 'TraceMonitor':
+        return TraceMonitor(self, start_time)
+
+    def check(self, events: Iterable[Event], start_time: int = None) -> Violation:
+        monitor = TraceMonitor(self, start_time)
+        for event in events:
+            if monitor.observe(event) is not None:
+                break
+        return monitor.finish()
+
+    def node_children(self, node: int) -> List[int]:
+        offset = self.offsets[node]
+        return self.children[offset:offset + self.counts[node]]
+
+RUNNING, RESOLVED, CLAIMED = 0, 1, 2
+
+# what a frame does on the event of one of its children
+START, END, WAIT = 0, 1, 2
+
+# how well matching a held Action event to a frame fits the other held events,
+# best first: it lets a frame whose event is held end, starts plans which have
+# events held, leaves a parent waiting for its other children, starts plans
+# which run on past the end time, ends a frame which may go without an event --
+# or ends one whose event is missing, or starts plans beneath one which must end
+SATISFIES, STARTS, WAITS, RUNS_ON, IDLE, CONFLICTS = range(6)
+
+class _Frame:
+
+    """One running occurrence of a plan node"""
+
+    __slots__ = ('node', 'parent', 'start', 'position', 'running', 'state', 'status', 'end', 'aborted_at', 'optional', 'late', 'last')
+
+    def __init__(self, node: int, parent: '_Frame', start: int):
+        self.node = node
+        self.parent = parent
+        self.start = start
+        self.position = 0
+        self.running: List['_Frame'] = []
+        self.state = RUNNING
+        self.status = None
+        self.end = None
+        # the time at which an enclosing parallel plan aborted this frame
+        self.aborted_at = None if parent is None else parent.aborted_at
+        # frames started at the abort time by aborted frames, whose events
+        # may or may not be in the trace
+        self.optional = parent is not None and parent.aborted_at is not None
+        # started beneath a frame which was aborted already -- which
+        # EventSimulator would not have started at all
+        self.late = self.optional
+        # the position in the trace of the latest event within this frame,
+        # which its own event must come after
+        self.last = -1
+
+class TraceMonitor:
+
+    """Checks one trace, an event at a time.  observe() returns the first
+    Violation as soon as the trace is known not to fit (which may be a few
+    events after the violating one, when several events end at the same time),
+    and finish() whether the trace as a whole is a complete execution.
+
+    Without a start_time the plan starts at the earliest start of the events
+    which end first.
+    """
+
+    checker: ConformanceChecker
+    violation: Violation
+
+    def __init__(self, checker: ConformanceChecker, start_time: int = None):
+        self.checker = checker
+        self.violation = None
+        self.count = 0
+        self.time = start_time
+        self.root: _Frame = None
+        # the events of the current end time, by their position in the trace
+        self.recent: Dict[int, Event] = {}
+        # running frames, by (node, start), in the order they started (as the
+        # keys of a dict, so that claiming one takes constant time)
+        self.frames: Dict[Tuple[int, int], Dict[_Frame, None]] = {}
+        # events of the current end time which are not matched yet, by (node, start)
+        self.pending: Dict[Tuple[int, int], List[Tuple[int, int, bool]]] = {}
+        # frames whose events must arrive before the current end time passes
+        self.due = set()
+        self.optional: List[_Frame] = []
+        # nodes aborted at the current end time
+        self.aborted = set()
+        self.ready: List[Tuple[_Frame, int, bool]] = []
+        # compound frames which may fit a held event now
+        self.changed: List[_Frame] = []
+        # the held Action events with frames to match, as (position in the trace
+        # of the first, node, start)
+        self.queue: List[Tuple[int, int, int]] = []
+        self.queued = set()
+        # whether every event of the current end time is in
+        self.settling = False
+        # frames whose events wait on those held for their optional children,
+        # while there are other events to match
+        self.waiting: List[_Frame] = []
+        self.patient = True
+        self.buffered: List[tuple] = []
+        if start_time is not None:
+            self._start(start_time)
+
+    @property
+    def finished(self) -> bool:
+        return self.root is not None and self.root.state == CLAIMED
+
+    def observe(self, event: Event) -> Violation:
+        node = self.checker.cp.index.get(event.plan.id, -1)
+        self.recent[self.count] = event
+        return self.observe_record(node, event.start_time, event.end_time, bool(event.status))
+
+    def observe_record(self, node: int, start: int, end: int, status: bool) -> Violation:
+        """Checks the next event of the trace, given as the index of its node in
+        the compiled plan (or -1 for a plan outside it), its times and status"""
+        index = self.count
+        self.count += 1
+        if self.violation is not None:
+            return self.violation
+        if node < 0:
+            return self._violate(index, "its plan is not part of the plan being checked")
+        if end < start:
+            return self._violate(index, "it ends before it starts")
+        if self.root is None:
+            if self.buffered and end > self.buffered[0][3]:
+                self._start(min(r[2] for r in self.buffered))
+            else:
+                self.buffered.append((index, node, start, end, status))
+                return None
+        return self._observe(index, node, start, end, status)
+
+    def finish(self) -> Violation:
+        """The first violation of the trace, once it has ended"""
+        if self.violation is None and self.root is None and self.buffered:
+            self._start(min(r[2] for r in self.buffered))
+        if self.violation is None:
+            self._close(self.count)
+        if self.violation is None and not self.finished:
+            self._violate(self.count, "the trace ends before the plan completes", None)
+        return self.violation
+
+    # matching
+
+    def _start(self, start_time: int):
+        self.time = start_time
+        self.root = self._spawn(self.checker.cp.root, None, start_time)
+        self._flush()
+        buffered, self.buffered = self.buffered, []
+        for record in buffered:
+            if self._observe(*record) is not None:
+                return
+
+    def _observe(self, index: int, node: int, start: int, end: int, status: bool) -> Violation:
+        if end < self.time:
+            return self._violate(index, f"it ends before the previous event, at {self.time}")
+        if end > self.time:
+            if self._close(index) is not None:
+                return self.violation
+            event = self.recent.pop(index, None)
+            self.recent = {} if event is None else {index: event}
+            self.time = end
+        key = (node, start)
+        self.pending.setdefault(key, []).append((index, end, status))
+        if self.checker.kinds[node] == ACTION:
+            # the event of a node which can run more than once at a time is
+            # held, unless it can only be one frame's -- and so is any event
+            # after one held, to be matched in the order they came in
+            frames = self.frames.get(key, ())
+            if len(frames) == 1 and not self.queue and (not self.checker.repeats[node] or start < end):
+                frame = next(iter(frames))
+                if self._match(frame, end, status):
+                    self._take(key, len(self.pending[key]) - 1, frame)
+                    return None
+            self._enqueue(key)
+        else:
+            for node in self.checker.alike[node]:
+                for frame in list(self.frames.get((node, start), ())):
+                    if self._fill(frame):
+                        return None
+        return None
+
+    def _close(self, index: int) -> Violation:
+        """Matches the held events of the current end time, and checks that
+        everything due at it has happened, before the trace moves past it"""
+        self._settle()
+        if self.pending or self.due:
+            return self._unsettled(index)
+        for frame in self.optional:
+            self._drop(frame)
+        self.optional = []
+        self.aborted = set()
+        return None
+
+    def _unsettled(self, index: int) -> Violation:
+        if self.pending:
+            first = min(index for events in self.pending.values() for index, _, _ in events)
+            return self._violate(first, "it does not complete any running plan")
+        frame = min(self.due, key=lambda f: (f.start, f.node))
+        plan = self.checker.cp.plans[frame.node]
+        return self._violate(index, f"{plan} started at {frame.start} should have ended at {self.time}")
+
+    def _violate(self, index: int, reason: str, event: Event = ...) -> Violation:
+        if event is ...:
+            event = self.recent.get(index)
+        self.violation = Violation(index, event, reason)
+        return self.violation
+
+    def _settle(self):
+        """Matches the held events once all the events of the current end time
+        are in: compound events to the frames they fit, and Action events a key
+        at a time, in order of their starts.  An Action event whose best match
+        only runs on, or ends a frame without an event, waits until nothing
+        else can be matched -- and then so do the frames which would leave
+        events held for their optional children behind."""
+        self.settling = True
+        for key in list(self.pending):
+            if self.checker.kinds[key[0]] == ACTION:
+                self._enqueue(key)
+            else:
+                for node in self.checker.alike[key[0]]:
+                    self.changed.extend(self.frames.get((node, key[1]), ()))
+        self._flush()
+        later: List[Tuple[int, int, int]] = []
+        while True:
+            while self.queue or later:
+                waited = not self.queue
+                entry = heappop(later if waited else self.queue)
+                first, node, start = entry
+                key = (node, start)
+                self.queued.discard(key)
+                if key not in self.pending or key not in self.frames:
+                    continue
+                choice = self._choose(key)
+                if choice is None:
+                    continue
+                fit, frame, status = choice
+                if fit >= RUNS_ON and not waited:
+                    heappush(later, (self.pending[key][0][0], node, start))
+                    continue
+                events = self.pending[key]
+                self._take(key, next(i for i, event in enumerate(events) if event[2] == status), frame)
+                self._enqueue(key)
+            if not self.waiting:
+                break
+            # the events held for the optional children of the frames which
+            # waited are not theirs after all, but those of plans yet to start
+            self.changed.extend(self.waiting)
+            self.waiting = []
+            self.patient = False
+            self._flush()
+            self.patient = True
+        self._drop_unstarted()
+        self.settling = False
+
+    def _enqueue(self, key: Tuple[int, int]):
+        if key in self.pending and key not in self.queued and key in self.frames:
+            self.queued.add(key)
+            heappush(self.queue, (self.pending[key][0][0],) + key)
+
+    def _choose(self, key: Tuple[int, int]) -> Tuple[int, _Frame, bool]:
+        """The match of a held Action event of key which fits the other held
+        events best: the frame for the event which came first -- or for the
+        first of the other status, if only that one fits.  Of the frames which
+        fit equally well, the first to start -- which EventSimulator would have
+        completed first, too.  None while no frame can have the events yet."""
+        time = self.time
+        events = self.pending[key]
+        frames = [f for f in self.frames[key] if f.aborted_at is None or f.aborted_at == time]
+        if not frames:
+            return CONFLICTS, next(iter(self.frames[key])), events[0][2]
+        best = None
+        for status in (events[0][2], not events[0][2]):
+            index = next((index for index, _, held in events if held == status), None)
+            if index is None:
+                break
+            fitting = [f for f in frames if not f.late or self._before_abort(f, index)]
+            if not fitting:
+                continue
+            fits = [self._order(frame, status, index) for frame in fitting]
+            order = min(fits)
+            if best is None or order < best[0]:
+                best = (order, fitting[fits.index(order)], status)
+            if best[0][0] < RUNS_ON:
+                break
+        if best is None:
+            return None
+        (rank, _), frame, status = best
+        return rank, frame, status
+
+    def _before_abort(self, frame: _Frame, index: int) -> bool:
+        """Whether the event at index comes before any held for the plan whose
+        end aborted a late frame -- as the events of everything it aborted do"""
+        while frame.parent.aborted_at is not None:
+            frame = frame.parent
+        first = self._held(frame.parent, frame.parent.status, -1, False)
+        return first is None or index < first
+
+    def _order(self, frame: _Frame, status: bool, index: int) -> Tuple[int, int]:
+        """How well matching the event at index to an Action's frame fits: its
+        rank, and among the matches which fit, the one borne out soonest"""
+        rank, evidence = self._fit(frame, status, index)
+        if frame.optional and evidence >= self.count:
+            rank = max(rank, IDLE)
+        return (rank if rank >= RUNS_ON else WAITS, evidence)
+
+    def _fit(self, frame: _Frame, status: bool, index: int) -> Tuple[int, int]:
+        """How well ending an Action's frame with status, by the event at index,
+        fits the held events, and the position of the first held event which
+        bears the match out: walks up the frames which would end with it, while
+        their events are held after it, to where the last of them waits or
+        starts a plan.  Since children come before their parents, an event
+        which only comes after one held for an enclosing frame fits badly."""
+        ancestors = []
+        parent = frame.parent
+        while parent is not None:
+            ancestors.append(parent)
+            parent = parent.parent
+        # the first event held for anything above each ancestor
+        bounds = [self.count] * len(ancestors)
+        for i in range(len(ancestors) - 1, 0, -1):
+            first = self._held(ancestors[i], None, index, True)
+            bounds[i - 1] = bounds[i] if first is None else min(bounds[i], first)
+        evidence = None
+        for parent, bound in zip(ancestors, bounds):
+            if parent.state != RUNNING:
+                if evidence is None and parent.state == RESOLVED and frame.aborted_at is not None:
+                    # aborted as its parent ended, the event of which is to come
+                    evidence = self._held(parent, parent.status, index, False)
+                break
+            reaction, value = self._reaction(parent, status)
+            if reaction == WAIT:
+                break
+            if reaction == START:
+                started = self._started(value, index)
+                if started is not None:
+                    return (STARTS, started) if evidence is None else (SATISFIES, evidence)
+                if self._held(parent, None, index, True) is not None:
+                    return CONFLICTS, self.count
+                return (RUNS_ON, self.count) if evidence is None else (SATISFIES, evidence)
+            # an aborted frame has failed, unless it ended before the abort
+            index = self._held(parent, value, index, not status)
+            if index is None:
+                if parent.optional:
+                    return (IDLE, self.count) if evidence is None else (SATISFIES, evidence)
+                return CONFLICTS, self.count
+            if index > bound:
+                return RUNS_ON, self.count
+            if evidence is None:
+                evidence = index
+            status = value
+        return (WAITS, self.count) if evidence is None else (SATISFIES, evidence)
+
+    def _held(self, frame: _Frame, status: bool, after: int, aborted: bool) -> int:
+        """The position of the first event held after 'after' for frame, or a
+        frame alike it, with the given status (any, for None) -- or a failure,
+        if the frame was aborted and 'aborted' allows for that"""
+        first = None
+        aborted = aborted and frame.aborted_at is not None
+        for node in self.checker.alike[frame.node]:
+            for index, _, held in self.pending.get((node, frame.start), ()):
+                if index > after and (status is None or held == status or aborted and not held):
+                    if first is None or index < first:
+                        first = index
+                    break
+        return first
+
+    def _started(self, node: int, index: int) -> int:
+        """The position of the first event held for the plans which starting
+        node now starts, other than the one at index -- after it, if there is
+        one after it"""
+        checker = self.checker
+        pending = self.pending
+        time = self.time
+        first = None
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for held, _, _ in pending.get((node, time), ()):
+                if held > index and (first is None or first >= self.count or held < first):
+                    first = held
+                elif held < index and first is None:
+                    first = self.count
+            kind = checker.kinds[node]
+            children = checker.node_children(node)
+            if kind == REQUIREMENTS or kind == ALTERNATIVES:
+                stack.extend(children)
+            elif children and not (kind == LOOP and checker.loops[node] <= 0):
+                stack.append(children[0])
+        return first
+
+    def _take(self, key: Tuple[int, int], i: int, frame: _Frame):
+        """Matches the i-th held event of key to frame"""
+        events = self.pending[key]
+        index, _, status = events.pop(i)
+        frame.last = index
+        if not events:
+            del self.pending[key]
+            # frames which waited on optional children of key may fit now
+            self.changed.extend(f.parent for f in self.frames.get(key, ()) if f.parent is not None)
+        self._claim(frame, self.time, status)
+        self._flush()
+
+    def _flush(self):
+        while True:
+            self._drain()
+            if not self.changed:
+                return
+            frame = self.changed.pop()
+            if frame.state != CLAIMED:
+                self._fill(frame)
+
+    def _fill(self, frame: _Frame) -> bool:
+        """Matches a held event to a compound frame which it fits now: the first
+        to come after the events within the frame, of its own plan or of one
+        alike it -- whose frame then trades places with this one.  Until every
+        event of the end time is in, only frames with no children running are
+        matched."""
+        if frame.running and not self.settling:
+            return False
+        time = self.time
+        fits = []
+        for node in self.checker.alike[frame.node]:
+            key = (node, frame.start)
+            for index, _, status in self.pending.get(key, ()):
+                if self._match(frame, time, status, index if node == frame.node else None):
+                    fits.append((index < frame.last, index, key))
+        for _, index, key in sorted(fits):
+            if key[0] != frame.node:
+                other = self._counterpart(key, frame)
+                if other is None:
+                    continue
+                self._trade(frame, other)
+                frame = other
+            events = self.pending[key]
+            self._take(key, next(i for i, event in enumerate(events) if event[0] == index), frame)
+            return True
+        return False
+
+    def _counterpart(self, key: Tuple[int, int], frame: _Frame) -> _Frame:
+        """A frame of key which can trade places with frame: running in the
+        same circumstances, and not fitting an event of its own now"""
+        for other in self.frames.get(key, ()):
+            if other.aborted_at == frame.aborted_at and other.optional == frame.optional:
+                return other
+        return None
+
+    def _trade(self, a: _Frame, b: _Frame):
+        """Exchanges what the frames of two alike plans, started at the same
+        time, have run so far"""
+        a.position, b.position = b.position, a.position
+        a.running, b.running = b.running, a.running
+        a.state, b.state = b.state, a.state
+        a.status, b.status = b.status, a.status
+        a.end, b.end = b.end, a.end
+        a.last, b.last = b.last, a.last
+        for child in a.running:
+            child.parent = a
+        for child in b.running:
+            child.parent = b
+        if (a in self.due) != (b in self.due):
+            self.due ^= {a, b}
+
+    def _drop_unstarted(self):
+        """Drops the held events which plans aborted at the current time might
+        have started"""
+        if self.pending and self.aborted:
+            # the nodes which aborted plans could have started at this time
+            below = set(self.aborted)
+            stack = list(below)
+            while stack:
+                for child in self.checker.node_children(stack.pop()):
+                    if child not in below:
+                        below.add(child)
+                        stack.append(child)
+            for key in [k for k in self.pending if k[0] in below and k[1] == self.time]:
+                del self.pending[key]
+
+    def _match(self, frame: _Frame, end: int, status: bool, index: int = None) -> bool:
+        kind = self.checker.kinds[frame.node]
+        if kind == ACTION:
+            return frame.aborted_at is None or end == frame.aborted_at
+        # a compound node ends after all its children, bar optional ones which
+        # have no events held before its own -- and while there are other
+        # events to match, none held at all
+        pending = self.pending
+        for child in frame.running:
+            if not child.optional:
+                return False
+            events = pending.get((child.node, child.start))
+            if events is not None:
+                if index is None or events[0][0] < index:
+                    return False
+                if self.patient:
+                    self.waiting.append(frame)
+                    return False
+        if frame.aborted_at is not None:
+            return end == frame.aborted_at and (
+                not status or (frame.state == RESOLVED and status == frame.status)
+            )
+        return frame.state == RESOLVED and frame.end == end and frame.status == status
+
+    def _claim(self, frame: _Frame, end: int, status: bool):
+        frame.state = CLAIMED
+        self._forget(frame)
+        self.due.discard(frame)
+        self.ready.append((frame, end, status))
+        # children come before their parents, so optional frames still running
+        # beneath this one will have no events
+        stack = list(frame.running)
+        while stack:
+            f = stack.pop()
+            self._drop(f)
+            stack.extend(f.running)
+
+    def _drop(self, frame: _Frame):
+        if frame.state != CLAIMED:
+            frame.state = CLAIMED
+            self._forget(frame)
+
+    def _forget(self, frame: _Frame):
+        key = (frame.node, frame.start)
+        frames = self.frames[key]
+        del frames[frame]
+        if not frames:
+            del self.frames[key]
+
+    def _drain(self):
+        while self.ready:
+            frame, end, status = self.ready.pop()
+            parent = frame.parent
+            if parent is None or parent.state == CLAIMED:
+                continue
+            parent.running.remove(frame)
+            parent.last = max(parent.last, frame.last)
+            if parent.state == RUNNING:
+                self._child_done(parent, end, status)
+            if parent.state != RUNNING or parent.aborted_at is not None:
+                # an aborted frame may end, with a failure, once its children have
+                self.changed.append(parent)
+
+    # frames
+
+    def _spawn(self, node: int, parent: _Frame, start: int) -> _Frame:
+        """Starts a frame for node, and frames for the children that start with it"""
+        checker = self.checker
+        kinds = checker.kinds
+        top = None
+        stack = [(node, parent)]
+        while stack:
+            node, parent = stack.pop()
+            frame = _Frame(node, parent, start)
+            if parent is not None:
+                parent.running.append(frame)
+            if top is None:
+                top = frame
+            self.frames.setdefault((node, start), {})[frame] = None
+            if frame.optional:
+                self.optional.append(frame)
+            kind = kinds[node]
+            if kind == ACTION:
+                self._enqueue((node, start))
+                continue
+            children = checker.node_children(node)
+            if kind == FAIL:
+                self._resolve(frame, False, start)
+            elif kind == STEPS or kind == OPTIONS or kind == REQUIREMENTS or kind == ALTERNATIVES:
+                if not children:
+                    self._resolve(frame, kind == STEPS or kind == REQUIREMENTS or kind == ALTERNATIVES, start)
+                elif kind == STEPS or kind == OPTIONS:
+                    frame.position = 1
+                    stack.append((children[0], frame))
+                else:
+                    frame.position = len(children)
+                    stack.extend((child, frame) for child in reversed(children))
+            elif kind == LOOP and checker.loops[node] <= 0:
+                self._resolve(frame, False, start)
+            else:
+                frame.position = 1 if kind == LOOP else 0
+                stack.append((children[0], frame))
+        return top
+
+    def _resolve(self, frame: _Frame, status: bool, end: int):
+        frame.state = RESOLVED
+        frame.status = status
+        frame.end = end
+        if not frame.optional:
+            self.due.add(frame)
+        self.changed.append(frame)
+
+    def _abort(self, frame: _Frame, time: int):
+        """Aborts everything still running beneath a frame"""
+        stack = list(frame.running)
+        while stack:
+            f = stack.pop()
+            if f.aborted_at is None:
+                f.aborted_at = time
+                self.aborted.add(f.node)
+                if f.start == time:
+                    # started by a tie at the abort time, which may have gone
+                    # either way
+                    f.optional = True
+                    self.due.discard(f)
+                    self.optional.append(f)
+                elif not f.optional:
+                    self.due.add(f)
+                if self.checker.kinds[f.node] == ACTION:
+                    self._enqueue((f.node, f.start))
+                else:
+                    self.changed.append(f)
+            stack.extend(f.running)
+
+    def _reaction(self, frame: _Frame, status: bool) -> Tuple[int, object]:
+        """What a running frame does on the event of one of its children, as
+        EventSimulator does: (START, node), (END, status) or (WAIT, None)"""
+        checker = self.checker
+        kind = checker.kinds[frame.node]
+        children = checker.node_children(frame.node)
+        if kind == STEPS or kind == OPTIONS:
+            stop_on = kind == OPTIONS
+            if status == stop_on:
+                return END, stop_on
+            if frame.position == len(children):
+                return END, not stop_on
+            return START, children[frame.position]
+        if kind == REQUIREMENTS or kind == ALTERNATIVES:
+            resolve_on = kind == ALTERNATIVES
+            if status == resolve_on:
+                return END, resolve_on
+            if frame.position == 1:
+                return END, not resolve_on
+            return WAIT, None
+        if kind == ENSURE:
+            return (END, True) if status else (START, children[0])
+        if kind == LOOP:
+            if status or frame.position >= checker.loops[frame.node]:
+                return END, status
+            return START, children[0]
+        if kind == IFELSE:
+            if frame.position == 0:
+                return START, children[1 if status else 2]
+            return END, status
+        return END, True
+
+    def _child_done(self, frame: _Frame, end: int, status: bool):
+        """Reacts to the event of one of a frame's children"""
+        kind = self.checker.kinds[frame.node]
+        reaction, value = self._reaction(frame, status)
+        if kind == REQUIREMENTS or kind == ALTERNATIVES:
+            frame.position -= 1
+            if status == (kind == ALTERNATIVES):
+                self._abort(frame, end)
+        if reaction == END:
+            self._resolve(frame, value, end)
+        elif reaction == START:
+            if kind != ENSURE:
+                frame.position += 1
+            self._spawn(value, frame, end)
@@ -0,0 +1,208 @@
+
+from typing import List
+
+import numpy as np
+
+from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Fail, MemoizingEvaluator, bottom_up
+from plans.outcomes import Status
+from plans.context import Context
+
+def outcome_distribution(p: Plan) -> 'OutcomeDistribution':
+    v = DistributionEvaluator()
+    c = Context()
+    return v.evaluate_plan(p, c)
+
+def _pad(a: np.ndarray, n: int) -> np.ndarray:
+    if len(a) >= n: return a
+    return np.concatenate([a, np.zeros(n - len(a))])
+
+def _trim(a: np.ndarray) -> np.ndarray:
+    nonzero = np.flatnonzero(a)
+    if len(nonzero) == 0: return np.zeros(1)
+    return a[:nonzero[-1] + 1]
+
+def _point(value: int = 0, mass: float = 1.0) -> np.ndarray:
+    a = np.zeros(value + 1)
+    a[value] = mass
+    return a
+
+def _convolve(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return _trim(np.convolve(a, b))
+
+def _add(*arrays: np.ndarray) -> np.ndarray:
+    n = max(len(a) for a in arrays)
+    return _trim(sum(_pad(a, n) for a in arrays))
+
+class OutcomeDistribution:
+
+    """The exact joint distribution over (Status, duration) of a Plan's outcome,
+    held as two sub-probability mass functions -- 'success[d]' is the probability
+    that the plan succeeds with duration d, and 'failure[d]' the probability that
+    it fails with duration d.
+    """
+
+    success: np.ndarray
+    failure: np.ndarray
+
+    def __init__(self, success: np.ndarray = None, failure: np.ndarray = None):
+        self.success = _trim(success) if success is not None else np.zeros(1)
+        self.failure = _trim(failure) if failure is not None else np.zeros(1)
+
+    def pmf(self, status: Status = None) -> np.ndarray:
+        """The (sub-)probability mass function over durations, for outcomes with the
+        given status -- or for all outcomes, if status is None"""
+        if status == Status.SUCCESS: return self.success
+        if status == Status.FAILURE: return self.failure
+        return _add(self.success, self.failure)
+
+    def cdf(self, status: Status = None) -> np.ndarray:
+        return np.cumsum(self.pmf(status))
+
+    @property
+    def success_probability(self) -> float: return float(self.success.sum())
+
+    @property
+    def failure_probability(self) -> float: return float(self.failure.sum())
+
+    @property
+    def max_duration(self) -> int: return len(self.pmf()) - 1
+
+    def probability(self, status: Status = None) -> float:
+        return float(self.pmf(status).sum())
+
+    def mean(self, status: Status = None) -> float:
+        """Mean duration, conditioned on the status if one is given"""
+        p = self.pmf(status)
+        return float(np.dot(np.arange(len(p)), p) / p.sum())
+
+    def variance(self, status: Status = None) -> float:
+        p = self.pmf(status)
+        d = np.arange(len(p))
+        m = np.dot(d, p) / p.sum()
+        return float(np.dot((d - m) ** 2, p) / p.sum())
+
+    def quantile(self, q: float, status: Status = None) -> int:
+        """The smallest duration d such that P(duration <= d) >= q, conditioned on
+        the status if one is given"""
+        if not 0.0 <= q <= 1.0:
+            raise ValueError(f"quantile {q} must be between 0 and 1")
+        c = self.cdf(status)
+        c = c / c[-1]
+        return int(min(np.searchsorted(c, q - 1e-12), len(c) - 1))
+
+    def probability_within(self, deadline: int, status: Status = None) -> float:
+        """P(duration <= deadline), jointly with the status if one is given"""
+        if deadline < 0: return 0.0
+        c = self.cdf(status)
+        return float(c[min(deadline, len(c) - 1)])
+
+    def __repr__(self):
+        return f"OutcomeDistribution(success={self.success_probability}, mean={self.mean()})"
+
+class DistributionEvaluator(MemoizingEvaluator[OutcomeDistribution]):
+
+    """Computes the exact OutcomeDistribution of a plan, by combining the duration
+    PMFs of its Actions.  The unbounded retries of Ensure are truncated once the
+    probability of still not having succeeded drops below 'tolerance'.  The
+    distributions of shared subtrees are memoized, as by the other
+    MemoizingEvaluators, and must not be modified.
+    """
+
+    tolerance: float
+    max_retries: int
+
+    def __init__(
+        self,
+        tolerance: float = 1e-12,
+        max_retries: int = 100000,
+        max_cache_size: int = 100000,
+        structural: bool = False,
+        shared_only: bool = True
+    ):
+        MemoizingEvaluator.__init__(self, max_cache_size, structural, shared_only)
+        self.tolerance = tolerance
+        self.max_retries = max_retries
+
+    def evaluate_action(self, action: Action, c: Context = None) -> OutcomeDistribution:
+        pmf = action.duration.pmf()
+        if pmf is None:
+            raise ValueError(f"Can't compute the duration distribution of {action}")
+        return OutcomeDistribution(
+            pmf * action.success_prob,
+            pmf * (1.0 - action.success_prob)
+        )
+
+    @bottom_up
+    def evaluate_steps(self, steps: Steps, children: List[OutcomeDistribution], c: Context = None) -> OutcomeDistribution:
+        success, failure = _point(), np.zeros(1)
+        for d in children:
+            failure = _add(failure, _convolve(success, d.failure))
+            success = _convolve(success, d.success)
+        return OutcomeDistribution(success, failure)
+
+    @bottom_up
+    def evaluate_options(self, options: Options, children: List[OutcomeDistribution], c: Context = None) -> OutcomeDistribution:
+        success, failure = np.zeros(1), _point()
+        for d in children:
+            success = _add(success, _convolve(failure, d.success))
+            failure = _convolve(failure, d.failure)
+        return OutcomeDistribution(success, failure)
+
+    @bottom_up
+    def evaluate_requirements(self, reqs: Requirements, children: List[OutcomeDistribution], c: Context = None) -> OutcomeDistribution:
+        # succeeds at the max of the children's durations when all succeed, fails at
+        # the first failure otherwise: P(fail by t) = 1 - prod(1 - P(child fails by t))
+        n = max(max(len(d.success), len(d.failure)) for d in children)
+        success_cdf = np.prod([np.cumsum(_pad(d.success, n)) for d in children], axis=0)
+        not_failed = np.prod([1.0 - np.cumsum(_pad(d.failure, n)) for d in children], axis=0)
+        return OutcomeDistribution(
+            np.diff(success_cdf, prepend=0.0),
+            np.diff(1.0 - not_failed, prepend=0.0)
+        )
+
+    @bottom_up
+    def evaluate_alternatives(self, alternatives: Alternatives, children: List[OutcomeDistribution], c: Context = None) -> OutcomeDistribution:
+        # the mirror image of requirements: succeeds at the first success, fails at
+        # the max of the children's durations when all fail
+        n = max(max(len(d.success), len(d.failure)) for d in children)
+        failure_cdf = np.prod([np.cumsum(_pad(d.failure, n)) for d in children], axis=0)
+        not_succeeded = np.prod([1.0 - np.cumsum(_pad(d.success, n)) for d in children], axis=0)
+        return OutcomeDistribution(
+            np.diff(1.0 - not_succeeded, prepend=0.0),
+            np.diff(failure_cdf, prepend=0.0)
+        )
+
+    def retries(self, d: OutcomeDistribution, max_loops: int, tolerance: float) -> OutcomeDistribution:
+        success, failed_so_far = np.zeros(1), _point()
+        tries = 0
+        while tries < max_loops and failed_so_far.sum() > tolerance:
+            success = _add(success, _convolve(failed_so_far, d.success))
+            failed_so_far = _convolve(failed_so_far, d.failure)
+            tries += 1
+        return OutcomeDistribution(success, failed_so_far)
+
+    @bottom_up
+    def evaluate_ensure(self, ensure: Ensure, children: List[OutcomeDistribution], c: Context = None) -> OutcomeDistribution:
+        child = children[0]
+        if child.success_probability <= 0.0:
+            raise ValueError("Cannot ENSURE the execution of a child plan with a 0 success probability")
+        return OutcomeDistribution(self.retries(child, self.max_retries, self.tolerance).success)
+
+    @bottom_up
+    def evaluate_loop(self, loop: Loop, children: List[OutcomeDistribution], c: Context = None) -> OutcomeDistribution:
+        return self.retries(children[0], loop.max_loops, 0.0)
+
+    @bottom_up
+    def evaluate_ifelse(self, ifelse: IfElse, children: List[OutcomeDistribution], c: Context = None) -> OutcomeDistribution:
+        test, consequent, alternate = children
+        return OutcomeDistribution(
+            _add(_convolve(test.success, consequent.success), _convolve(test.failure, alternate.success)),
+            _add(_convolve(test.success, consequent.failure), _convolve(test.failure, alternate.failure))
+        )
+
+    def evaluate_fail(self, failure: Fail, c: Context = None) -> OutcomeDistribution:
+        return OutcomeDistribution(None, _point())
+
+    @bottom_up
+    def evaluate_optional(self, opt: Optional, children: List[OutcomeDistribution], c: Context = None) -> OutcomeDistribution:
+        return OutcomeDistribution(children[0].pmf())
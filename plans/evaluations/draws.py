@@ -0,0 +1,226 @@
+from hashlib import blake2b
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+from plans.plan import Action
+from plans.math import IntDist
+
+# Where a BatchOutcomeSampler gets the random draws for its Actions.  Each call to
+# sample_action draws outcomes of one Action for the samples in 'index' (indices
+# into the whole batch), as a pair of (status_array, duration_array).
+
+class Draws:
+
+    def sample_action(self, action: Action, index: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        ...
+
+class IndependentDraws(Draws):
+
+    """Fresh, independent draws from a single random generator, for every Action"""
+
+    rng: np.random.Generator
+
+    def __init__(self, rng: np.random.Generator = None):
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def sample_action(self, action: Action, index: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        n = len(index)
+        p = self.rng.random(n)
+        d = action.duration.sample_array(self.rng, n)
+        return p <= action.success_prob, d
+
+def structural_key(action: Action) -> str:
+    return action.structural_digest()
+
+# A counter-based generator: the uniforms of a stream are SplitMix64's outputs
+# from the stream's seed, and the i'th of them can be computed without the others.
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _uniforms(seeds: np.ndarray, samples: np.ndarray) -> np.ndarray:
+    """The uniforms at positions 'samples' of the streams with the given seeds, one
+    row per seed"""
+    counter = samples.astype(np.uint64) + np.uint64(1)
+    x = _mix(seeds[:, None] + counter[None, :] * _GOLDEN)
+    return (x >> np.uint64(11)) * 2.0 ** -53
+
+def _permute(keys: np.ndarray, samples: np.ndarray, n: int) -> np.ndarray:
+    """The images of 'samples' under a random permutation of range(n) (n at most
+    2**32), chosen by 'keys': a Feistel network, one multiplicative-hash round per
+    key, on the smallest even power of two covering n -- cycle-walking the images
+    which fall outside range(n) until they don't"""
+    half = max(1, ((n - 1).bit_length() + 1) // 2)
+    mask, shift, top = np.uint32((1 << half) - 1), np.uint32(half), np.uint32(32 - half)
+    keys = keys.astype(np.uint32)
+    def feistel(x):
+        left, right = x >> shift, x & mask
+        for k in keys:
+            left, right = right, left ^ (((right ^ k) * np.uint32(0x9E3779B1)) >> top)
+        return (left << shift) | right
+    x = feistel(samples.astype(np.uint32))
+    outside = np.flatnonzero(x >= n)
+    while len(outside):
+        y = x[outside] = feistel(x[outside])
+        outside = outside[y >= n]
+    return x.astype(np.int64)
+
+class CommonDraws(Draws):
+
+    """Common random numbers: the k'th execution of an Action in sample i draws the
+    same uniform variates, whichever plan it is part of -- as long as the draws
+    share n, seed and key.  Actions are keyed by their structural digest, unless
+    another 'key' function is given (e.g. one returning the Action's name, so that
+    an Action keeps its draws when its parameters change).
+
+    The uniforms aren't stored: those of the k'th execution of a key come from a
+    stream seeded by (seed, key, k), and are computed on demand for just the
+    samples which draw them (see generate).
+
+    Statuses and durations are found from the uniforms by inversion, so that the
+    same draw gives a shorter duration from a faster Action.  Durations which
+    can't be inverted (see IntDist.quantiles and IntDist.pmf) are drawn from a
+    separate seeded stream, and aren't common between plans.
+    """
+
+    # seeds per row of each stream (see generate)
+    words: int = 1
+
+    n: int
+    seed: int
+    key: Callable[[Action], str]
+    counts: Dict[str, np.ndarray]
+    seeds: Dict[Tuple[str, int], np.ndarray]
+    cdfs: Dict[IntDist, np.ndarray]
+    rng: np.random.Generator
+
+    def __init__(self, n: int, seed: int = None, key: Callable[[Action], str] = None):
+        self.n = n
+        self.seed = seed if seed is not None else int(np.random.SeedSequence().entropy)
+        self.key = key if key is not None else structural_key
+        self.counts = {}
+        self.seeds = {}
+        self.cdfs = {}
+        self.rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(0,)))
+
+    def uniforms(self, key: str, occurrence: int, samples: np.ndarray) -> np.ndarray:
+        """A (2, len(samples)) array of uniforms for the occurrence'th execution of
+        the Actions with this key, in each of the samples: one row for statuses,
+        one for durations"""
+        seeds = self.seeds.get((key, occurrence))
+        if seeds is None:
+            key_hash = int.from_bytes(blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+            sequence = np.random.SeedSequence(self.seed, spawn_key=(key_hash, occurrence))
+            seeds = sequence.generate_state(2 * self.words, np.uint64).reshape(2, self.words)
+            self.seeds[(key, occurrence)] = seeds
+        return self.generate(seeds, samples)
+
+    def generate(self, seeds: np.ndarray, samples: np.ndarray) -> np.ndarray:
+        """The uniforms of one stream, at the given samples, from its (2, words)
+        array of seeds"""
+        return _uniforms(seeds[:, 0], samples)
+
+    def draw(self, action: Action, index: np.ndarray) -> np.ndarray:
+        """The (2, len(index)) uniforms for the next execution of action, in each of
+        the samples in index"""
+        key = self.key(action)
+        counts = self.counts.get(key)
+        if counts is None:
+            # most Actions run once or twice per sample, so the counts start small
+            counts = self.counts[key] = np.zeros(self.n, dtype=np.uint8)
+        occurrence = counts[index]
+        if len(index) and occurrence.max() == np.iinfo(counts.dtype).max:
+            counts = self.counts[key] = counts.astype(np.int64)
+            occurrence = counts[index]
+        counts[index] += 1
+        u = np.empty((2, len(index)))
+        for k in np.unique(occurrence):
+            at = occurrence == k
+            u[:, at] = self.uniforms(key, int(k), index[at])
+        return u
+
+    def sample_action(self, action: Action, index: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        u = self.draw(action, index)
+        return u[0] < action.success_prob, self.durations(action.duration, u[1])
+
+    def durations(self, dist: IntDist, u: np.ndarray) -> np.ndarray:
+        d = dist.quantiles(u)
+        if d is not None:
+            return d
+        if dist not in self.cdfs:
+            pmf = dist.pmf()
+            self.cdfs[dist] = None if pmf is None else np.cumsum(pmf) / pmf.sum()
+        cdf = self.cdfs[dist]
+        if cdf is None:
+            return dist.sample_array(self.rng, len(u))
+        d = np.searchsorted(cdf, u, side='right')
+        return np.minimum(d, len(cdf) - 1).astype(np.int64)
+
+class AntitheticDraws(CommonDraws):
+
+    """Antithetic variates: the second half of the samples use 1 - u wherever the
+    first half use u, so that sample i and sample i + n // 2 are negatively
+    correlated.  (With an odd n, the last sample draws independently.)"""
+
+    def generate(self, seeds: np.ndarray, samples: np.ndarray) -> np.ndarray:
+        half = self.n // 2
+        mirror = (samples >= half) & (samples < 2 * half)
+        u = _uniforms(seeds[:, 0], np.where(mirror, samples - half, samples))
+        u[:, mirror] = 1.0 - u[:, mirror]
+        return u
+
+class LatinHypercubeDraws(CommonDraws):
+
+    """Latin hypercube sampling: for each execution of each Action, exactly one of
+    the n samples draws its status (and its duration) from each of the n strata
+    [k/n, (k+1)/n) of the unit interval, in an independent random order."""
+
+    # one seed for the offsets within the strata, and four Feistel round keys
+    words = 5
+
+    def generate(self, seeds: np.ndarray, samples: np.ndarray) -> np.ndarray:
+        strata = np.stack([_permute(row[1:], samples, self.n) for row in seeds])
+        return (strata + _uniforms(seeds[:, 0], samples)) / self.n
+
+class ImportanceDraws(CommonDraws):
+
+    """Importance sampling: every Action fails 'tilt' times as often as it should
+    (though never more often than max_failure), and each sample carries the
+    likelihood ratio of its draws in 'weights' -- so that weighted estimates are
+    unbiased, while rare failures are seen far more often."""
+
+    tilt: float
+    max_failure: float
+    weights: np.ndarray
+
+    def __init__(
+        self, n: int, seed: int = None, key: Callable[[Action], str] = None,
+        tilt: float = 10.0, max_failure: float = 0.5
+    ):
+        super().__init__(n, seed, key)
+        if tilt < 1.0:
+            raise ValueError(f"tilt {tilt} must be at least 1")
+        self.tilt = tilt
+        self.max_failure = max_failure
+        self.weights = np.ones(n)
+
+    def proposal(self, success_prob: float) -> float:
+        """The success probability to draw with, in place of success_prob"""
+        failure = 1.0 - success_prob
+        if failure <= 0.0 or failure >= self.max_failure:
+            return success_prob
+        return 1.0 - min(failure * self.tilt, self.max_failure)
+
+    def sample_action(self, action: Action, index: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        u = self.draw(action, index)
+        p = action.success_prob
+        q = self.proposal(p)
+        success = u[0] < q
+        if q != p:
+            self.weights[index] *= np.where(success, p / q, (1.0 - p) / (1.0 - q))
+        return success, self.durations(action.duration, u[1])
@@ -2,70 +2,178 @@
 from functools import reduce
 from typing import List
 from random import Random
+from statistics import NormalDist
+import math
+import time
 
-from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Fail, Evaluator
+import numpy as np
+
+from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Fail, MemoizingEvaluator, bottom_up
 from plans.outcomes import Outcome, Status
 from plans.context import Context
-from .success import success_probability
+from .success import SuccessEvaluator
 
-from .outcomes import sample_outcome
+from .batch import sample_outcome_sums, sample_outcomes
 
-def average_duration(p: Plan, n: int = 100) -> float: 
+def average_duration(p: Plan, n: int = 100, workers: int = None, seed: int = None) -> float: 
+    """Mean duration of n sampled outcomes of p.  Samples are split into shards 
+    across 'workers' processes, and a given seed gives the same result for any 
+    number of workers."""
     if n <= 0: 
         raise ValueError(f"n {n} cannot be zero or negative")
-    sum = 0.0
-    for i in range(n): 
-        outcome = sample_outcome(p) 
-        sum += outcome.duration 
-    return sum / n
+    _, total = sample_outcome_sums(p, n, workers, seed)
+    return total / n
+
+class RunningMoments: 
+
+    """Streaming count, mean and variance of a sequence of values, updated a batch 
+    at a time (Chan et al.'s parallel form of Welford's algorithm)"""
+
+    count: int 
+    mean: float 
+    m2: float 
+
+    def __init__(self): 
+        self.count = 0
+        self.mean = 0.0 
+        self.m2 = 0.0 
+    
+    def add_batch(self, values: np.ndarray): 
+        if len(values) == 0: return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        self.merge_moments(len(values), batch_mean, batch_m2) 
+    
+    def merge(self, other: 'RunningMoments'): 
+        self.merge_moments(other.count, other.mean, other.m2) 
+
+    def merge_moments(self, count: int, mean: float, m2: float): 
+        if count == 0: return
+        total = self.count + count 
+        delta = mean - self.mean 
+        self.mean += delta * count / total 
+        self.m2 += m2 + delta * delta * self.count * count / total 
+        self.count = total 
+    
+    @property 
+    def variance(self) -> float: 
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0 
+    
+    @property 
+    def standard_error(self) -> float: 
+        return math.sqrt(self.variance / self.count) if self.count > 0 else math.inf
+
+class DurationEstimate: 
+
+    mean: float 
+    standard_error: float 
+    samples: int 
+    confidence: float 
+
+    def __init__(self, mean: float, standard_error: float, samples: int, confidence: float): 
+        self.mean = mean 
+        self.standard_error = standard_error 
+        self.samples = samples 
+        self.confidence = confidence 
+    
+    @property 
+    def interval(self) -> tuple: 
+        """The confidence interval around the mean, at the estimate's confidence level"""
+        half = _z(self.confidence) * self.standard_error 
+        return (self.mean - half, self.mean + half)
+    
+    def __repr__(self): 
+        return f"DurationEstimate({self.mean} +/- {self.standard_error}, n={self.samples})"
+
+def _z(confidence: float) -> float: 
+    return NormalDist().inv_cdf(0.5 + confidence / 2.0)
+
+def estimate_duration(
+    p: Plan, 
+    abs_width: float = None, 
+    rel_width: float = None, 
+    confidence: float = 0.95, 
+    time_budget: float = None, 
+    batch_size: int = 1000, 
+    max_samples: int = 10000000, 
+    seed: int = None
+) -> DurationEstimate: 
+    """Estimates the mean duration of p, sampling in batches until the (full) width 
+    of the confidence interval is at most abs_width, or at most rel_width times the 
+    mean -- or until time_budget seconds or max_samples samples have been used."""
+    if abs_width is None and rel_width is None and time_budget is None: 
+        raise ValueError("estimate_duration needs a target width or a time budget")
+    if not 0.0 < confidence < 1.0: 
+        raise ValueError(f"confidence {confidence} must be between 0 and 1")
+    z = _z(confidence) 
+    rng = np.random.default_rng(seed) 
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+    moments = RunningMoments() 
+    while moments.count < max_samples: 
+        size = min(batch_size, max_samples - moments.count) 
+        _, durations = sample_outcomes(p, size, rng) 
+        moments.add_batch(durations) 
+        width = 2.0 * z * moments.standard_error 
+        if abs_width is not None and width <= abs_width: break 
+        if rel_width is not None and width <= rel_width * abs(moments.mean): break 
+        if deadline is not None and time.monotonic() >= deadline: break 
+    return DurationEstimate(moments.mean, moments.standard_error, moments.count, confidence)
 
 def max_duration(p: Plan) -> int: 
     return MaxDurationEvaluator().evaluate_plan(p) 
 
-class MaxDurationEvaluator(Evaluator[int]): 
+class MaxDurationEvaluator(MemoizingEvaluator[int]): 
+
+    success: SuccessEvaluator
+
+    def __init__(self, max_cache_size: int = 100000, structural: bool = False, shared_only: bool = True): 
+        MemoizingEvaluator.__init__(self, max_cache_size, structural, shared_only)
+        self.success = SuccessEvaluator(max_cache_size, structural, shared_only)
 
     def evaluate_action(self, action: Action, c: Context = None) -> int:
         return action.duration.max_value()
 
-    def evaluate_steps(self, steps: Steps, c: Context = None) -> int:
-        children: List[int] = [self.evaluate_plan(p, c) for p in steps.children]
+    @bottom_up
+    def evaluate_steps(self, steps: Steps, children: List[int], c: Context = None) -> int:
         if None in children: return None
         return sum(children) 
     
-    def evaluate_requirements(self, reqs: Requirements, c: Context = None) -> int:
-        children: List[int] = [self.evaluate_plan(p, c) for p in reqs.children]
+    @bottom_up
+    def evaluate_requirements(self, reqs: Requirements, children: List[int], c: Context = None) -> int:
         if None in children: return None
         return max(children)
     
-    def evaluate_options(self, options: Options, c: Context = None) -> int:
-        children: List[int] = [self.evaluate_plan(p, c) for p in options.children]
+    @bottom_up
+    def evaluate_options(self, options: Options, children: List[int], c: Context = None) -> int:
         if None in children: return None
         return sum(children)
     
-    def evaluate_alternatives(self, alternatives: Alternatives, c: Context = None) -> int:
-        children: List[int] = [self.evaluate_plan(p, c) for p in alternatives.children]
+    @bottom_up
+    def evaluate_alternatives(self, alternatives: Alternatives, children: List[int], c: Context = None) -> int:
         if None in children: return None
         return sum(children)
 
     def evaluate_ensure(self, ensure: Ensure, c: Context = None) -> int:
-        if success_probability(ensure.children[0]) < 1.0: 
+        if self.success.evaluate_plan(ensure.children[0], c) < 1.0: 
             return None 
         else: 
-            return self.evaluate_plan(ensure.children[0], c)
+            return (yield ensure.children[0])
     
-    def evaluate_loop(self, loop: Loop, c: Context = None) -> int:
-        child_max = self.evaluate_plan(loop.children[0], c) 
+    @bottom_up
+    def evaluate_loop(self, loop: Loop, children: List[int], c: Context = None) -> int:
+        child_max = children[0]
         if child_max is None: return None
         return child_max * loop.max_loops
     
-    def evaluate_optional(self, opt: Optional, c: Context = None) -> int:
-        return self.evaluate_plan(opt.children[0], c)
+    @bottom_up
+    def evaluate_optional(self, opt: Optional, children: List[int], c: Context = None) -> int:
+        return children[0]
     
     def evaluate_fail(self, failure: Fail, c: Context = None) -> int:
         return 0
     
-    def evaluate_ifelse(self, ifelse: IfElse, c: Context = None) -> int: 
-        children: List[int] = [self.evaluate_plan(p, c) for p in ifelse.children]
+    @bottom_up
+    def evaluate_ifelse(self, ifelse: IfElse, children: List[int], c: Context = None) -> int: 
         if None in children: return None
         return children[0] + max(children[1], children[2])
 
@@ -0,0 +1,80 @@
+from typing import Callable, Dict
+
+import numpy as np
+
+from plans.plan import Plan
+from plans.outcomes import Status
+from plans.context import Context
+from .batch import BatchOutcomeSampler
+from .draws import CommonDraws, AntitheticDraws, LatinHypercubeDraws, ImportanceDraws
+
+# The sampling modes of estimate_outcomes, by name; each is called as
+# mode(n, seed, **options) to make the Draws for one batch of samples.
+SAMPLING_MODES: Dict[str, Callable[..., CommonDraws]] = {
+    'independent': CommonDraws,
+    'antithetic': AntitheticDraws,
+    'latin': LatinHypercubeDraws,
+    'importance': ImportanceDraws,
+}
+
+def estimate_outcomes(p: Plan, n: int = 10000, mode: str = 'independent', seed: int = None, **options) -> 'WeightedOutcomes':
+    """Samples n outcomes of p with one of the variance-reduction SAMPLING_MODES --
+    'antithetic', 'latin' (Latin hypercube) or 'importance' -- or with plain
+    independent draws.  Any options are passed on to the mode (e.g. the 'tilt'
+    of importance sampling)."""
+    if n <= 0:
+        raise ValueError(f"n {n} cannot be zero or negative")
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling mode {mode}, expected one of {list(SAMPLING_MODES)}")
+    draws = SAMPLING_MODES[mode](n, seed, **options)
+    statuses, durations = BatchOutcomeSampler(np.arange(n), draws=draws).evaluate_plan(p, Context())
+    weights = getattr(draws, 'weights', None)
+    return WeightedOutcomes(statuses, durations, weights)
+
+class WeightedOutcomes:
+
+    """A sample of outcomes (statuses and durations, as in sample_outcomes) with a
+    weight for each one.  Estimates are self-normalized weighted means, and the
+    effective_sample_size says how many independent, unweighted samples they are
+    worth."""
+
+    statuses: np.ndarray
+    durations: np.ndarray
+    weights: np.ndarray
+
+    def __init__(self, statuses: np.ndarray, durations: np.ndarray, weights: np.ndarray = None):
+        self.statuses = statuses
+        self.durations = durations
+        self.weights = weights if weights is not None else np.ones(len(statuses))
+
+    @property
+    def n(self) -> int: return len(self.statuses)
+
+    @property
+    def effective_sample_size(self) -> float:
+        w = self.weights
+        return float(w.sum() ** 2 / np.dot(w, w))
+
+    def _mask(self, status: Status = None) -> np.ndarray:
+        if status is None:
+            return np.ones(self.n, dtype=bool)
+        return self.statuses if status == Status.SUCCESS else ~self.statuses
+
+    def weighted_mean(self, values: np.ndarray) -> float:
+        return float(np.dot(self.weights, values) / self.weights.sum())
+
+    def probability(self, status: Status = None) -> float:
+        return self.weighted_mean(self._mask(status))
+
+    def mean(self, status: Status = None) -> float:
+        """Mean duration, conditioned on the status if one is given"""
+        mask = self._mask(status)
+        w = self.weights[mask]
+        return float(np.dot(w, self.durations[mask]) / w.sum())
+
+    def probability_exceeds(self, deadline: int, status: Status = None) -> float:
+        """P(duration > deadline), jointly with the status if one is given"""
+        return self.weighted_mean(self._mask(status) & (self.durations > deadline))
+
+    def __repr__(self):
+        return f"WeightedOutcomes(success={self.probability(Status.SUCCESS)}, mean={self.mean()}, ess={self.effective_sample_size})"
@@ -1,21 +1,55 @@
-from typing import List
+from typing import List, Union
 from random import Random
 
+import numpy as np
+
 from plans.plan import ( 
     Action, Fail, Optional, Steps, Plan, 
     Requirements, Options, Ensure, IfElse, Fail, 
-    Event, History, Evaluator, Alternatives, Loop
+    Event, History, IterativeEvaluator, Alternatives, Loop
 )
 
 from plans.outcomes import Status
 from plans.context import Context 
+from plans.compiled import CompiledPlan, compile_plan
+from plans.columnar import ColumnarHistory
+from .compiled import CompiledSampler, Record
+from .parallel import shard_map, shard_random
+
+# histories per shard, when sampling is split across workers
+SHARD_SIZE = 1000
 
-def sample_history(p: Plan) -> History: 
-    v = HistorySampler()
+def sample_history(p: Plan, seed: int = None) -> History: 
+    v = HistorySampler(rand=Random(seed))
     value = v.evaluate_plan(p) 
     return value 
 
-class HistorySampler(Evaluator[History]): 
+def sample_histories(
+    p: Plan, n: int, workers: int = None, seed: int = None, columnar: bool = False
+) -> Union[List[History], List[ColumnarHistory]]: 
+    """Samples n independent histories of p, in shards spread across 'workers' 
+    processes.  A given seed gives the same histories for any number of workers. 
+    With 'columnar' set, the histories are returned as ColumnarHistory objects."""
+    cp = compile_plan(p) 
+    shards = shard_map(_sample_history_shard, n, SHARD_SIZE, workers, seed, cp)
+    if columnar: 
+        return [
+            ColumnarHistory.from_records(cp, records) 
+            for shard in shards for records in shard
+        ]
+    sampler = CompiledSampler(cp) 
+    return [
+        sampler.history_from_records(records) 
+        for shard in shards for records in shard
+    ]
+
+def _sample_history_shard(size: int, seed: np.random.SeedSequence, cp: CompiledPlan) -> List[List[Record]]: 
+    # workers send back plain records, and the histories are rebuilt in the 
+    # calling process around its own Plan objects 
+    sampler = CompiledSampler(cp, shard_random(seed)) 
+    return [sampler.sample_records() for i in range(size)]
+
+class HistorySampler(IterativeEvaluator[History]): 
 
     current_time: int 
     rand: Random
@@ -30,6 +64,16 @@ class HistorySampler(Evaluator[History]):
             self.rand 
         )
 
+    def evaluate_in_parallel(self, children: List[Plan], c: Context = None): 
+        """Evaluates every child from the current time, as if each were run by 
+        its own copy of this sampler"""
+        start_time = self.current_time 
+        histories: List[History] = list() 
+        for child in children: 
+            self.current_time = start_time 
+            histories.append((yield child)) 
+        return histories 
+
     def evaluate_action(self, action: Action, c: Context = None) -> History:
         start_time = self.current_time
         outcome = action.sample_outcome(self.rand)
@@ -48,7 +92,7 @@ class HistorySampler(Evaluator[History]):
         success: Status = Status.SUCCESS
         histories: List[History] = list() 
         for child in steps.children: 
-            child_history: History = self.evaluate_plan(child, c) 
+            child_history: History = yield child
             histories.append(child_history) 
             success = success & child_history.result.status
             self.current_time = child_history.end_time
@@ -67,9 +111,7 @@ class HistorySampler(Evaluator[History]):
     
     def evaluate_requirements(self, reqs: Requirements, c: Context = None) -> History:
         start_time = self.current_time
-        n = len(reqs.children) 
-        child_evaluators = [self.copy() for c in reqs.children]
-        child_histories = [child_evaluators[i].evaluate_plan(reqs.children[i]) for i in range(n)]
+        child_histories = yield from self.evaluate_in_parallel(reqs.children, c)
         statuses = [h.result.status for h in child_histories]
         if Status.FAILURE in statuses: 
             first_failure = min([h.result.end_time for h in child_histories if not h.result.status])
@@ -101,7 +143,7 @@ class HistorySampler(Evaluator[History]):
         success: Status = Status.FAILURE
         histories: List[History] = list() 
         for child in options.children: 
-            child_history: History = self.evaluate_plan(child, c) 
+            child_history: History = yield child
             histories.append(child_history) 
             success = success | child_history.result.status
             self.current_time = child_history.end_time
@@ -120,9 +162,7 @@ class HistorySampler(Evaluator[History]):
 
     def evaluate_alternatives(self, alts: Alternatives, c: Context = None) -> History:
         start_time = self.current_time
-        n = len(alts.children) 
-        child_evaluators = [self.copy() for c in alts.children]
-        child_histories = [child_evaluators[i].evaluate_plan(alts.children[i]) for i in range(n)]
+        child_histories = yield from self.evaluate_in_parallel(alts.children, c)
         statuses = [h.result.status for h in child_histories]
         if Status.SUCCESS in statuses: 
             first_success = min([h.result.end_time for h in child_histories if h.result.status])
@@ -152,11 +192,11 @@ class HistorySampler(Evaluator[History]):
     def evaluate_ensure(self, ensure: Ensure, c: Context = None) -> History:
         start_time = self.current_time 
         histories: List[History] = list() 
-        child: History = self.evaluate_plan(ensure.children[0], c)
+        child: History = yield ensure.children[0]
         histories.append(child) 
         success: Status = child.result.status 
         while not success: 
-            child = self.evaluate_plan(ensure.children[0], c)
+            child = yield ensure.children[0]
             histories.append(child) 
             success = success | child.result.status 
             self.current_time = child.result.end_time
@@ -174,7 +214,7 @@ class HistorySampler(Evaluator[History]):
         start_time = self.current_time 
         histories: List[History] = list() 
         for i in range(loop.max_loops): 
-            child: History = self.evaluate_plan(loop.children[0], c)
+            child: History = yield loop.children[0]
             histories.append(child) 
             self.current_time = child.result.end_time
             if child.result.status: 
@@ -200,12 +240,12 @@ class HistorySampler(Evaluator[History]):
     
     def evaluate_ifelse(self, ifelse: IfElse, c: Context = None) -> History:
         start_time = self.current_time
-        test_history: History = self.evaluate_plan(ifelse.children[0], c) 
+        test_history: History = yield ifelse.children[0]
         outc: History = None
         if test_history.result.status: 
-            outc = self.evaluate_plan(ifelse.children[1], c) 
+            outc = yield ifelse.children[1]
         else: 
-            outc = self.evaluate_plan(ifelse.children[2], c) 
+            outc = yield ifelse.children[2]
 
         evt = Event.complete(
             ifelse, 
@@ -226,7 +266,7 @@ class HistorySampler(Evaluator[History]):
         )
     
     def evaluate_optional(self, opt: Optional, c: Context = None) -> History:
-        inner_history = self.evaluate_plan(opt, c) 
+        inner_history = yield opt.children[0]
         evt = Event.complete(
             opt, 
             inner_history.start_time, 
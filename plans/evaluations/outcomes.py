@@ -3,22 +3,26 @@ from functools import reduce
 from typing import List
 from random import Random
 
-from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Fail, Evaluator
+from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Fail, IterativeEvaluator, bottom_up
 from plans.outcomes import Outcome, Status
 from plans.context import Context
 
-def sample_outcome(p: Plan) -> Outcome: 
-    v = OutcomeSampler()
+def sample_outcome(p: Plan, seed: int = None) -> Outcome: 
+    v = OutcomeSampler(Random(seed))
     c = Context()
     value = v.evaluate_plan(p, c) 
     return value 
 
-class OutcomeSampler(Evaluator[Outcome]): 
+class OutcomeSampler(IterativeEvaluator[Outcome]): 
+
+    """Samples an outcome of a plan.  Methods which always sample every child 
+    are written with bottom_up; those which stop early (and so must not sample 
+    the children they skip) are generators."""
 
     rand: Random
 
-    def __init__(self): 
-        self.rand = Random()
+    def __init__(self, rand: Random = None): 
+        self.rand = rand or Random()
 
     def evaluate_action(self, action: Action, c: Context = None) -> Outcome:
         return action.sample_outcome(self.rand)
@@ -27,7 +31,7 @@ class OutcomeSampler(Evaluator[Outcome]):
         duration: int = 0 
         success: Status = Status.SUCCESS
         for child in steps.children: 
-            child_outcome = self.evaluate_plan(child, c) 
+            child_outcome = yield child
             success = success & child_outcome.status 
             duration += child_outcome.duration 
             if not success: 
@@ -37,8 +41,8 @@ class OutcomeSampler(Evaluator[Outcome]):
             duration 
         )
     
-    def evaluate_requirements(self, reqs: Requirements, c: Context = None) -> Outcome:
-        children: List[Outcome] = [self.evaluate_plan(p, c) for p in reqs.children]
+    @bottom_up
+    def evaluate_requirements(self, reqs: Requirements, children: List[Outcome], c: Context = None) -> Outcome:
         statuses = [c.status for c in children]
         if Status.FAILURE in statuses: 
             duration = min([c.duration for c in children if not c.status])
@@ -51,7 +55,7 @@ class OutcomeSampler(Evaluator[Outcome]):
         duration: int = 0 
         success: Status = Status.FAILURE
         for child in options.children: 
-            child_outcome = self.evaluate_plan(child, c) 
+            child_outcome = yield child
             success = success | child_outcome.status 
             duration += child_outcome.duration 
             if success: 
@@ -61,8 +65,8 @@ class OutcomeSampler(Evaluator[Outcome]):
             duration 
         )
 
-    def evaluate_alternatives(self, alternatives: Alternatives, c: Context = None) -> Outcome:
-        children: List[Outcome] = [self.evaluate_plan(p, c) for p in alternatives.children]
+    @bottom_up
+    def evaluate_alternatives(self, alternatives: Alternatives, children: List[Outcome], c: Context = None) -> Outcome:
         statuses = [c.status for c in children]
         if Status.SUCCESS in statuses: 
             successful_indices = [i for i in range(len(children)) if children[i].status == Status.SUCCESS]
@@ -74,11 +78,11 @@ class OutcomeSampler(Evaluator[Outcome]):
             return Outcome(Status.FAILURE, duration) 
 
     def evaluate_ensure(self, ensure: Ensure, c: Context = None) -> Outcome:
-        child: Outcome = self.evaluate_plan(ensure.children[0], c)
+        child: Outcome = yield ensure.children[0]
         duration: int = child.duration 
         success: Status = child.status 
         while not success: 
-            child = self.evaluate_plan(ensure.children[0], c)
+            child = yield ensure.children[0]
             duration += child.duration 
             success = success | child.status 
         return Outcome(success, duration) 
@@ -86,19 +90,19 @@ class OutcomeSampler(Evaluator[Outcome]):
     def evaluate_loop(self, loop: Loop, c: Context = None) -> Outcome:
         duration: int = 0
         for i in range(loop.max_loops):
-            child: Outcome = self.evaluate_plan(loop.children[0], c)
+            child: Outcome = yield loop.children[0]
             duration += child.duration 
             if child.status: 
                 return Outcome(Status.SUCCESS, duration) 
         return Outcome(Status.FAILURE, duration) 
     
     def evaluate_ifelse(self, ifelse: IfElse, c: Context = None) -> Outcome:
-        test_outcome: Outcome = self.evaluate_plan(ifelse.children[0], c) 
+        test_outcome: Outcome = yield ifelse.children[0]
         outc: Outcome 
         if test_outcome.status: 
-            outc = self.evaluate_plan(ifelse.children[1], c) 
+            outc = yield ifelse.children[1]
         else: 
-            outc = self.evaluate_plan(ifelse.children[2], c) 
+            outc = yield ifelse.children[2]
         
         return Outcome(
             outc.status, 
@@ -108,6 +112,6 @@ class OutcomeSampler(Evaluator[Outcome]):
     def evaluate_fail(self, failure: Fail, c: Context = None) -> Outcome:
         return Outcome(Status.FAILURE, 0)
     
-    def evaluate_optional(self, opt: Optional, c: Context = None) -> Outcome:
-        outcome = self.evaluate_plan(opt, c) 
-        return Outcome(Status.SUCCESS, outcome.duration)
+    @bottom_up
+    def evaluate_optional(self, opt: Optional, children: List[Outcome], c: Context = None) -> Outcome:
+        return Outcome(Status.SUCCESS, children[0].duration)
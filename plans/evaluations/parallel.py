@@ -0,0 +1,57 @@
+
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from typing import Callable, List, Tuple, TypeVar
+
+import numpy as np
+
+R = TypeVar('R')
+
+# Sampling work is split into shards of a fixed size, independent of the number
+# of workers, and shard i always draws from the random stream derived from
+# (seed, i) -- so a seeded run gives bit-identical results however many
+# processes it is spread across.
+
+def shard_sizes(n: int, shard_size: int) -> List[int]:
+    if n <= 0:
+        raise ValueError(f"n {n} cannot be zero or negative")
+    full, rest = divmod(n, shard_size)
+    return [shard_size] * full + ([rest] if rest else [])
+
+def shard_seeds(seed: int, count: int) -> List[np.random.SeedSequence]:
+    """Independent seed sequences, one per shard, derived deterministically from
+    seed (or from OS entropy, if seed is None)"""
+    root = np.random.SeedSequence(seed)
+    return [
+        np.random.SeedSequence(root.entropy, spawn_key=(i,))
+        for i in range(count)
+    ]
+
+def shard_rng(seed: np.random.SeedSequence) -> np.random.Generator:
+    return np.random.default_rng(seed)
+
+def shard_random(seed: np.random.SeedSequence) -> Random:
+    state = seed.generate_state(4, np.uint32)
+    return Random(int.from_bytes(state.tobytes(), 'little'))
+
+def shard_map(
+    fn: Callable[..., R],
+    n: int,
+    shard_size: int,
+    workers: int = None,
+    seed: int = None,
+    *args
+) -> List[R]:
+    """Calls fn(size, shard_seed, *args) for every shard of n samples, in a process
+    pool if workers > 1, and returns the results in shard order.  fn and args must
+    be picklable when running in a pool."""
+    sizes = shard_sizes(n, shard_size)
+    seeds = shard_seeds(seed, len(sizes))
+    if workers is None or workers <= 1 or len(sizes) == 1:
+        return [fn(size, s, *args) for size, s in zip(sizes, seeds)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fn, size, s, *args) for size, s in zip(sizes, seeds)]
+        return [f.result() for f in futures]
+
+def merge_sums(partials: List[Tuple[int, ...]]) -> Tuple[int, ...]:
+    return tuple(sum(values) for values in zip(*partials))
@@ -0,0 +1,340 @@
+
+from heapq import heappush, heappop
+from typing import Dict, Hashable, Iterable, List
+
+from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Event, History
+from plans.outcomes import Status
+from .success import SuccessEvaluator
+from .duration import MaxDurationEvaluator
+from .distribution import DistributionEvaluator
+
+# The remaining plan of a partial execution is the plan still to be carried out,
+# given the events that have completed so far: finished children are dropped
+# from Steps, Requirements, Options and Alternatives, retries count down the
+# Loop bounds, and a decided IfElse is replaced by its branch.  Subtrees which
+# no event has touched are kept as the original Plan objects, so that memoized
+# evaluators only need to evaluate the nodes rebuilt along changed paths.
+
+def remaining_plan(p: Plan, history: History) -> Plan:
+    """The remaining plan of p after the events of history -- or None if the
+    history completes p"""
+    depths = {id(p): 0}
+    stack = [p]
+    while stack:
+        parent = stack.pop()
+        for child in parent.children:
+            if id(child) not in depths:
+                depths[id(child)] = depths[id(parent)] + 1
+                stack.append(child)
+    # children before their parents, as the events were completed
+    events = sorted(
+        history.all_events(),
+        key=lambda e: (e.end_time, -e.start_time, -depths.get(id(e.plan), 0))
+    )
+    tracker = RemainingPlanTracker(p, history.start_time)
+    tracker.observe_all(events)
+    return tracker.remaining
+
+class _Frame:
+
+    """The state of one running occurrence of a plan node"""
+
+    __slots__ = ('plan', 'parent', 'depth', 'start', 'position', 'running', 'remaining', 'done')
+
+    def __init__(self, plan: Plan, parent: '_Frame', start: int):
+        self.plan = plan
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.start = start
+        # the child position reached by Steps, Options and IfElse, or the
+        # number of failed attempts of Ensure and Loop
+        self.position = 0
+        self.running: List['_Frame'] = []
+        self.remaining = plan
+        self.done = False
+
+class RemainingPlanTracker:
+
+    """Follows one execution of a plan as its Events arrive (in any order that
+    puts children before their parents, as iter_events does), keeping its
+    remaining plan up to date.
+
+    Each running plan node has a frame, which reacts to the completion of its
+    children in the same way as EventSimulator.  A node is resolved as soon as
+    its outcome is decided, e.g. a Steps node at the first failed step; events
+    for nodes that are no longer running (such as aborted children) are ignored.
+    Each event costs time proportional to the depth of its node, times the
+    number of children of the nodes rebuilt above it.
+    """
+
+    plan: Plan
+    root: _Frame
+    status: Status
+    end_time: int
+    success: SuccessEvaluator
+    durations: MaxDurationEvaluator
+    distributions: DistributionEvaluator
+
+    def __init__(
+        self,
+        plan: Plan,
+        start_time: int = None,
+        success: SuccessEvaluator = None,
+        durations: MaxDurationEvaluator = None,
+        distributions: DistributionEvaluator = None
+    ):
+        self.plan = plan
+        self.success = success or SuccessEvaluator()
+        self.durations = durations or MaxDurationEvaluator()
+        self.distributions = distributions or DistributionEvaluator()
+        self.status = None
+        self.end_time = None
+        # running frames, by id() of their plan
+        self.frames: Dict[int, List[_Frame]] = {}
+        self._resolved: List[tuple] = []
+        self._dirty: List[tuple] = []
+        self.root = self._spawn(plan, None, start_time)
+        self._settle()
+
+    @property
+    def finished(self) -> bool:
+        return self.status is not None
+
+    @property
+    def remaining(self) -> Plan:
+        return None if self.finished else self.root.remaining
+
+    def success_probability(self) -> float:
+        if self.finished:
+            return 1.0 if self.status == Status.SUCCESS else 0.0
+        return self.success.evaluate_plan(self.remaining)
+
+    def max_duration(self) -> int:
+        """The longest the rest of the execution can take, or None if unbounded"""
+        if self.finished:
+            return 0
+        return self.durations.evaluate_plan(self.remaining)
+
+    def expected_duration(self) -> float:
+        """The mean time the rest of the execution takes, from the exact outcome
+        distribution of the remaining plan"""
+        if self.finished:
+            return 0.0
+        return self.distributions.evaluate_plan(self.remaining).mean()
+
+    def observe(self, event: Event) -> Plan:
+        """Updates the execution with a completed event, returning the new
+        remaining plan"""
+        # the running occurrence of the event's plan which started when the event
+        # did -- start times are unknown below a root with no start time
+        frame = next((
+            f for f in self.frames.get(id(event.plan), ())
+            if f.start == event.start_time or f.start is None
+        ), None)
+        if frame is not None:
+            self._resolved.append((frame, event.status == Status.SUCCESS, event.end_time))
+            self._settle()
+        return self.remaining
+
+    def observe_all(self, events: Iterable[Event]) -> Plan:
+        for event in events:
+            self.observe(event)
+        return self.remaining
+
+    # frames
+
+    def _spawn(self, plan: Plan, parent: _Frame, start: int) -> _Frame:
+        """Starts a frame for plan, and frames for the children that start with it"""
+        top = _Frame(plan, parent, start)
+        if parent is not None:
+            parent.running.append(top)
+        stack = [top]
+        while stack:
+            frame = stack.pop()
+            self.frames.setdefault(id(frame.plan), []).append(frame)
+            t = frame.plan.plan_type
+            children = frame.plan.children
+            if t in ('Steps', 'Options'):
+                if not children:
+                    self._resolved.append((frame, t == 'Steps', start))
+                    continue
+                starting = children[:1]
+            elif t in ('Requirements', 'Alternatives'):
+                if not children:
+                    self._resolved.append((frame, True, start))
+                    continue
+                starting = children
+            elif t == 'Loop' and frame.plan.max_loops <= 0:
+                self._resolved.append((frame, False, start))
+                continue
+            else:
+                starting = children[:1]
+            for child in starting:
+                child_frame = _Frame(child, frame, start)
+                frame.running.append(child_frame)
+                stack.append(child_frame)
+        return top
+
+    def _retire(self, frame: _Frame):
+        """Removes a resolved frame, and everything still running beneath it"""
+        stack = [frame]
+        while stack:
+            f = stack.pop()
+            f.done = True
+            self.frames[id(f.plan)].remove(f)
+            stack.extend(f.running)
+            f.running = []
+        if frame.parent is not None and frame in frame.parent.running:
+            frame.parent.running.remove(frame)
+
+    def _settle(self):
+        """Resolves frames (and, in turn, their parents) until nothing more is
+        decided, then rebuilds the remaining plans along the changed paths"""
+        while self._resolved:
+            frame, status, time = self._resolved.pop()
+            if frame.done:
+                continue
+            self._retire(frame)
+            parent = frame.parent
+            if parent is None:
+                self.status = Status.SUCCESS if status else Status.FAILURE
+                self.end_time = time
+                self._dirty = []
+                self._resolved = []
+                return
+            self._child_done(parent, frame, status, time)
+            self._mark(parent)
+        while self._dirty:
+            _, _, frame = heappop(self._dirty)
+            if frame.done:
+                continue
+            remaining = self._rebuild(frame)
+            if remaining is not frame.remaining:
+                frame.remaining = remaining
+                if frame.parent is not None:
+                    self._mark(frame.parent)
+
+    def _mark(self, frame: _Frame):
+        # deepest frames are rebuilt first
+        heappush(self._dirty, (-frame.depth, id(frame), frame))
+
+    def _child_done(self, frame: _Frame, child: _Frame, status: bool, time: int):
+        t = frame.plan.plan_type
+        children = frame.plan.children
+        if t in ('Steps', 'Options'):
+            stop_on = t == 'Options'
+            if status == stop_on:
+                self._resolved.append((frame, stop_on, time))
+            elif frame.position + 1 == len(children):
+                self._resolved.append((frame, not stop_on, time))
+            else:
+                frame.position += 1
+                self._spawn(children[frame.position], frame, time)
+        elif t in ('Requirements', 'Alternatives'):
+            resolve_on = t == 'Alternatives'
+            if status == resolve_on:
+                self._resolved.append((frame, resolve_on, time))
+            elif not frame.running:
+                self._resolved.append((frame, not resolve_on, time))
+        elif t == 'Ensure':
+            if status:
+                self._resolved.append((frame, True, time))
+            else:
+                frame.position += 1
+                self._spawn(children[0], frame, time)
+        elif t == 'Loop':
+            frame.position += 1
+            if status or frame.position >= frame.plan.max_loops:
+                self._resolved.append((frame, status, time))
+            else:
+                self._spawn(children[0], frame, time)
+        elif t == 'IfElse':
+            if frame.position == 0:
+                frame.position = 1 if status else 2
+                self._spawn(children[frame.position], frame, time)
+            else:
+                self._resolved.append((frame, status, time))
+        else:
+            self._resolved.append((frame, True, time))
+
+    def _rebuild(self, frame: _Frame) -> Plan:
+        """The remaining plan of a frame, from the remaining plans of its running
+        children -- the original plan, if nothing in it has changed"""
+        plan = frame.plan
+        t = plan.plan_type
+        children = plan.children
+        running = [f.remaining for f in frame.running]
+        if t in ('Steps', 'Options'):
+            rest = children[frame.position + 1:]
+            if frame.position == 0 and running[0] is children[0]:
+                return plan
+            return type(plan)(plan.name, *running, *rest)
+        elif t in ('Requirements', 'Alternatives'):
+            if len(running) == len(children) and all(r is c for r, c in zip(running, children)):
+                return plan
+            return type(plan)(plan.name, *running)
+        elif t == 'Ensure':
+            if running[0] is children[0]:
+                return plan
+            return Options(plan.name, running[0], plan)
+        elif t == 'Loop':
+            tries = frame.position
+            if running[0] is children[0]:
+                return plan if tries == 0 else Loop(children[0], plan.max_loops - tries, name=plan.name)
+            if plan.max_loops - tries - 1 <= 0:
+                return running[0]
+            return Options(plan.name, running[0], Loop(children[0], plan.max_loops - tries - 1, name=plan.name))
+        elif t == 'IfElse':
+            if frame.position > 0:
+                return running[0]
+            if running[0] is children[0]:
+                return plan
+            return IfElse(running[0], children[1], children[2], name=plan.name)
+        elif t == 'Optional':
+            if running[0] is children[0]:
+                return plan
+            return Optional(running[0], name=plan.name)
+        return plan
+
+class RemainingPlanEngine:
+
+    """Tracks many in-flight executions at once, keyed by any hashable execution
+    id.  The trackers share their memoizing evaluators -- one SuccessEvaluator,
+    one MaxDurationEvaluator and one DistributionEvaluator -- so that the
+    untouched parts of plans common to several executions are only evaluated
+    once.
+    """
+
+    trackers: Dict[Hashable, RemainingPlanTracker]
+    success: SuccessEvaluator
+    durations: MaxDurationEvaluator
+    distributions: DistributionEvaluator
+
+    def __init__(self, max_cache_size: int = 100000):
+        self.trackers = {}
+        self.success = SuccessEvaluator(max_cache_size)
+        self.durations = MaxDurationEvaluator(max_cache_size)
+        self.durations.success = self.success
+        self.distributions = DistributionEvaluator(max_cache_size=max_cache_size)
+
+    def __len__(self) -> int: return len(self.trackers)
+
+    def __contains__(self, key: Hashable) -> bool: return key in self.trackers
+
+    def __getitem__(self, key: Hashable) -> RemainingPlanTracker: return self.trackers[key]
+
+    def start(self, key: Hashable, plan: Plan, start_time: int = None) -> RemainingPlanTracker:
+        if key in self.trackers:
+            raise ValueError(f"Execution {key} is already being tracked")
+        tracker = RemainingPlanTracker(plan, start_time, self.success, self.durations, self.distributions)
+        self.trackers[key] = tracker
+        return tracker
+
+    def observe(self, key: Hashable, event: Event) -> RemainingPlanTracker:
+        tracker = self.trackers[key]
+        tracker.observe(event)
+        return tracker
+
+    def finish(self, key: Hashable) -> RemainingPlanTracker:
+        """Stops tracking an execution"""
+        return self.trackers.pop(key)
@@ -0,0 +1,132 @@
+from typing import List, Union
+
+import numpy as np
+
+from plans.plan import Plan
+from plans.compiled import CompiledPlan
+from .compiled import success_probabilities, ACTION, STEPS, REQUIREMENTS, OPTIONS, ALTERNATIVES, LOOP, IFELSE
+
+# Reverse-mode differentiation of success_probability.  The forward pass is
+# success_probabilities; the reverse pass walks the compiled nodes from the root
+# down (reverse post-order visits every parent before its children), passing
+# each node's adjoint -- dP(root)/dP(node) -- on to its children through the
+# partial derivatives of the conjunctions, disjunctions, loops and IfElse mixes.
+# A node shared between several parents sums the adjoints from all of them.
+
+def success_sensitivity(p: Union[Plan, CompiledPlan]) -> 'SuccessSensitivity':
+    cp = p if isinstance(p, CompiledPlan) else CompiledPlan(p)
+    return SuccessSensitivity(cp)
+
+def _others_product(factors: List[float]) -> List[float]:
+    """For each i, the product of every factor but the i'th (without dividing, so
+    that zero factors are handled)"""
+    n = len(factors)
+    result = [1.0] * n
+    prefix = 1.0
+    for i in range(n):
+        result[i] = prefix
+        prefix *= factors[i]
+    suffix = 1.0
+    for i in range(n - 1, -1, -1):
+        result[i] *= suffix
+        suffix *= factors[i]
+    return result
+
+def success_adjoints(cp: CompiledPlan, values: np.ndarray) -> np.ndarray:
+    """dP(root)/dP(node) for every node of the compiled plan, given the success
+    probabilities of the nodes (from success_probabilities)"""
+    kinds = cp.kind.tolist()
+    offsets = cp.child_offset.tolist()
+    counts = cp.child_count.tolist()
+    children = cp.children.tolist()
+    loops = cp.max_loops.tolist()
+    v = values.tolist()
+    adjoints = [0.0] * len(kinds)
+    adjoints[cp.root] = 1.0
+    for i in range(len(kinds) - 1, -1, -1):
+        a = adjoints[i]
+        k = kinds[i]
+        if a == 0.0 or k == ACTION:
+            continue
+        cs = children[offsets[i]:offsets[i] + counts[i]]
+        if k == STEPS or k == REQUIREMENTS:
+            for j, d in zip(cs, _others_product([v[j] for j in cs])):
+                adjoints[j] += a * d
+        elif k == OPTIONS or k == ALTERNATIVES:
+            for j, d in zip(cs, _others_product([1.0 - v[j] for j in cs])):
+                adjoints[j] += a * d
+        elif k == LOOP:
+            if loops[i] > 0:
+                adjoints[cs[0]] += a * loops[i] * (1.0 - v[cs[0]]) ** (loops[i] - 1)
+        elif k == IFELSE:
+            t, yes, no = cs
+            adjoints[t] += a * (v[yes] - v[no])
+            adjoints[yes] += a * v[t]
+            adjoints[no] += a * (1.0 - v[t])
+        # Ensure and Optional always succeed, and Fail never does, whatever
+        # their children do
+    return np.array(adjoints)
+
+class Bottleneck:
+
+    """One parameter of a plan -- an Action's success_prob, or a Loop's max_loops
+    -- with the rate at which the plan's success probability changes with it"""
+
+    plan: Plan
+    parameter: str
+    value: float
+    sensitivity: float
+
+    def __init__(self, plan: Plan, parameter: str, value: float, sensitivity: float):
+        self.plan = plan
+        self.parameter = parameter
+        self.value = value
+        self.sensitivity = sensitivity
+
+    def __repr__(self):
+        return f"Bottleneck({self.plan}.{self.parameter}={self.value}, sensitivity={self.sensitivity:.4g})"
+
+class SuccessSensitivity:
+
+    """The success probability of a compiled plan, with its derivatives: the
+    adjoint of every node (the derivative of the plan's success probability with
+    respect to the node's), and so the derivative with respect to each Action's
+    success_prob.  As max_loops is an integer, a Loop's sensitivity is the
+    first-order gain from allowing one more iteration."""
+
+    cp: CompiledPlan
+    values: np.ndarray
+    adjoints: np.ndarray
+
+    def __init__(self, cp: CompiledPlan):
+        self.cp = cp
+        self.values = success_probabilities(cp)
+        self.adjoints = success_adjoints(cp, self.values)
+
+    @property
+    def probability(self) -> float: return float(self.values[self.cp.root])
+
+    def derivative(self, p: Plan) -> float:
+        """dP(success)/dP(p), for any node p of the plan -- for an Action, this is
+        the derivative with respect to its success_prob"""
+        return float(self.adjoints[self.cp.index_of(p)])
+
+    def loop_gain(self, p: Plan) -> float:
+        """The first-order change in P(success) from one more iteration of Loop p"""
+        i = self.cp.index_of(p)
+        child = self.cp.child_indices(i)[0]
+        c = self.values[child]
+        return float(self.adjoints[i] * c * (1.0 - c) ** self.cp.max_loops[i])
+
+    def bottlenecks(self, limit: int = None) -> List[Bottleneck]:
+        """Every Action and Loop parameter, ranked from the one the plan's success
+        is most sensitive to"""
+        report = []
+        for i, k in enumerate(self.cp.kind.tolist()):
+            p = self.cp.plan_at(i)
+            if k == ACTION:
+                report.append(Bottleneck(p, 'success_prob', p.success_prob, float(self.adjoints[i])))
+            elif k == LOOP:
+                report.append(Bottleneck(p, 'max_loops', p.max_loops, self.loop_gain(p)))
+        report.sort(key=lambda b: -abs(b.sensitivity))
+        return report[:limit] if limit is not None else report
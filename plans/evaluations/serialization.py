@@ -1,22 +1,47 @@
 
 import json 
+import re
 from functools import reduce
-from typing import List, Dict
-from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Fail, Evaluator
+from typing import List, Dict, Union
+from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Fail, MemoizingEvaluator, bottom_up
 from plans.math import dist_from_dict
 from plans.context import Context 
 
 def serialize(plan: Plan) -> str: 
     c = Context()
-    return json.dumps(DictTranslator().evaluate_plan(plan, c))
+    d = DictTranslator().evaluate_plan(plan, c) 
+    try: 
+        return json.dumps(d) 
+    except RecursionError: 
+        # nested deeper than json can recurse 
+        return _dumps(d) 
 
 def deserialize(ser: str) -> Plan: 
-    serialized: Dict = json.loads(ser) 
+    try: 
+        serialized: Dict = json.loads(ser) 
+    except RecursionError: 
+        serialized = _loads(ser) 
     return from_dict(serialized)
 
 def from_dict(d: Dict) -> Plan: 
+    # children are built before their parents, on an explicit stack 
+    built: List[Plan] = [] 
+    stack = [(d, False)] 
+    while stack: 
+        node, expanded = stack.pop() 
+        child_dicts = node.get('children', []) 
+        if child_dicts and not expanded: 
+            stack.append((node, True)) 
+            stack.extend((dc, False) for dc in reversed(child_dicts)) 
+            continue 
+        first = len(built) - len(child_dicts) 
+        children = built[first:] 
+        del built[first:] 
+        built.append(_plan_from_dict(node, children)) 
+    return built[0] 
+
+def _plan_from_dict(d: Dict, children: List[Plan]) -> Plan: 
     t = d.get('type')
-    children = [from_dict(dc) for dc in d.get('children', [])]
     if t == 'Action': 
         return Action(
             d.get('name'), 
@@ -25,19 +50,19 @@ def from_dict(d: Dict) -> Plan:
             dist_from_dict(d.get('duration')) 
         )
     elif t == 'Steps': 
-        return Steps(t.get('name'), *children) 
+        return Steps(d.get('name'), *children) 
     elif t == 'Requirements': 
-        return Requirements(t.get('name'), *children) 
+        return Requirements(d.get('name'), *children) 
     elif t == 'Options': 
-        return Options(t.get('name'), *children) 
+        return Options(d.get('name'), *children) 
     elif t == 'Alternatives': 
-        return Alternatives(t.get('name'), *children)
+        return Alternatives(d.get('name'), *children)
     elif t == 'Ensure': 
-        return Ensure(children[0], name=t.get('name'))
+        return Ensure(children[0], name=d.get('name'))
     elif t == 'Loop': 
-        return Loop(children[0], t.get('max_loops'), name=t.get('name')) 
+        return Loop(children[0], d.get('max_loops'), name=d.get('name')) 
     elif t == 'Optional': 
-        return Optional(children[0], name=t.get('name')) 
+        return Optional(children[0], name=d.get('name')) 
     elif t == 'Fail': 
         return Fail() 
     elif t == 'IfElse': 
@@ -45,10 +70,93 @@ def from_dict(d: Dict) -> Plan:
             children[0], 
             children[1], 
             children[2], 
-            name=t.get('name')
+            name=d.get('name')
         )
 
-class DictTranslator(Evaluator[Dict]): 
+# json.dumps and json.loads recurse once per level of nesting, so plans too deep 
+# for them are written and read here a node at a time, with json handling the 
+# fields of each node.  The text is the same as json.dumps writes. 
+
+_WHITESPACE = re.compile(r'\s*') 
+_decode = json.JSONDecoder().raw_decode 
+
+def _dumps(d: Dict) -> str: 
+    parts: List[str] = [] 
+    # the dicts still to write, and the text between them, last first 
+    stack: List[Union[str, Dict]] = [d] 
+    while stack: 
+        item = stack.pop() 
+        if type(item) is str: 
+            parts.append(item) 
+        elif 'children' not in item: 
+            parts.append(json.dumps(item)) 
+        else: 
+            stack.append('}') 
+            fields = list(item.items()) 
+            for i in reversed(range(len(fields))): 
+                key, value = fields[i] 
+                separator = ', ' if i > 0 else '' 
+                if key == 'children': 
+                    stack.append(']') 
+                    for j in reversed(range(len(value))): 
+                        stack.append(value[j]) 
+                        if j > 0: 
+                            stack.append(', ') 
+                    stack.append(f'{separator}{json.dumps(key)}: [') 
+                else: 
+                    stack.append(f'{separator}{json.dumps(key)}: {json.dumps(value)}') 
+            stack.append('{') 
+    return ''.join(parts) 
+
+def _loads(ser: str) -> Dict: 
+    def skip(i: int) -> int: 
+        return _WHITESPACE.match(ser, i).end() 
+
+    def expect(i: int, char: str) -> int: 
+        if ser[i:i + 1] != char: 
+            raise json.JSONDecodeError(f"Expecting '{char}'", ser, i) 
+        return skip(i + 1) 
+
+    # the objects being read, innermost last 
+    stack: List[Dict] = [] 
+    i, state = skip(0), 'object' 
+    while True: 
+        if state == 'object': 
+            i = expect(i, '{') 
+            stack.append({}) 
+            state = 'after_member' if ser[i:i + 1] == '}' else 'member' 
+        elif state == 'member': 
+            if ser[i:i + 1] != '"': 
+                raise json.JSONDecodeError("Expecting property name enclosed in double quotes", ser, i) 
+            key, i = _decode(ser, i) 
+            i = expect(skip(i), ':') 
+            if key == 'children': 
+                i = expect(i, '[') 
+                stack[-1][key] = [] 
+                state = 'after_child' if ser[i:i + 1] == ']' else 'object' 
+            else: 
+                stack[-1][key], i = _decode(ser, i) 
+                i, state = skip(i), 'after_member' 
+        elif state == 'after_member': 
+            if ser[i:i + 1] == ',': 
+                i, state = skip(i + 1), 'member' 
+                continue 
+            i = expect(i, '}') 
+            d = stack.pop() 
+            if not stack: 
+                if i != len(ser): 
+                    raise json.JSONDecodeError("Extra data", ser, i) 
+                return d 
+            stack[-1]['children'].append(d) 
+            state = 'after_child' 
+        else: 
+            # after a child, or at the start of an empty children list 
+            if ser[i:i + 1] == ',': 
+                i, state = skip(i + 1), 'object' 
+            else: 
+                i, state = expect(i, ']'), 'after_member' 
+
+class DictTranslator(MemoizingEvaluator[Dict]): 
 
     def evaluate_action(self, action: Action, c: Context) -> Dict:
         return {
@@ -59,42 +167,49 @@ class DictTranslator(Evaluator[Dict]):
             "duration": action.duration.to_dict()
         }
 
-    def generic_plan_dict(self, plan: Plan, type: str, c: Context) -> Dict: 
-        children: List[Dict] = [self.evaluate_plan(p, c) for p in plan.children]
+    def generic_plan_dict(self, plan: Plan, type: str, children: List[Dict]) -> Dict: 
         return {
             "type": type, 
             "name": plan.name, 
             "children": children
         }
 
-    def evaluate_steps(self, steps: Steps, c: Context) -> Dict:
-        return self.generic_plan_dict(steps, "Steps", c)
+    @bottom_up
+    def evaluate_steps(self, steps: Steps, children: List[Dict], c: Context) -> Dict:
+        return self.generic_plan_dict(steps, "Steps", children)
     
-    def evaluate_requirements(self, reqs: Requirements, c: Context) -> Dict:
-        return self.generic_plan_dict(reqs, "Requirements", c)
+    @bottom_up
+    def evaluate_requirements(self, reqs: Requirements, children: List[Dict], c: Context) -> Dict:
+        return self.generic_plan_dict(reqs, "Requirements", children)
     
-    def evaluate_options(self, options: Options, c: Context) -> Dict:
-        return self.generic_plan_dict(options, "Options", c)
+    @bottom_up
+    def evaluate_options(self, options: Options, children: List[Dict], c: Context) -> Dict:
+        return self.generic_plan_dict(options, "Options", children)
 
-    def evaluate_alternatives(self, alternatives: Alternatives, c: Context) -> Dict:
-        return self.generic_plan_dict(alternatives, "Alternatives", c)
+    @bottom_up
+    def evaluate_alternatives(self, alternatives: Alternatives, children: List[Dict], c: Context) -> Dict:
+        return self.generic_plan_dict(alternatives, "Alternatives", children)
 
-    def evaluate_ensure(self, ensure: Ensure, c: Context) -> Dict:
-        return self.generic_plan_dict(ensure, "Ensure", c)
+    @bottom_up
+    def evaluate_ensure(self, ensure: Ensure, children: List[Dict], c: Context) -> Dict:
+        return self.generic_plan_dict(ensure, "Ensure", children)
     
-    def evaluate_loop(self, loop: Loop, c: Context) -> Dict:
-        loop_dict = self.generic_plan_dict(loop, "Loop", c)
+    @bottom_up
+    def evaluate_loop(self, loop: Loop, children: List[Dict], c: Context) -> Dict:
+        loop_dict = self.generic_plan_dict(loop, "Loop", children)
         loop_dict['max_loops'] = loop.max_loops
         return loop_dict 
     
-    def evaluate_optional(self, opt: Optional, c: Context) -> Dict:
-        return self.generic_plan_dict(opt, "Optional", c)
+    @bottom_up
+    def evaluate_optional(self, opt: Optional, children: List[Dict], c: Context) -> Dict:
+        return self.generic_plan_dict(opt, "Optional", children)
     
     def evaluate_fail(self, failure: Fail, c: Context) -> Dict:
         return {
             "type": "Fail"
         }
     
-    def evaluate_ifelse(self, ifelse: IfElse, c: Context) -> Dict: 
-        return self.generic_plan_dict(ifelse, "IfElse", c)
+    @bottom_up
+    def evaluate_ifelse(self, ifelse: IfElse, children: List[Dict], c: Context) -> Dict: 
+        return self.generic_plan_dict(ifelse, "IfElse", children)
     
\ No newline at end of file
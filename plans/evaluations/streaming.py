@@ -0,0 +1,321 @@
+
+from collections import Counter, deque
+from heapq import heappush, heappop
+from random import Random
+from typing import Deque, Dict, Iterator, List, Tuple
+
+from plans.plan import Plan, Event, History
+from plans.outcomes import Status
+
+def iter_events(p: Plan, seed: int = None, rand: Random = None, start_time: int = 0) -> Iterator[Event]:
+    """Lazily simulates one execution of p, yielding each Event as soon as it
+    completes.  Events come out in order of their end times (children before their
+    parents, at equal times): an Event is only complete once its end is known,
+    and a compound plan ends after all of its children.
+
+    Memory use is bounded by the number of plan nodes running at once, not by the
+    length of the history -- so long or many-times-retried executions can be piped
+    into timelines or aggregators without building a History.
+    """
+    return EventSimulator(p, rand or Random(seed), start_time).events()
+
+def replay_history(history: History) -> List[Event]:
+    """The events of a history, in an order EventSimulator could have emitted
+    them in: its execution is simulated again, with every Action ending when
+    and how it did in the history.  Histories which the simulator could not
+    have produced -- where two children of an Alternatives succeeded at the
+    very time it ended, say -- or whose nesting is gone, once 'events' has been
+    read, come in History.completion_order instead."""
+    # gathered before the replay, which leaves the nesting as it is
+    ordered = history.completion_order()
+    try:
+        events = list(_Replay(history).events())
+    except _Diverged:
+        return ordered
+    if Counter(map(_signature, events)) != Counter(map(_signature, ordered)):
+        return ordered
+    return events
+
+def _signature(e: Event) -> tuple:
+    return (e.plan.id, e.start_time, e.end_time, e.status)
+
+class _Run:
+
+    """One running execution of one plan node"""
+
+    __slots__ = ('plan', 'parent', 'start', 'position', 'status', 'running', 'done')
+
+    def __init__(self, plan: Plan, parent: '_Run', start: int):
+        self.plan = plan
+        self.parent = parent
+        self.start = start
+        self.position = 0
+        self.status = True
+        self.running: List['_Run'] = []
+        self.done = False
+
+class EventSimulator:
+
+    """A discrete-event simulation of a plan's execution.  Actions schedule their
+    completions on a queue ordered by time; compound plans react to their
+    children's completions by starting further children, or by completing
+    themselves.  When Requirements fail (or Alternatives succeed) early, the
+    children still running are aborted on the spot, as in
+    History.with_abortable_children.
+
+    Starting a node and passing a completion up to its parent are work items on
+    a stack, run in the order nested calls would run them -- so plans of any
+    depth are simulated without recursion.
+    """
+
+    plan: Plan
+    rand: Random
+    start_time: int
+    queue: List[Tuple[int, int, _Run]]
+    work: List[tuple]
+    emitted: Deque[Event]
+
+    def __init__(self, plan: Plan, rand: Random = None, start_time: int = 0):
+        self.plan = plan
+        self.rand = rand or Random()
+        self.start_time = start_time
+        self.queue = []
+        self.work = []
+        self.emitted = deque()
+        self._sequence = 0
+
+    def events(self) -> Iterator[Event]:
+        self.start(self.plan, None, self.start_time)
+        self.run_work()
+        while True:
+            while self.emitted:
+                yield self.emitted.popleft()
+            if not self.queue:
+                return
+            time, _, run = heappop(self.queue)
+            if not run.done:
+                self.complete(run, time, run.status)
+                self.run_work()
+
+    def run_work(self):
+        work = self.work
+        while work:
+            handler, *args = work.pop()
+            handler(*args)
+
+    def start(self, plan: Plan, parent: _Run, time: int):
+        """Schedules plan to start beneath parent at the given time"""
+        self.work.append((self.begin, plan, parent, time))
+
+    def begin(self, plan: Plan, parent: _Run, time: int):
+        if parent is not None and parent.done:
+            # parent ended before reaching this child
+            return
+        run = _Run(plan, parent, time)
+        if parent is not None:
+            parent.running.append(run)
+        getattr(self, 'start_' + plan.plan_type.lower())(run)
+
+    def complete(self, run: _Run, time: int, status: bool):
+        run.done = True
+        self.emitted.append(Event.complete(
+            run.plan, run.start, time, Status.SUCCESS if status else Status.FAILURE
+        ))
+        parent = run.parent
+        if parent is not None and not parent.done:
+            parent.running.remove(run)
+            self.work.append((
+                getattr(self, 'child_done_' + parent.plan.plan_type.lower()), parent, run, time, status
+            ))
+
+    def abort(self, run: _Run, time: int):
+        """Ends a running node, and everything running beneath it, in FAILURE at
+        the given time"""
+        stack = [(run, False)]
+        while stack:
+            node, children_aborted = stack.pop()
+            if children_aborted:
+                node.done = True
+                self.emitted.append(Event.complete(node.plan, node.start, time, Status.FAILURE))
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.running))
+
+    # Actions
+
+    def start_action(self, run: _Run):
+        outcome = run.plan.sample_outcome(self.rand)
+        run.status = bool(outcome.status)
+        self._sequence += 1
+        heappush(self.queue, (run.start + outcome.duration, self._sequence, run))
+
+    def start_fail(self, run: _Run):
+        self.complete(run, run.start, False)
+
+    # serial plans
+
+    def start_steps(self, run: _Run):
+        self.next_in_sequence(run, run.start, True)
+
+    def child_done_steps(self, run: _Run, child: _Run, time: int, status: bool):
+        if not status:
+            self.complete(run, time, False)
+        else:
+            self.next_in_sequence(run, time, True)
+
+    def start_options(self, run: _Run):
+        self.next_in_sequence(run, run.start, False)
+
+    def child_done_options(self, run: _Run, child: _Run, time: int, status: bool):
+        if status:
+            self.complete(run, time, True)
+        else:
+            self.next_in_sequence(run, time, False)
+
+    def next_in_sequence(self, run: _Run, time: int, status_when_exhausted: bool):
+        children = run.plan.children
+        if run.position == len(children):
+            self.complete(run, time, status_when_exhausted)
+        else:
+            run.position += 1
+            self.start(children[run.position - 1], run, time)
+
+    # parallel plans
+
+    def start_requirements(self, run: _Run):
+        self.start_in_parallel(run)
+
+    def child_done_requirements(self, run: _Run, child: _Run, time: int, status: bool):
+        self.resolve_in_parallel(run, time, status, False)
+
+    def start_alternatives(self, run: _Run):
+        self.start_in_parallel(run)
+
+    def child_done_alternatives(self, run: _Run, child: _Run, time: int, status: bool):
+        self.resolve_in_parallel(run, time, status, True)
+
+    def start_in_parallel(self, run: _Run):
+        children = run.plan.children
+        run.position = len(children)
+        if not children:
+            self.complete(run, run.start, True)
+        # the first child is started first, and later ones are skipped once
+        # run has ended
+        for child in reversed(children):
+            self.start(child, run, run.start)
+
+    def resolve_in_parallel(self, run: _Run, time: int, status: bool, resolve_on: bool):
+        run.position -= 1
+        if status == resolve_on:
+            for child in list(run.running):
+                self.abort(child, time)
+            run.running = []
+            self.complete(run, time, resolve_on)
+        elif run.position == 0:
+            self.complete(run, time, not resolve_on)
+
+    # retries
+
+    def start_ensure(self, run: _Run):
+        self.start(run.plan.children[0], run, run.start)
+
+    def child_done_ensure(self, run: _Run, child: _Run, time: int, status: bool):
+        if status:
+            self.complete(run, time, True)
+        else:
+            self.start(run.plan.children[0], run, time)
+
+    def start_loop(self, run: _Run):
+        if run.plan.max_loops <= 0:
+            self.complete(run, run.start, False)
+        else:
+            run.position = 1
+            self.start(run.plan.children[0], run, run.start)
+
+    def child_done_loop(self, run: _Run, child: _Run, time: int, status: bool):
+        if status or run.position >= run.plan.max_loops:
+            self.complete(run, time, status)
+        else:
+            run.position += 1
+            self.start(run.plan.children[0], run, time)
+
+    # branches
+
+    def start_ifelse(self, run: _Run):
+        self.start(run.plan.children[0], run, run.start)
+
+    def child_done_ifelse(self, run: _Run, child: _Run, time: int, status: bool):
+        if run.position == 0:
+            run.position = 1
+            self.start(run.plan.children[1 if status else 2], run, time)
+        else:
+            self.complete(run, time, status)
+
+    def start_optional(self, run: _Run):
+        self.start(run.plan.children[0], run, run.start)
+
+    def child_done_optional(self, run: _Run, child: _Run, time: int, status: bool):
+        self.complete(run, time, True)
+
+class _Diverged(Exception):
+    pass
+
+# the status with which a child of each kind of parallel plan ends it early
+_DECIDES = {'Requirements': False, 'Alternatives': True}
+
+class _Replay(EventSimulator):
+
+    """An EventSimulator which runs each node as its history did, starting the
+    children of a node's run with the next of its child histories.
+
+    When completions tie, one which ends a Requirements (or Alternatives)
+    early comes after the others, which the history has ending in their own
+    right rather than aborted: each Action's completion is queued behind
+    those of the others at its time by the number of parallel plans it would
+    end that way.
+    """
+
+    def __init__(self, history: History):
+        super().__init__(history.result.plan, None, history.start_time)
+        self.history = history
+        # of each run, what remains of its child histories, its own result,
+        # and how many parallel plans its completion would end early
+        self.histories: Dict[_Run, Deque[History]] = {}
+        self.results: Dict[_Run, Event] = {}
+        self.decides: Dict[_Run, int] = {}
+
+    def begin(self, plan: Plan, parent: _Run, time: int):
+        if parent is not None and parent.done:
+            return
+        if parent is None:
+            history, decides = self.history, 0
+        else:
+            siblings = self.histories[parent]
+            if not siblings:
+                raise _Diverged()
+            history = siblings.popleft()
+            outer, result = self.results[parent], history.result
+            decides = 0
+            resolve_on = _DECIDES.get(parent.plan.plan_type)
+            # a child's completion ends its parent when they end together, and
+            # the parent doesn't run another child after it
+            if result.end_time == outer.end_time and (resolve_on is not None or not siblings):
+                decides = self.decides[parent]
+                if resolve_on is not None and bool(outer.status) == bool(result.status) == resolve_on:
+                    decides += 1
+        result = history.result
+        if result.plan is not plan or result.start_time != time or history.children is None and history.events:
+            raise _Diverged()
+        run = _Run(plan, parent, time)
+        if parent is not None:
+            parent.running.append(run)
+        self.histories[run] = deque(history.children or ())
+        self.results[run] = result
+        self.decides[run] = decides
+        getattr(self, 'start_' + plan.plan_type.lower())(run)
+
+    def start_action(self, run: _Run):
+        result = self.results[run]
+        run.status = bool(result.status)
+        self._sequence += 1
+        heappush(self.queue, (result.end_time, (self.decides[run], self._sequence), run))
@@ -1,7 +1,7 @@
 
 from functools import reduce
 from typing import List
-from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Fail, Evaluator
+from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Fail, MemoizingEvaluator, bottom_up
 from plans.context import Context 
 
 def success_probability(p: Plan) -> float: 
@@ -10,42 +10,52 @@ def success_probability(p: Plan) -> float:
     value = v.evaluate_plan(p, c) 
     return value 
 
-class SuccessEvaluator(Evaluator[float]): 
+class SuccessEvaluator(MemoizingEvaluator[float]): 
 
     def evaluate_action(self, action: Action, c: Context = None) -> float:
         return action.success_prob
 
-    def success_conjunction(self, ps: List[Plan], c: Context = None) -> float:
-        children: List[float] = [self.evaluate_plan(p, c) for p in ps]
+    @staticmethod 
+    def conjunction(children: List[float]) -> float: 
         return reduce(lambda x, y: x * y, children) 
 
-    def success_disjunction(self, ps: List[Plan], c: Context = None) -> float:
-        children: List[float] = [self.evaluate_plan(p, c) for p in ps]
+    @staticmethod 
+    def disjunction(children: List[float]) -> float: 
         not_children = [1.0 - x for x in children]
         not_all = reduce(lambda x, y: x * y, not_children) 
         return 1.0 - not_all
 
-    def evaluate_steps(self, steps: Steps, c: Context = None) -> float:
-        return self.success_conjunction(steps.children, c)
+    def success_conjunction(self, ps: List[Plan], c: Context = None) -> float:
+        return self.conjunction([self.evaluate_plan(p, c) for p in ps])
+
+    def success_disjunction(self, ps: List[Plan], c: Context = None) -> float:
+        return self.disjunction([self.evaluate_plan(p, c) for p in ps])
+
+    @bottom_up
+    def evaluate_steps(self, steps: Steps, children: List[float], c: Context = None) -> float:
+        return self.conjunction(children)
     
-    def evaluate_requirements(self, reqs: Requirements, c: Context = None) -> float:
-        return self.success_conjunction(reqs.children, c)
+    @bottom_up
+    def evaluate_requirements(self, reqs: Requirements, children: List[float], c: Context = None) -> float:
+        return self.conjunction(children)
     
-    def evaluate_options(self, options: Options, c: Context = None) -> float:
-        print("evaluating options")
-        return self.success_disjunction(options.children, c) 
+    @bottom_up
+    def evaluate_options(self, options: Options, children: List[float], c: Context = None) -> float:
+        return self.disjunction(children) 
 
-    def evaluate_alternatives(self, alternatives: Alternatives, c: Context = None) -> float:
-        return self.success_disjunction(alternatives.children, c)
+    @bottom_up
+    def evaluate_alternatives(self, alternatives: Alternatives, children: List[float], c: Context = None) -> float:
+        return self.disjunction(children)
 
-    def evaluate_ensure(self, ensure: Ensure, c: Context = None) -> float:
-        p_child = self.evaluate_plan(ensure.children[0], c) 
-        if p_child <= 0.0: 
+    @bottom_up
+    def evaluate_ensure(self, ensure: Ensure, children: List[float], c: Context = None) -> float:
+        if children[0] <= 0.0: 
             raise ValueError("Cannot ENSURE the execution of a child plan with a 0 success probability")
         return 1.0
     
-    def evaluate_loop(self, loop: Loop, c: Context = None) -> float:
-        child: float = self.evaluate_plan(loop.children[0], c)
+    @bottom_up
+    def evaluate_loop(self, loop: Loop, children: List[float], c: Context = None) -> float:
+        child: float = children[0]
         not_all = reduce(lambda x, y: x * y, (1.0 - child for i in range(loop.max_loops)), 1.0) 
         return 1.0 - not_all
     
@@ -55,8 +65,6 @@ class SuccessEvaluator(Evaluator[float]):
     def evaluate_fail(self, failure: Fail, c: Context = None) -> float:
         return 0.0
     
-    def evaluate_ifelse(self, ifelse: IfElse, c: Context = None) -> float: 
-        children: List[float] = [self.evaluate_plan(p, c) for p in ifelse.children]
+    @bottom_up
+    def evaluate_ifelse(self, ifelse: IfElse, children: List[float], c: Context = None) -> float: 
         return children[0] * children[1] + (1.0 - children[0]) * children[2]
-
-    
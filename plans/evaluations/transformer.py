@@ -1,60 +1,62 @@
 
 from functools import reduce
 from typing import List
-from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Fail, History, Evaluator
+from plans.plan import Action, Alternatives, Fail, Loop, Optional, Steps, Plan, Requirements, Options, Ensure, IfElse, Fail, History, IterativeEvaluator, bottom_up
 from plans.context import Context
 
-class PlanTransformer(Evaluator[Plan]): 
+class PlanTransformer(IterativeEvaluator[Plan]): 
 
     def evaluate_action(self, action: Action, c: Context) -> Plan:
         return action 
 
-    def evaluate_steps(self, steps: Steps, c: Context) -> Plan:
-        children: List[Plan] = [self.evaluate_plan(p, c) for p in steps.children]
+    @bottom_up
+    def evaluate_steps(self, steps: Steps, children: List[Plan], c: Context) -> Plan:
         return Steps(
             steps.name, *children
         )
     
-    def evaluate_requirements(self, reqs: Requirements, c: Context) -> Plan:
-        children: List[Plan] = [self.evaluate_plan(p, c) for p in reqs.children]
+    @bottom_up
+    def evaluate_requirements(self, reqs: Requirements, children: List[Plan], c: Context) -> Plan:
         return Requirements(
             reqs.name, *children
         )
     
-    def evaluate_options(self, options: Options, c: Context) -> Plan:
-        children: List[Plan] = [self.evaluate_plan(p, c) for p in options.children]
+    @bottom_up
+    def evaluate_options(self, options: Options, children: List[Plan], c: Context) -> Plan:
         return Options(
             options.name, *children
         )
     
-    def evaluate_alternatives(self, alternatives: Alternatives, c: Context) -> Plan:
-        children: List[Plan] = [self.evaluate_plan(p, c) for p in alternatives.children]
+    @bottom_up
+    def evaluate_alternatives(self, alternatives: Alternatives, children: List[Plan], c: Context) -> Plan:
         return Alternatives(
             alternatives.name, *children
         )
 
-    def evaluate_ensure(self, ensure: Ensure, c: Context) -> Plan:
-        p_child = self.evaluate_plan(ensure.children[0], c) 
-        return Ensure(p_child, name=ensure.name)
+    @bottom_up
+    def evaluate_ensure(self, ensure: Ensure, children: List[Plan], c: Context) -> Plan:
+        return Ensure(children[0], name=ensure.name)
     
-    def evaluate_loop(self, loop: Loop, c: Context) -> Plan:
+    @bottom_up
+    def evaluate_loop(self, loop: Loop, children: List[Plan], c: Context) -> Plan:
         return Loop(
-            self.evaluate_plan(loop.children[0], c), 
+            children[0], 
             loop.max_loops, 
             name=loop.name
         )
     
-    def evaluate_optional(self, opt: Optional, c: Context) -> Plan:
+    @bottom_up
+    def evaluate_optional(self, opt: Optional, children: List[Plan], c: Context) -> Plan:
         return Optional(
-            self.evaluate_plan(opt.children[0], c), 
+            children[0], 
             name=opt.name
         )
     
     def evaluate_fail(self, failure: Fail, c: Context) -> Plan:
         return failure
     
-    def evaluate_ifelse(self, ifelse: IfElse, c: Context) -> Plan: 
-        children: List[Plan] = [self.evaluate_plan(p, c) for p in ifelse.children]
+    @bottom_up
+    def evaluate_ifelse(self, ifelse: IfElse, children: List[Plan], c: Context) -> Plan: 
         return IfElse(
             children[0], 
             children[1], 
@@ -67,7 +69,5 @@ class EnsureAction(PlanTransformer):
     def evaluate_action(self, action: Action, c: Context) -> Plan: 
         return Ensure(action)  
 
-# I want to build a RemainingPlan transformer, which transforms 
-# (Plan x History) -> Plan, where the output plan is the *plan that 
-# remains unfinished* given a particular History of Events
-# ... but I don't know how, yet.
+# The RemainingPlan transformation, (Plan x History) -> Plan, lives in 
+# plans.evaluations.remaining
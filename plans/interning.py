@@ -0,0 +1,62 @@
+
+import copy
+from typing import Dict, Type
+
+from plans.plan import Plan, P, generate_id
+
+class PlanInterner:
+
+    """Hash-conses Plan nodes: intern() returns one canonical node for every
+    distinct structural digest, so that structurally identical subtrees (e.g. the
+    repeated Actions of a parsed paragraph, or the copies made by finite_loop) are
+    stored only once.  Canonical nodes are shared between parents, and should be
+    treated as immutable.
+    """
+
+    canonical: Dict[str, Plan]
+
+    def __init__(self):
+        self.canonical = {}
+
+    def __len__(self) -> int: return len(self.canonical)
+
+    def __call__(self, plan: P) -> P:
+        return self.intern(plan)
+
+    def make(self, plan_class: Type[P], *args, **kwargs) -> P:
+        """Factory for canonical nodes: constructs a plan_class(*args, **kwargs)
+        and interns it"""
+        return self.intern(plan_class(*args, **kwargs))
+
+    def intern(self, plan: P) -> P:
+        """Returns the canonical node with the same structure as plan, registering
+        plan (or a copy of it, with canonical children) if there is none yet"""
+        interned: Dict[str, Plan] = {}
+        stack = [(plan, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node.id in interned:
+                continue
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children if child.id not in interned)
+                continue
+            digest = node.structural_digest()
+            if digest not in self.canonical:
+                children = [interned[child.id] for child in node.children]
+                if any(a is not b for a, b in zip(children, node.children)):
+                    self.canonical[digest] = self._with_children(node, children)
+                else:
+                    self.canonical[digest] = node
+            interned[node.id] = self.canonical[digest]
+        return interned[plan.id]
+
+    def _with_children(self, plan: Plan, children) -> Plan:
+        clone = copy.copy(plan)
+        # bypass Plan.__setattr__: the clone is a new node, not a mutation
+        object.__setattr__(clone, 'id', generate_id())
+        clone.children = list(children)
+        return clone
+
+def intern_plan(plan: P) -> P:
+    return PlanInterner().intern(plan)
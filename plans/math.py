@@ -1,6 +1,11 @@
 
 from random import Random
-from typing import Protocol, TypeVar, Dict
+from typing import Protocol, TypeVar, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING: 
+    # numpy is only imported by the array methods, so that importing plans 
+    # doesn't pay for it
+    import numpy as np
 
 TAddable = TypeVar("TAddable") 
 
@@ -21,6 +26,26 @@ class IntDist:
 
     def max_value(self) -> int: return None
 
+    def sample_array(self, rng: 'np.random.Generator', n: int) -> 'np.ndarray': 
+        """Draws n independent samples at once, as an integer array.  Subclasses 
+        should override this with a vectorized draw; the default falls back to 
+        n calls of sample()"""
+        import numpy as np
+        rand = Random(int(rng.integers(2**63)))
+        return np.array([self.sample(rand) for i in range(n)], dtype=np.int64)
+
+    def pmf(self) -> 'np.ndarray': 
+        """The probability mass function of this distribution, as an array whose 
+        i'th entry is the probability of the value i -- or None, if the 
+        distribution can't be tabulated this way"""
+        return None
+
+    def quantiles(self, u: 'np.ndarray') -> 'np.ndarray': 
+        """The values at the quantiles u (an array of uniforms in [0, 1)), by 
+        inverting the CDF in closed form -- or None, if this distribution has no 
+        closed form (see pmf instead)"""
+        return None
+
     def __add__(self: 'IntDist', other: 'IntDist') -> 'IntDist': 
         return DistributionSum(self, other) 
     
@@ -34,6 +59,18 @@ class Constant(IntDist):
     def is_deterministic(self) -> bool: return True
     def max_value(self) -> int: return self.value
     def sample(self, _: Random) -> int: return self.value 
+    def sample_array(self, _: 'np.random.Generator', n: int) -> 'np.ndarray': 
+        import numpy as np
+        return np.full(n, self.value, dtype=np.int64)
+    def pmf(self) -> 'np.ndarray': 
+        import numpy as np
+        if self.value < 0: return None
+        p = np.zeros(self.value + 1) 
+        p[self.value] = 1.0 
+        return p 
+    def quantiles(self, u: 'np.ndarray') -> 'np.ndarray': 
+        import numpy as np
+        return np.full(len(u), self.value, dtype=np.int64)
     def to_dict(self) -> Dict:
         return {
             "type": "Constant", 
@@ -52,6 +89,23 @@ class UniformRange(IntDist):
     
     def sample(self, rand: Random) -> int: 
         return rand.randint(self.lower_value, self.upper_value) 
+
+    def sample_array(self, rng: 'np.random.Generator', n: int) -> 'np.ndarray': 
+        return rng.integers(self.lower_value, self.upper_value, size=n, endpoint=True)
+
+    def pmf(self) -> 'np.ndarray': 
+        import numpy as np
+        if self.lower_value < 0 or self.upper_value < self.lower_value: return None
+        p = np.zeros(self.upper_value + 1) 
+        p[self.lower_value:] = 1.0 / (self.upper_value - self.lower_value + 1)
+        return p 
+
+    def quantiles(self, u: 'np.ndarray') -> 'np.ndarray': 
+        import numpy as np
+        if self.upper_value < self.lower_value: return None
+        width = self.upper_value - self.lower_value + 1
+        d = self.lower_value + (u * width).astype(np.int64)
+        return np.minimum(d, self.upper_value)
     
     def to_dict(self) -> Dict: 
         return {
@@ -80,6 +134,15 @@ class DistributionSum(IntDist):
     
     def sample(self, rand: Random) -> int: 
         return self.left.sample(rand) + self.right.sample(rand)
+
+    def sample_array(self, rng: 'np.random.Generator', n: int) -> 'np.ndarray': 
+        return self.left.sample_array(rng, n) + self.right.sample_array(rng, n)
+
+    def pmf(self) -> 'np.ndarray': 
+        import numpy as np
+        left, right = self.left.pmf(), self.right.pmf() 
+        if left is None or right is None: return None
+        return np.convolve(left, right)
     
     def to_dict(self) -> Dict: 
         return {
@@ -91,16 +154,16 @@ class DistributionSum(IntDist):
 def dist_from_dict(d: Dict) -> IntDist: 
     t = d.get("type") 
     if t == 'Constant': 
-        return Constant(t.get('value')) 
+        return Constant(d.get('value')) 
     elif t == 'UniformRange': 
         return UniformRange(
-            t.get('lower_value'), 
-            t.get('upper_value') 
+            d.get('lower_value'), 
+            d.get('upper_value') 
         )
     elif t == 'DistributionSum': 
         return DistributionSum(
-            dist_from_dict(t.get('left')), 
-            dist_from_dict(t.get('right'))
+            dist_from_dict(d.get('left')), 
+            dist_from_dict(d.get('right'))
         )
     else: 
         raise ValueError(t) 
\ No newline at end of file
@@ -29,25 +29,33 @@ class Status(Enum):
 
 class Outcome: 
 
-    status: Status 
-    duration: int 
+    """The result of executing a plan: a Status, and the time it took.  Outcomes 
+    are immutable, slotted value objects."""
+
+    __slots__ = ('_status', '_duration')
 
     def __init__(self, status: Status, duration: int = 0): 
-        self.status = status 
-        self.duration = duration 
+        self._status = status 
+        self._duration = duration 
     
+    @property 
+    def status(self) -> Status: return self._status 
+
+    @property 
+    def duration(self) -> int: return self._duration 
+
     def __eq__(self, other) -> bool: 
         return (
             isinstance(other, Outcome) and 
-            self.status == other.status and 
-            self.duration == other.duration
+            self._status == other._status and 
+            self._duration == other._duration
         )
     
     def __lt__(self, other: 'Outcome') -> bool: 
-        return (self.status, self.duration) < (other.status, other.duration)
+        return (self._status.value, self._duration) < (other._status.value, other._duration)
 
     def __hash__(self): 
-        return hash((self.status, self.duration))
+        return hash((self._status, self._duration))
     
     def __repr__(self): 
         return f"{self.status}) (duration: {self.duration})"
\ No newline at end of file
@@ -1,12 +1,17 @@
 
-from sentence_splitter import SentenceSplitter 
-
+from functools import lru_cache
 from typing import List 
 
+@lru_cache(maxsize=None)
+def _splitter(language: str = "en"): 
+    # sentence_splitter is imported, and its splitter built, once -- on first use
+    from sentence_splitter import SentenceSplitter 
+    return SentenceSplitter(language=language) 
+
 # split_into_sentences is intended to be a generic splitting funciton 
 # which wraps sentence_splitter or whatever other internal parsing / splitting 
 # logic (from nltk in the future, maybe?) we choose to use. 
 def split_into_sentences(txt: str) -> List[str]: 
-    splitter = SentenceSplitter(language="en") 
+    splitter = _splitter("en") 
     no_newlines = txt.replace('\n', ' ') 
     return splitter.split(no_newlines) 
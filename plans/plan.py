@@ -1,16 +1,22 @@
 
 from uuid import uuid4
-from typing import List, Union, TypeVar, Callable, Iterable, Dict, Generic
+from hashlib import blake2b
+import json
+from typing import List, Union, TypeVar, Callable, Iterable, Dict, Generic, TYPE_CHECKING
 from random import Random 
 from itertools import chain 
-
-from rich.tree import Tree 
-from rich.console import Console
+from collections import OrderedDict
+from types import GeneratorType
+from weakref import ref
 
 from plans.outcomes import Outcome, Status
 from plans.math import IntDist, Constant
 from plans.context import Context
 
+if TYPE_CHECKING: 
+    # rich is only imported when a plan is first rendered
+    from rich.tree import Tree 
+
 def generate_id(): 
     return str(uuid4())
 
@@ -54,77 +60,378 @@ class Evaluator(Generic[T]):
     def evaluate_choices(self, choices: 'Choices', c: Context) -> T: 
         ...
 
+# returned by IterativeEvaluator.lookup when it has no value for a plan
+MISSING = object()
+
+class IterativeEvaluator(Evaluator[T]): 
+
+    """An Evaluator that can evaluate plans of any depth, by running its evaluate_* 
+    methods on an explicit stack instead of recursing through Plan.evaluate. 
+
+    Methods opt in to the explicit stack by being generators, which yield to have 
+    children evaluated: yielding a Plan (or a (Plan, Context) pair) is answered 
+    with its value, and yielding a list of Plans with the list of their values.  
+    They return their own value when done.  Methods that return a value directly, 
+    or that call evaluate_plan themselves, work as before.  A method that only 
+    combines the values of all of a node's children is best written with 
+    bottom_up, which runs it without a generator outside the explicit stack. 
+
+    evaluate_plan recurses through Plan.evaluate, which is the fastest way to 
+    evaluate plans of ordinary depth, running generator methods as it goes.  Past 
+    max_recursion_depth nested evaluations, it evaluates the rest of the subtree 
+    on the explicit stack, so that no recursion limit need be raised; setting 
+    max_recursion_depth to 0 opts in to the explicit stack for the whole plan.  
+
+    Subclasses can cache values by overriding lookup and record, which are called 
+    before and after evaluating each node. 
+    """
+
+    # nested evaluations of compound nodes before evaluate_plan switches to the 
+    # explicit stack; each one takes three or four Python frames 
+    max_recursion_depth: int = 50 
+    _depth: int = 0 
+    _memoized: bool = False 
+
+    def __init_subclass__(cls, **kwargs): 
+        super().__init_subclass__(**kwargs) 
+        cls._memoized = cls.lookup is not IterativeEvaluator.lookup 
+
+    def evaluate_plan(self, plan: 'Plan', c: Context = None) -> T: 
+        memoized = self._memoized 
+        if memoized: 
+            value = self.lookup(plan, c) 
+            if value is not MISSING: 
+                return value 
+        if plan.children: 
+            depth = self._depth 
+            if depth >= self.max_recursion_depth: 
+                value = self._evaluate_on_stack(plan, c) 
+            else: 
+                self._depth = depth + 1 
+                try: 
+                    value = plan.evaluate(self, c) 
+                    if type(value) is GeneratorType: 
+                        value = self._resume(value, c) 
+                finally: 
+                    self._depth = depth 
+        else: 
+            value = plan.evaluate(self, c) 
+            if type(value) is GeneratorType: 
+                value = self._resume(value, c) 
+        if memoized: 
+            self.record(plan, c, value) 
+        return value 
+
+    def _resume(self, generator, c: Context) -> T: 
+        """Runs a generator method to completion, evaluating the children it asks 
+        for recursively"""
+        evaluate, send = self.evaluate_plan, generator.send 
+        value = error = None 
+        while True: 
+            try: 
+                if error is None: 
+                    child = send(value) 
+                else: 
+                    child, error = generator.throw(error), None 
+            except StopIteration as stop: 
+                return stop.value 
+            try: 
+                if type(child) is list: 
+                    value = [evaluate(p, c) for p in child] 
+                elif type(child) is tuple: 
+                    value = evaluate(*child) 
+                else: 
+                    value = evaluate(child, c) 
+            except Exception as e: 
+                # thrown into the waiting generator, as on the explicit stack 
+                error = e 
+
+    def _evaluate_on_stack(self, plan: 'Plan', c: Context) -> T: 
+        # calls to evaluate_plan made by the methods themselves stay on the 
+        # explicit stack too, as the depth stays past the threshold 
+        depth = self._depth 
+        self._depth = depth + 1 
+        try: 
+            return self._run_stack(plan, c) 
+        finally: 
+            self._depth = depth 
+
+    def _run_stack(self, plan: 'Plan', c: Context) -> T: 
+        memoized = self._memoized 
+        lookup, record = self.lookup, self.record 
+        # frames are [plan, context, generator, pending list of plans, their values]
+        stack = [] 
+        push = stack.append 
+        p, pc = plan, c 
+        value = error = None 
+        while True: 
+            # evaluate the plan asked for 
+            try: 
+                if memoized and stack: 
+                    value = lookup(p, pc) 
+                    if value is MISSING: 
+                        value = p.evaluate(self, pc) 
+                        if type(value) is GeneratorType: 
+                            push([p, pc, value, None, None]) 
+                            value = None 
+                        else: 
+                            record(p, pc, value) 
+                else: 
+                    value = p.evaluate(self, pc) 
+                    if type(value) is GeneratorType: 
+                        push([p, pc, value, None, None]) 
+                        value = None 
+            except Exception as e: 
+                error = e 
+
+            # resume the waiting generators, until one of them asks for a plan 
+            while stack: 
+                frame = stack[-1] 
+                batch = frame[3] 
+                if batch is not None: 
+                    values = frame[4] 
+                    if error is None: 
+                        values.append(value) 
+                        if len(values) < len(batch): 
+                            p, pc = batch[len(values)], frame[1] 
+                            break 
+                        value = values 
+                    frame[3] = frame[4] = None 
+                try: 
+                    if error is None: 
+                        child = frame[2].send(value) 
+                    else: 
+                        child, error = frame[2].throw(error), None 
+                except StopIteration as stop: 
+                    stack.pop() 
+                    value, error = stop.value, None 
+                    # (evaluate_plan records the value of the plan it was given) 
+                    if memoized and stack: 
+                        record(frame[0], frame[1], value) 
+                    continue 
+                except Exception as e: 
+                    stack.pop() 
+                    error = e 
+                    continue 
+                if type(child) is list: 
+                    if not child: 
+                        value = [] 
+                        continue 
+                    frame[3], frame[4] = child, [] 
+                    p, pc = child[0], frame[1] 
+                elif type(child) is tuple: 
+                    p, pc = child 
+                else: 
+                    p, pc = child, frame[1] 
+                break 
+            else: 
+                if error is not None: 
+                    raise error 
+                return value 
+
+    def lookup(self, plan: 'Plan', c: Context = None): 
+        """A previously computed value for plan, or MISSING"""
+        return MISSING 
+
+    def record(self, plan: 'Plan', c: Context, value: T): 
+        """Called with the value of every node the driver evaluates"""
+        pass 
+
+def bottom_up(combine: Callable[..., T]) -> Callable[..., T]: 
+    """Makes an evaluate_* method of an IterativeEvaluator from combine(self, plan, 
+    children, c), which computes the value of plan from the list of its children's 
+    values.  On the recursive path the method evaluates the children itself, 
+    avoiding the cost of a generator; on the explicit stack, it returns one."""
+    def evaluate(self, plan: 'Plan', c: Context = None) -> T: 
+        # the explicit stack runs with the depth past the threshold 
+        if self._depth > self.max_recursion_depth: 
+            return _combine_later(self, combine, plan, c) 
+        evaluate_plan = self.evaluate_plan 
+        return combine(self, plan, [evaluate_plan(child, c) for child in plan.children], c) 
+    evaluate.__name__ = combine.__name__ 
+    evaluate.__qualname__ = combine.__qualname__ 
+    evaluate.__doc__ = combine.__doc__ 
+    return evaluate 
+
+def _combine_later(evaluator: IterativeEvaluator[T], combine: Callable[..., T], plan: 'Plan', c: Context): 
+    children = yield plan.children 
+    return combine(evaluator, plan, children, c) 
+
+class MemoizingEvaluator(IterativeEvaluator[T]): 
+
+    """An Evaluator for deterministic evaluations, which remembers the value 
+    computed for each shared plan node (and Context contents) so that subtrees 
+    with several parents are only evaluated once.  Nodes with a single parent are 
+    evaluated along with it, without caching, unless 'shared_only' is unset; root 
+    nodes are always cached. 
+
+    The cache holds at most max_cache_size values, evicting the least recently 
+    used.  Values are keyed on the node's version, which a mutation of the node 
+    or of any of its descendants increments (see Plan.touch), so an edit leaves 
+    the values of every other subtree in place.  With 'structural' set, values 
+    are keyed on Plan.structural_digest instead of Plan.id, so that structurally 
+    identical subtrees share one cached value.  The Context's part of the key is 
+    computed once per call of evaluate_plan, and so must not change during it. 
+    """
+
+    cache: OrderedDict
+    max_cache_size: int 
+    structural: bool 
+    shared_only: bool 
+
+    def __init__(self, max_cache_size: int = 100000, structural: bool = False, shared_only: bool = True): 
+        self.cache = OrderedDict() 
+        self.max_cache_size = max_cache_size 
+        self.structural = structural 
+        self.shared_only = shared_only 
+        self._context, self._context_key = MISSING, None 
+    
+    def context_key(self, c: Context = None): 
+        """The Context's part of the cache keys; None if it can't be hashed"""
+        if c is None: 
+            return () 
+        key = c.cache_key() 
+        try: 
+            hash(key) 
+        except TypeError: 
+            return None 
+        return key 
+
+    def cache_key(self, plan: 'Plan', c: Context = None): 
+        """The cache key of plan in c, or None if it isn't cached"""
+        if self.shared_only: 
+            parents = plan._parents 
+            if parents is not None and type(parents) is not list: 
+                return None 
+        if c is not self._context: 
+            self._context, self._context_key = c, self.context_key(c) 
+        if self._context_key is None: 
+            return None 
+        plan_key = plan.structural_digest() if self.structural else (plan.id, plan._version) 
+        return (plan_key, self._context_key)
+
+    def lookup(self, plan: 'Plan', c: Context = None): 
+        if not self._depth: 
+            # a new call of evaluate_plan, in which the Context may have changed 
+            self._context = MISSING 
+        elif self.shared_only and type(plan._parents) is ref: 
+            # (the common case, checked by cache_key too) 
+            return MISSING 
+        key = self.cache_key(plan, c) 
+        if key is None: 
+            return MISSING 
+        value = self.cache.get(key, MISSING) 
+        if value is not MISSING: 
+            self.cache.move_to_end(key) 
+        return value 
+
+    def record(self, plan: 'Plan', c: Context, value: T): 
+        if self.shared_only and type(plan._parents) is ref: 
+            return 
+        key = self.cache_key(plan, c) 
+        if key is None: 
+            return 
+        self.cache[key] = value 
+        if len(self.cache) > self.max_cache_size: 
+            self.cache.popitem(last=False) 
 
 class Start: 
 
-    plan: 'Plan'
-    time: int 
+    """The start of an Event: a plan, and the time at which it started.  Like End, 
+    Event and Outcome, this is an immutable, slotted value object."""
+
+    __slots__ = ('_plan', '_time')
 
     def __init__(self, plan: 'Plan', time: int): 
-        self.plan = plan 
-        self.time = time 
+        self._plan = plan 
+        self._time = time 
     
+    @property 
+    def plan(self) -> 'Plan': return self._plan 
+
+    @property 
+    def time(self) -> int: return self._time 
+
     def __eq__(self, other) -> bool: 
         return ( 
             isinstance(other, Start) and 
-            (self.plan, self.time) == (other.plan, other.time)
+            self._time == other._time and self._plan == other._plan
         )
     
-    def __hash__(self) -> int: return hash((self.plan, self.time))
+    def __hash__(self) -> int: return hash((self._plan.id, self._time))
 
     def __lt__(self, other: 'Start') -> bool: 
-        return (self.time, self.plan.id) < (other.time, other.plan.id)
+        return (self._time, self._plan.id) < (other._time, other._plan.id)
 
     def __gt__(self, other: 'Start') -> bool: 
-        return (self.time, self.plan.id) > (other.time, other.plan.id)
+        return (self._time, self._plan.id) > (other._time, other._plan.id)
+
+    def __repr__(self): 
+        return f"Start({self._plan}, {self._time})"
 
 class End: 
 
-    time: int 
-    status: Status 
+    __slots__ = ('_time', '_status')
 
     def __init__(self, time: int, status: Status): 
-        self.time = time 
-        self.status = status 
+        self._time = time 
+        self._status = status 
+
+    @property 
+    def time(self) -> int: return self._time 
+
+    @property 
+    def status(self) -> Status: return self._status 
 
     def __eq__(self, other) -> bool: 
         return (
             isinstance(other, End) and 
-            (self.time, self.status) == (other.time, other.status) 
+            self._time == other._time and self._status == other._status
         )
     
     def __hash__(self) -> int: 
-        return hash((self.time, self.status))
+        return hash((self._time, self._status))
     
     def __lt__(self, other: 'End') -> bool: 
-        return ( 
-            ( self.time, self.status)  < 
-            ( other.time, other.status )
-        )
+        return (self._time, self._status.value) < (other._time, other._status.value)
     
     def __gt__(self, other: 'End') -> bool: 
-        return ( 
-            ( self.time, self.status)  >
-            ( other.time, other.status )
-        )
+        return (self._time, self._status.value) > (other._time, other._status.value)
+
+    def __repr__(self): 
+        return f"End({self._time}, {self._status})"
 
 
 class Event: 
 
+    """A completed execution of a plan: its Start and its End.  Events are created 
+    by the million while sampling histories, so they hold their plan, times and 
+    status directly in slots -- the Start and End objects are only built when 
+    asked for."""
+
+    __slots__ = ('_plan', '_start_time', '_end_time', '_status')
+
     @staticmethod 
     def complete(plan: 'Plan', start: int, end: int, status: Status) -> 'Event': 
-        return Event(
-            Start(plan, start), 
-            End(end, status)
-        )
-
-    start: Start 
-    end: End 
+        e = Event.__new__(Event) 
+        e._plan = plan 
+        e._start_time = start 
+        e._end_time = end 
+        e._status = status 
+        return e 
 
     def __init__(self, start: Start, end: End): 
-        self.start = start 
-        self.end = end 
+        self._plan = start.plan 
+        self._start_time = start.time 
+        self._end_time = end.time 
+        self._status = end.status 
     
+    @property 
+    def start(self) -> Start: return Start(self._plan, self._start_time) 
+
+    @property 
+    def end(self) -> End: return End(self._end_time, self._status) 
+
     def abort(self, end_time: int) -> 'Event': 
         """Creates an equivalent event which is 'aborted' at the time 'end_time'.  
 
@@ -137,24 +444,24 @@ class Event:
            this returns a new Event, with the same start the current event, a new 
            end time equal to the end_time parameter, and a status of FAILURE 
         """
-        if end_time < self.start.time: 
+        if end_time < self._start_time: 
             raise ValueError(f"Can't abort an Event to a time prior to its start")
-        status = self.end.status if (end_time >= self.end.time) else Status.FAILURE
-        new_end = min(self.end_time, end_time) 
+        status = self._status if (end_time >= self._end_time) else Status.FAILURE
+        new_end = min(self._end_time, end_time) 
         return Event.complete(
-            self.start.plan, 
-            self.start.time, 
+            self._plan, 
+            self._start_time, 
             new_end, 
             status
         )
 
     def contains_timepoint(self, time: int) -> bool: 
-        return self.start_time <= time and self.end_time >= time 
+        return self._start_time <= time and self._end_time >= time 
     
     def overlaps_event(self, event: 'Event') -> bool: 
         return ( 
             self.contains_timepoint(event.start_time) or 
-            event.overlaps_event(self.start_time)
+            event.contains_timepoint(self.start_time)
         )
     
     def contains_event(self, event: 'Event') -> bool: 
@@ -164,88 +471,160 @@ class Event:
         )
     
     @property 
-    def start_time(self) -> int: return self.start.time 
+    def start_time(self) -> int: return self._start_time 
 
     @property 
-    def end_time(self) -> int: return self.end.time 
+    def end_time(self) -> int: return self._end_time 
 
     @property 
-    def plan(self) -> 'Plan': return self.start.plan 
+    def plan(self) -> 'Plan': return self._plan 
 
     @property 
     def duration(self) -> int: 
-        return self.end.time - self.start.time 
+        return self._end_time - self._start_time 
 
     @property 
     def outcome(self) -> Outcome: 
         return Outcome(
-            self.end.status, 
+            self._status, 
             self.duration 
         )
     
     @property 
     def status(self) -> Status: 
-        return self.end.status 
+        return self._status 
+
+    def _key(self) -> tuple: 
+        return (self._start_time, self._plan.id, self._end_time, self._status.value)
 
     def __eq__(self, other) -> bool: 
         return (
             isinstance(other, Event) and 
-            (self.start, self.end) == (other.start, other.end) 
+            self._start_time == other._start_time and 
+            self._end_time == other._end_time and 
+            self._status == other._status and 
+            self._plan == other._plan 
         )
 
-    def __hash__(self) -> int: return hash((self.start, self.end))
+    def __hash__(self) -> int: 
+        return hash((self._plan.id, self._start_time, self._end_time, self._status))
 
     def __lt__(self, other: 'Event') -> bool: 
-        return (
-            (self.start, self.end) < (other.start, other.end) 
-        )
+        return self._key() < other._key()
+
+    def __repr__(self): 
+        return f"Event({self._plan}, {self._start_time}, {self._end_time}, {self._status})"
 
 class History: 
 
+    """The events of one execution of a plan: the 'result' event of the plan 
+    itself, and the events of everything run beneath it, sorted.  
+
+    The histories built around the histories of a node's children, by 
+    with_children and with_abortable_children, hold on to those histories and 
+    only gather and sort their events when 'events' is first read -- so that 
+    building the history of a deep plan a level at a time takes linear time, 
+    rather than copying every event once per level above it. 
+    """
+
     @staticmethod 
-    def with_abortable_children(self, event: Event, *histories: 'History') -> 'History': 
+    def with_abortable_children(event: Event, *histories: 'History') -> 'History': 
         abort_end = event.end_time
-        evts = [e for e in chain(*[h.all_events() for h in histories])]
-        should_abort = len([e for e in evts if e.end_time > abort_end]) > 0 
+        should_abort = any(h.end_time > abort_end for h in histories) 
         if should_abort: 
-            aborted = [e.abort(abort_end) for e in evts if e.start_time <= abort_end]
-            aborted_event = Event.complete(
-                event.plan, 
-                event.start_time, 
-                event.end_time, 
-                Status.FAILURE
-            )
-            return History(
-                aborted_event, *aborted
-            )
+            # every event is aborted at abort_end, and those starting after it 
+            # are dropped 
+            return History._nested(event, histories, abort_end) 
         else: 
-            return History(
-                event, *evts
-            )
+            return History._nested(event, histories) 
 
     @staticmethod 
-    def with_children(self, event: Event, *histories: 'History') -> 'History': 
-        evts = [e for e in chain(*[h.all_events() for h in histories])]
-        return History(
-            event, *evts
-        )
+    def with_children(event: Event, *histories: 'History') -> 'History': 
+        return History._nested(event, histories) 
+
+    @staticmethod 
+    def _nested(event: Event, histories: Iterable['History'], abort_time: int = None) -> 'History': 
+        kept = [h for h in histories if abort_time is None or h.start_time <= abort_time] 
+        if kept: 
+            # a history's events lie within its result, so the results suffice 
+            if min([h.start_time for h in kept]) < event.start.time: 
+                raise ValueError(f"History contains a sub-event whose start time precedes the top-level event's start time")
+            if abort_time is None and max([h.end_time for h in kept]) > event.end.time: 
+                raise ValueError(f"History contains a sub-event whose end time exceeds the top-level event's end time")
+        history = History(event) 
+        history._events = None 
+        history._children = kept 
+        history._abort_time = abort_time 
+        return history 
 
     result: Event
-    events: List[Event]
+    _events: List[Event]
 
     def __init__(self, result: Event, *events: Event): 
         if result is None: 
             raise ValueError("top level event in History must be non-None")
         self.result = result 
-        self.events = sorted(list(events)) 
-        if len(self.events) > 0: 
-            if min([e.start.time for e in self.events]) < result.start.time: 
+        self._events = sorted(list(events)) 
+        self._children = None 
+        self._abort_time = None 
+        if len(self._events) > 0: 
+            if min([e.start.time for e in self._events]) < result.start.time: 
                 raise ValueError(f"History contains a sub-event whose start time precedes the top-level event's start time")
-            if max([e.end.time for e in self.events]) > result.end.time: 
+            if max([e.end.time for e in self._events]) > result.end.time: 
                 raise ValueError(f"History contains a sub-event whose end time exceeds the top-level event's end time")
     
+    @property 
+    def events(self) -> List[Event]: 
+        if self._events is None: 
+            self._events = sorted(self._gather()) 
+            self._children = None 
+        return self._events 
+
+    def _gather(self) -> List[Event]: 
+        """The events of the child histories, in the order the histories list them 
+        (each history's events, then its result), with the aborts above them applied"""
+        events: List[Event] = [] 
+        # histories and results still to gather, last first, each with the 
+        # earliest abort time above it 
+        stack = [(h, self._abort_time) for h in reversed(self._children)] 
+        while stack: 
+            item, abort_time = stack.pop() 
+            if type(item) is History: 
+                if item._events is None: 
+                    inner = item._abort_time 
+                    if inner is None or abort_time is not None and abort_time < inner: 
+                        inner = abort_time 
+                    stack.append((item.result, abort_time)) 
+                    stack.extend((h, inner) for h in reversed(item._children)) 
+                    continue 
+                gathered = chain(item._events, (item.result,)) 
+            else: 
+                gathered = (item,) 
+            if abort_time is None: 
+                events.extend(gathered) 
+            else: 
+                events.extend(e.abort(abort_time) for e in gathered if e.start_time <= abort_time) 
+        return events 
+
     def all_events(self) -> List[Event]: 
         return self.events + [self.result] 
+
+    @property 
+    def children(self) -> List['History']: 
+        """The child histories this one was built around, by with_children or 
+        with_abortable_children (before any abort) -- or None once 'events' has 
+        been read, or for a history built from its events"""
+        return self._children 
+
+    def completion_order(self) -> List[Event]: 
+        """All the events, in an order they could have completed in: by end time, 
+        and at equal end times in the order the child histories were built in, 
+        each history's events before its result.  Once 'events' has been read the 
+        nesting is gone, and ties come in the order of 'events'."""
+        events = self._gather() if self._events is None else list(self._events) 
+        events.append(self.result) 
+        events.sort(key=lambda e: e.end_time) 
+        return events 
     
     @property 
     def start_time(self) -> int: return self.result.start.time 
@@ -267,8 +646,24 @@ class History:
         )
 
     
+def _links(parents) -> List['ref[Plan]']: 
+    if parents is None: 
+        return [] 
+    return parents if type(parents) is list else [parents] 
+
 class Plan: 
 
+    # every node knows its parents, so that a mutation can increment the version 
+    # of the node and of its ancestors, which cached evaluations and digests are 
+    # keyed on.  The links are weak references to the parents, so that plans are 
+    # freed without waiting for the cycle collector: a single one for a node with 
+    # one parent, or else a list, with a parent once for each time the node 
+    # appears among its children.  They aren't pickled, but rebuilt on unpickling 
+    _parents: Union['ref[Plan]', List['ref[Plan]']] = None 
+    _version: int = 0
+    # (version, digest), see structural_digest 
+    _digest: tuple = None 
+
     id: str 
     name: str
     plan_type: str 
@@ -283,6 +678,113 @@ class Plan:
     def evaluate(self, evaluator: Evaluator[T], c: Context = None) -> T: 
         ...
     
+    def __setattr__(self, name: str, value): 
+        if name == 'children': 
+            # on construction, there's nothing to unlink or invalidate yet 
+            replaced = hasattr(self, 'children') 
+            if replaced: 
+                self._unlink_children() 
+            object.__setattr__(self, name, value) 
+            self._link_children() 
+            if replaced: 
+                self._invalidate() 
+        elif not name.startswith('_') and hasattr(self, name): 
+            object.__setattr__(self, name, value) 
+            self._invalidate() 
+        else: 
+            object.__setattr__(self, name, value) 
+
+    def touch(self): 
+        """Records that this plan has been mutated, incrementing the versions of the 
+        plan and its ancestors.  Re-assigning a public attribute (including the 
+        children list) does this automatically, but in-place changes (e.g. to the 
+        children list) should be followed by a call to touch().  A child removed 
+        in place still counts this plan as a parent, which is safe, if wasteful."""
+        self._unlink_children() 
+        self._link_children() 
+        self._invalidate() 
+
+    def parents(self) -> List['Plan']: 
+        """The plans that have this one among their children"""
+        parents = [] 
+        for link in _links(self._parents): 
+            parent = link() 
+            if parent is not None and not any(parent is p for p in parents): 
+                parents.append(parent) 
+        return parents 
+
+    def _link_children(self): 
+        # (setting the links directly, as they aren't mutations) 
+        link, set_links = ref(self), object.__setattr__ 
+        for child in self.children: 
+            parents = child._parents 
+            if parents is None: 
+                set_links(child, '_parents', link) 
+            elif type(parents) is list: 
+                parents.append(link) 
+            else: 
+                set_links(child, '_parents', [parents, link]) 
+
+    def _unlink_children(self): 
+        for child in self.children: 
+            links = [p for p in _links(child._parents) if p() is not self] 
+            object.__setattr__(child, '_parents', links[0] if len(links) == 1 else links or None) 
+
+    def _invalidate(self): 
+        stack, seen = [self], set() 
+        while stack: 
+            plan = stack.pop() 
+            if plan.id in seen: 
+                continue 
+            seen.add(plan.id) 
+            plan._version += 1 
+            for link in _links(plan._parents): 
+                parent = link() 
+                if parent is not None: 
+                    stack.append(parent) 
+
+    def __getstate__(self): 
+        state = dict(self.__dict__) 
+        state.pop('_parents', None) 
+        return state 
+
+    def __setstate__(self, state): 
+        for name, value in state.items(): 
+            object.__setattr__(self, name, value) 
+        self._link_children() 
+
+    def structure(self) -> List: 
+        """The fields of this node (apart from its children) which determine its 
+        structural digest"""
+        return [self.plan_type, self.name]
+
+    def structural_digest(self) -> str: 
+        """A Merkle-style digest of the structure of this plan: two plans have the 
+        same digest exactly when they have the same types, names and parameters 
+        throughout, whatever their ids.  Digests are cached on the nodes until the 
+        next mutation of their subtree."""
+        stack = [(self, False)]
+        while stack: 
+            plan, expanded = stack.pop() 
+            if plan._cached_digest() is not None: 
+                continue
+            if expanded: 
+                h = blake2b(digest_size=16) 
+                h.update(json.dumps(plan.structure(), sort_keys=True).encode('utf-8'))
+                for child in plan.children: 
+                    h.update(child._cached_digest().encode('ascii'))
+                plan._digest = (plan._version, h.hexdigest())
+            else: 
+                stack.append((plan, True))
+                stack.extend((child, False) for child in plan.children)
+        return self._digest[1]
+
+    def _cached_digest(self) -> str: 
+        cached = self._digest 
+        if cached is None or cached[0] != self._version: 
+            return None
+        return cached[1]
+
     def __getitem__(self, idx) -> 'Plan': 
         return self.children[idx]
     
@@ -302,14 +804,16 @@ class Plan:
             yield from child.descendants()
         yield self 
     
-    def as_tree(self) -> Tree: 
+    def as_tree(self) -> 'Tree': 
         """Renders the Plan as a rich.Tree"""
+        from rich.tree import Tree 
         t: Tree = Tree(f"{self.plan_type}: {self.name}")
         for c in self.children: 
             t.add(c.as_tree())
         return t 
     
     def print_tree(self): 
+        from rich.console import Console 
         c = Console()
         c.print(self.as_tree())
 
@@ -340,6 +844,11 @@ class Action(Plan):
         self.success_prob = success_prob
         self.duration = duration if isinstance(duration, IntDist) else Constant(duration) 
     
+    def structure(self) -> List: 
+        return Plan.structure(self) + [
+            self.description, self.success_prob, self.duration.to_dict()
+        ]
+    
     def evaluate(self, evaluator: Evaluator[T], c: Context = None) -> T:
         return evaluator.evaluate_action(self, c) 
     
@@ -409,7 +918,7 @@ class Ensure(Plan):
     """
 
     def __init__(self, child: Plan, name=None): 
-        Plan.__init__(self, name or f"Ensure {child.plan}", child) 
+        Plan.__init__(self, name or f"Ensure {child.name}", child) 
     
     def evaluate(self, evaluator: Evaluator[T], c: Context = None) -> T:
         return evaluator.evaluate_ensure(self, c) 
@@ -424,8 +933,11 @@ class Loop(Plan):
     max_loops: int    
 
     def __init__(self, child: Plan, max_loops: int, name=None): 
-        Plan.__init__(self, name or f"Loop {child.plan}", child) 
+        Plan.__init__(self, name or f"Loop {child.name}", child) 
         self.max_loops = max_loops
+
+    def structure(self) -> List: 
+        return Plan.structure(self) + [self.max_loops]
     
     def evaluate(self, evaluator: Evaluator[T], c: Context = None) -> T:
         return evaluator.evaluate_loop(self, c) 
@@ -0,0 +1,196 @@
+import sys
+from time import perf_counter
+from types import GeneratorType
+from typing import Dict, List, Tuple
+
+from plans.plan import Evaluator, Plan
+
+# The methods of Evaluator that evaluate one node
+EVALUATE_METHODS = [
+    name for name in vars(Evaluator) if name.startswith('evaluate_') and name != 'evaluate_plan'
+]
+
+class NodeStats:
+
+    """Profile totals for a group of plan nodes: the number of evaluations, their
+    cumulative time (children included) and self time (in seconds), and the net
+    number of memory blocks they allocated themselves"""
+
+    calls: int
+    cumulative: float
+    self_time: float
+    blocks: int
+
+    def __init__(self):
+        self.calls = 0
+        self.cumulative = 0.0
+        self.self_time = 0.0
+        self.blocks = 0
+
+    def __repr__(self):
+        return f"NodeStats(calls={self.calls}, cumulative={self.cumulative:.6f}, self={self.self_time:.6f}, blocks={self.blocks})"
+
+class _Frame:
+
+    __slots__ = ('plan', 'path', 'start', 'blocks', 'child_time', 'child_blocks', 'outermost')
+
+    def __init__(self, plan: Plan, path: str, outermost: bool):
+        self.plan = plan
+        self.path = path
+        self.outermost = outermost
+        self.child_time = 0.0
+        self.child_blocks = 0
+        self.blocks = sys.getallocatedblocks()
+        self.start = perf_counter()
+
+def _label(plan: Plan) -> str:
+    # ';' separates the frames of a collapsed stack
+    return f"{plan.plan_type}:{plan.name}".replace(';', ',')
+
+class EvaluatorProfiler:
+
+    """Profiles the evaluations of an Evaluator class, by node type, by node id and
+    by path in the plan tree.  While enabled (in a with block), the class's
+    evaluate_* methods are replaced with timing wrappers -- so evaluations by
+    copies of the evaluator are counted too, as are those of any other instance
+    of the class.  The wrappers are removed again on
+    exit, leaving the class untouched: there is no overhead when it's disabled.
+
+    Generator methods (see IterativeEvaluator) are timed from their first call
+    until they return, and the time their children take is subtracted for self
+    time; the driver's own bookkeeping is charged to the parent.  A node type's
+    cumulative time counts only its outermost evaluations, so that nested nodes of
+    the same type aren't counted twice.
+    """
+
+    evaluator_class: type
+    by_type: Dict[str, NodeStats]
+    by_node: Dict[str, NodeStats]
+    stacks: Dict[str, float]
+    saved: Dict[str, object]
+    frames: List[_Frame]
+    active_types: Dict[str, int]
+
+    def __init__(self, evaluator):
+        self.evaluator_class = evaluator if isinstance(evaluator, type) else type(evaluator)
+        self.by_type = {}
+        self.by_node = {}
+        self.stacks = {}
+        self.saved = None
+        self.frames = []
+        self.active_types = {}
+
+    @property
+    def enabled(self) -> bool: return self.saved is not None
+
+    def __enter__(self) -> 'EvaluatorProfiler':
+        self.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def enable(self):
+        if self.enabled:
+            return
+        cls = self.evaluator_class
+        self.saved = {name: cls.__dict__.get(name) for name in EVALUATE_METHODS}
+        for name in EVALUATE_METHODS:
+            setattr(cls, name, self._instrument(getattr(cls, name)))
+
+    def disable(self):
+        if not self.enabled:
+            return
+        cls = self.evaluator_class
+        for name, method in self.saved.items():
+            if method is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, method)
+        self.saved = None
+
+    def _instrument(self, method):
+        enter, leave = self._enter, self._leave
+        def instrumented(evaluator, plan, c=None):
+            frame = enter(plan)
+            try:
+                result = method(evaluator, plan, c)
+            except BaseException:
+                leave(frame)
+                raise
+            if type(result) is GeneratorType:
+                return self._follow(result, frame)
+            leave(frame)
+            return result
+        instrumented.__name__ = method.__name__
+        instrumented.__doc__ = method.__doc__
+        return instrumented
+
+    def _follow(self, generator, frame: _Frame):
+        try:
+            return (yield from generator)
+        finally:
+            self._leave(frame)
+
+    def _enter(self, plan: Plan) -> _Frame:
+        parent = self.frames[-1] if self.frames else None
+        label = _label(plan)
+        path = f"{parent.path};{label}" if parent is not None else label
+        depth = self.active_types.get(plan.plan_type, 0)
+        self.active_types[plan.plan_type] = depth + 1
+        frame = _Frame(plan, path, depth == 0)
+        self.frames.append(frame)
+        return frame
+
+    def _leave(self, frame: _Frame):
+        elapsed = perf_counter() - frame.start
+        blocks = sys.getallocatedblocks() - frame.blocks
+        # a generator closed out of order leaves the frames above it behind
+        while self.frames and self.frames.pop() is not frame:
+            pass
+        plan_type = frame.plan.plan_type
+        self.active_types[plan_type] -= 1
+        self_time = elapsed - frame.child_time
+        self_blocks = blocks - frame.child_blocks
+        if self.frames:
+            self.frames[-1].child_time += elapsed
+            self.frames[-1].child_blocks += blocks
+        for stats, cumulative in [
+            (self.by_type.setdefault(plan_type, NodeStats()), frame.outermost),
+            (self.by_node.setdefault(frame.plan.id, NodeStats()), True),
+        ]:
+            stats.calls += 1
+            stats.self_time += self_time
+            stats.blocks += self_blocks
+            if cumulative:
+                stats.cumulative += elapsed
+        self.stacks[frame.path] = self.stacks.get(frame.path, 0.0) + self_time
+
+    def table(self, by: str = 'type', sort: str = 'self_time') -> List[Tuple[str, NodeStats]]:
+        """The stats by 'type' or by 'node' (id), sorted by one of the NodeStats
+        fields, largest first"""
+        stats = self.by_type if by == 'type' else self.by_node
+        return sorted(stats.items(), key=lambda kv: -getattr(kv[1], sort))
+
+    def format_table(self, by: str = 'type', sort: str = 'self_time', limit: int = None) -> str:
+        rows = self.table(by, sort)[:limit]
+        width = max([len(key) for key, _ in rows] + [4])
+        lines = [f"{'node':{width}s} {'calls':>9s} {'cumulative':>11s} {'self':>11s} {'blocks':>9s}"]
+        for key, s in rows:
+            lines.append(f"{key:{width}s} {s.calls:9d} {s.cumulative:11.6f} {s.self_time:11.6f} {s.blocks:9d}")
+        return "\n".join(lines)
+
+    def collapsed_stacks(self) -> str:
+        """The self time of every path in the plan tree, in microseconds, in the
+        collapsed-stack format read by flamegraph.pl and speedscope"""
+        return "".join(
+            f"{path} {round(seconds * 1e6)}\n" for path, seconds in self.stacks.items()
+        )
+
+    def write_collapsed_stacks(self, path: str):
+        with open(path, 'w') as f:
+            f.write(self.collapsed_stacks())
+
+def profile_evaluator(evaluator) -> EvaluatorProfiler:
+    """An EvaluatorProfiler for the class of evaluator, to use in a with block"""
+    return EvaluatorProfiler(evaluator)
@@ -5,15 +5,25 @@ T = TypeVar("T")
 
 class Event(Generic[T]): 
 
-    start: int 
-    end: int
-    data: T 
+    """An interval of time [start, end], carrying an optional piece of data. 
+    Events are immutable, slotted value objects."""
+
+    __slots__ = ('_start', '_end', '_data')
 
     def __init__(self, start: int, end: int, data: T = None): 
         if end < start: raise ValueError("start must be <= end")
-        self.start = start 
-        self.end = end 
-        self.data = data 
+        self._start = start 
+        self._end = end 
+        self._data = data 
+    
+    @property 
+    def start(self) -> int: return self._start 
+
+    @property 
+    def end(self) -> int: return self._end 
+
+    @property 
+    def data(self) -> T: return self._data 
     
     @property 
     def duration(self) -> int: return self.end - self.start 
@@ -51,17 +61,17 @@ class Event(Generic[T]):
         return self.start > t 
 
     def __lt__(self, other: 'Event') -> bool:
-        return (self.start, self.end) < (other.start, other.end) 
+        return (self._start, self._end) < (other._start, other._end) 
 
     def __eq__(self, other) -> bool:
         return (
             isinstance(other, Event) and 
-            self.start == other.start and 
-            self.end == other.end and 
-            self.data == other.data 
+            self._start == other._start and 
+            self._end == other._end and 
+            self._data == other._data 
         )
     
-    def __hash__(self) -> int: return hash((self.start, self.end, self.data))
+    def __hash__(self) -> int: return hash((self._start, self._end, self._data))
 
     def __repr__(self) -> str: 
         if self.data: 
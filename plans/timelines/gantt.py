@@ -0,0 +1,59 @@
+
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+from plans.plan import Plan, History
+from plans.columnar import ColumnarHistory
+from .timeline import Window, render_rows
+
+# Gantt charts of plan executions, with one row per level of the plan tree:
+# the top-level event on the first row, its children's events on the second,
+# and so on.  Events which share a column of a row (parallel children, or many
+# short events when zoomed out) are drawn as density glyphs.
+
+def plan_depths(plan: Plan) -> Dict[int, int]:
+    """The depth of every node below plan, keyed by id() of the node -- a node
+    that appears in several places gets its shallowest depth"""
+    depths = {id(plan): 0}
+    level = [plan]
+    depth = 0
+    while level:
+        depth += 1
+        next_level = []
+        for p in level:
+            for child in p.children:
+                if id(child) not in depths:
+                    depths[id(child)] = depth
+                    next_level.append(child)
+        level = next_level
+    return depths
+
+def history_columns(history: Union[History, ColumnarHistory]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The start times, end times and plan depths of all events of the history"""
+    if isinstance(history, ColumnarHistory):
+        cp = history.compiled
+        depths = plan_depths(cp.plans[cp.root])
+        node_depths = np.array([depths.get(id(p), 0) for p in cp.plans], dtype=np.int64)
+        return history.start, history.end, node_depths[history.node]
+    events = history.all_events()
+    n = len(events)
+    depths = plan_depths(history.result.plan)
+    return (
+        np.fromiter((e.start_time for e in events), dtype=np.int64, count=n),
+        np.fromiter((e.end_time for e in events), dtype=np.int64, count=n),
+        np.fromiter((depths.get(id(e.plan), 0) for e in events), dtype=np.int64, count=n)
+    )
+
+def render_history(
+    history: Union[History, ColumnarHistory], width: int = 100, t1: int = None, t2: int = None
+) -> List[str]:
+    """Renders the events of the history between times t1 and t2 (by default,
+    the whole history) as a Gantt chart 'width' columns wide"""
+    starts, ends, rows = history_columns(history)
+    t1 = history.start_time if t1 is None else t1
+    t2 = history.end_time if t2 is None else t2
+    # the window runs to just past t2, so that events ending at t2 are drawn
+    window = Window(t1, max(t2, t1) + 1, 0, width)
+    columns_start, columns_end = window.map_times(starts, ends)
+    return render_rows(columns_start, columns_end, rows, int(rows.max()) + 1, width)
@@ -0,0 +1,184 @@
+
+from operator import attrgetter
+from random import Random
+from typing import Iterable, Iterator, List
+
+from .event import Event
+
+# the (start, end) order of Events, as a sort key
+event_key = attrgetter('start', 'end')
+
+class _Node:
+
+    __slots__ = ('event', 'start', 'end', 'priority', 'left', 'right', 'max_end', 'min_end')
+
+    def __init__(self, event: Event, priority: float):
+        self.event = event
+        self.start = event.start
+        self.end = event.end
+        self.priority = priority
+        self.left: '_Node' = None
+        self.right: '_Node' = None
+        self.max_end = event.end
+        self.min_end = event.end
+
+    def update(self):
+        max_end = min_end = self.end
+        left, right = self.left, self.right
+        if left is not None:
+            if left.max_end > max_end: max_end = left.max_end
+            if left.min_end < min_end: min_end = left.min_end
+        if right is not None:
+            if right.max_end > max_end: max_end = right.max_end
+            if right.min_end < min_end: min_end = right.min_end
+        self.max_end = max_end
+        self.min_end = min_end
+
+class IntervalTree:
+
+    """An index of Events for range queries: a treap ordered by (start, end),
+    whose nodes also record the largest and smallest end time in their subtree
+    so that queries can skip subtrees which cannot hold a match.
+
+    add() takes O(log n) expected time.  A query returning k events takes
+    O(log n + k log n) time in the worst case: the end bounds prune whole
+    subtrees without a match, but a subtree with one can still hold events
+    which don't match (for within(), events which start in the range and end
+    after it), and each match can need a walk down from one of its ancestors.
+    Matches next to each other in the tree share their walks.  An O(log n + k)
+    bound would need a priority search tree per query kind.  Results come out
+    in (start, end) order.
+    """
+
+    root: _Node
+    size: int
+
+    def __init__(self, events: Iterable[Event] = None, seed: int = None):
+        self.rand = Random(seed)
+        self.root = None
+        self.size = 0
+        if events is not None:
+            self._build(sorted(events, key=event_key))
+
+    @staticmethod
+    def from_sorted(events: List[Event], seed: int = None) -> 'IntervalTree':
+        """Builds the tree from events already in (start, end) order"""
+        tree = IntervalTree(seed=seed)
+        tree._build(events)
+        return tree
+
+    def __len__(self) -> int: return self.size
+
+    def _build(self, events: List[Event]):
+        """Builds the treap from sorted events in linear time, as the Cartesian
+        tree of their random priorities"""
+        random = self.rand.random
+        spine: List[_Node] = []
+        for e in events:
+            node = _Node(e, random())
+            last = None
+            while spine and spine[-1].priority < node.priority:
+                # a node leaving the right spine has its whole subtree in place
+                last = spine.pop()
+                last.update()
+            node.left = last
+            if spine:
+                spine[-1].right = node
+            spine.append(node)
+        for node in reversed(spine):
+            node.update()
+        self.root = spine[0] if spine else None
+        self.size = len(events)
+
+    def add(self, event: Event):
+        node = _Node(event, self.rand.random())
+        self.size += 1
+        if self.root is None:
+            self.root = node
+            return
+        key = (event.start, event.end)
+        path: List[_Node] = []
+        parent = self.root
+        while parent is not None:
+            path.append(parent)
+            parent = parent.left if key < (parent.start, parent.end) else parent.right
+        parent = path[-1]
+        if key < (parent.start, parent.end):
+            parent.left = node
+        else:
+            parent.right = node
+        # rotate the new node up to restore the heap order of priorities
+        while path and path[-1].priority < node.priority:
+            parent = path.pop()
+            if parent.left is node:
+                parent.left = node.right
+                node.right = parent
+            else:
+                parent.right = node.left
+                node.left = parent
+            parent.update()
+            if path:
+                grandparent = path[-1]
+                if grandparent.left is parent:
+                    grandparent.left = node
+                else:
+                    grandparent.right = node
+            else:
+                self.root = node
+        node.update()
+        for ancestor in reversed(path):
+            ancestor.update()
+
+    def __iter__(self) -> Iterator[Event]:
+        stack: List[_Node] = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.event
+            node = node.right
+
+    def overlapping(self, t1: int, t2: int) -> Iterator[Event]:
+        """Events [start, end] which share at least one time with [t1, t2]"""
+        stack: List[_Node] = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None and node.max_end >= t1:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if node.start > t2:
+                # every later event starts after t2
+                return
+            if node.end >= t1:
+                yield node.event
+            node = node.right
+
+    def at(self, t: int) -> Iterator[Event]:
+        """Events which contain the time t"""
+        return self.overlapping(t, t)
+
+    def within(self, t1: int, t2: int) -> Iterator[Event]:
+        """Events which lie entirely inside [t1, t2]"""
+        stack: List[_Node] = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None and node.min_end <= t2:
+                if node.start < t1:
+                    # this event, and everything to its left, starts too early
+                    node = node.right
+                else:
+                    stack.append(node)
+                    node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if node.start > t2:
+                return
+            if node.end <= t2:
+                yield node.event
+            node = node.right
@@ -1,20 +1,56 @@
 
-from typing import List, Dict, Iterable, TypeVar
-from rich.console import Console 
+from bisect import bisect, insort
+from heapq import heappush, heappop
+from typing import List, Dict, Iterable, Iterator, Tuple, TypeVar, TYPE_CHECKING
 from io import StringIO
 
+import numpy as np
+
 from .event import Event 
+from .intervals import IntervalTree
+
+if TYPE_CHECKING: 
+    from rich.console import Console 
 
 class Timeline: 
 
-    events: List[Event]
+    """A collection of Events, held in an IntervalTree for queries by time.  
+    Iterating over a Timeline walks the tree, in (start, end) order"""
+
+    index: IntervalTree
+    _events: List[Event]
 
     def __init__(self, events: Iterable[Event] = None): 
-        self.events = sorted(list(events or [])) 
+        self.index = IntervalTree(events) 
+        self._events = None 
+    
+    def __len__(self) -> int: return len(self.index) 
+
+    def __iter__(self) -> Iterator[Event]: return iter(self.index) 
+
+    @property 
+    def events(self) -> List[Event]: 
+        """The events, as a list in (start, end) order -- built on first use, and 
+        kept until the next add_event"""
+        if self._events is None: 
+            self._events = list(self.index) 
+        return self._events 
     
     def add_event(self, event: Event): 
-        self.events.append(event) 
-        self.events.sort() 
+        self.index.add(event) 
+        self._events = None 
+    
+    def events_at(self, t: int) -> Iterator[Event]: 
+        """Events running at time t"""
+        return self.index.at(t) 
+
+    def events_overlapping(self, t1: int, t2: int) -> Iterator[Event]: 
+        """Events which overlap the interval [t1, t2]"""
+        return self.index.overlapping(t1, t2) 
+
+    def events_within(self, t1: int, t2: int) -> Iterator[Event]: 
+        """Events which lie entirely within the interval [t1, t2]"""
+        return self.index.within(t1, t2) 
 
 T = TypeVar("T")
 
@@ -42,15 +78,68 @@ class Window:
 
     def map_event(self, event: Event[T]) -> Event[Event[T]]: 
         return Event(
-            event.start - self.t1, 
-            event.end - self.t1, 
+            round(self.time_to_space * (event.start - self.t1)) + self.x1, 
+            round(self.time_to_space * (event.end - self.t1)) + self.x1, 
             event
-        ).scale(self.time_to_space).shift(self.x1)
+        )
+
+    def map_times(self, starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]: 
+        """Maps arrays of start and end times to space, as map_event does for 
+        a single event"""
+        f = self.time_to_space 
+        return ( 
+            np.round(f * (np.asarray(starts) - self.t1)).astype(np.int64) + self.x1, 
+            np.round(f * (np.asarray(ends) - self.t1)).astype(np.int64) + self.x1 
+        )
     
     @property 
     def target_width(self) -> int: 
         return self.x2 - self.x1 
 
+# glyphs for columns covered by 0 events, 1 event, 2, 3-4, 5-8, 9-16 and more
+DENSITY_GLYPHS = ' -=+*#@'
+
+def density_levels(counts: np.ndarray, levels: int = len(DENSITY_GLYPHS)) -> np.ndarray: 
+    """Buckets event counts into glyph levels: 0 and 1 stand for themselves, and 
+    each level above that covers twice as many events as the one before"""
+    counts = np.asarray(counts) 
+    above_one = np.ceil(np.log2(np.maximum(counts, 1))).astype(np.int64) + 1 
+    return np.where(counts <= 1, counts, np.minimum(above_one, levels - 1)) 
+
+def render_rows(
+    starts: np.ndarray, 
+    ends: np.ndarray, 
+    rows: np.ndarray, 
+    row_count: int, 
+    width: int, 
+    glyphs: str = DENSITY_GLYPHS 
+) -> List[str]: 
+    """Draws events, given as arrays of their first and last columns and of the 
+    row each belongs on, into row_count strings of the given width.  Columns are 
+    clipped to [0, width), and a column covered by several events of one row is 
+    drawn with a density glyph.  
+
+    Coverage is counted with a difference array per row, so rendering costs 
+    O(events + rows * width) whatever the zoom level.  
+    """
+    starts = np.asarray(starts, dtype=np.int64) 
+    ends = np.asarray(ends, dtype=np.int64) 
+    rows = np.asarray(rows, dtype=np.int64) 
+    visible = (ends >= 0) & (starts < width) 
+    starts = np.clip(starts[visible], 0, width - 1) 
+    ends = np.clip(ends[visible], 0, width - 1) 
+    rows = rows[visible] 
+    stride = width + 1 
+    size = row_count * stride 
+    diff = ( 
+        np.bincount(rows * stride + starts, minlength=size) - 
+        np.bincount(rows * stride + ends + 1, minlength=size) 
+    ) 
+    counts = np.cumsum(diff.reshape(row_count, stride), axis=1)[:, :width] 
+    table = np.frombuffer(glyphs.encode('ascii'), dtype=np.uint8) 
+    chars = table[density_levels(counts, len(glyphs))] 
+    return [row.tobytes().decode('ascii') for row in chars] 
+
 class StringBuffer: 
 
     len: int 
@@ -95,6 +184,12 @@ class TrackedTimeline:
     """TrackedTimeline associates a Timeline with a Window -- using these two inputs, every 
     event in the Timeline is mapped to a distinct track, such that no two Events overlap 
     in the 'target space' of the Window.  
+
+    Tracks are assigned greedily in order of start, reusing the track which frees up 
+    earliest (found with a heap of track end positions), which uses the fewest tracks 
+    possible.  add_event extends the layout without recomputing it: an event which starts 
+    no earlier than every event laid out so far is placed exactly as in a full layout, and 
+    an earlier one goes in the first track with room for it. 
     """
 
     timeline: Timeline 
@@ -103,42 +198,110 @@ class TrackedTimeline:
     tracks: int 
     event_tracks: Dict[Event, int] 
     track_events: Dict[int, List[Event]]
+    track_ends: List[int]
+    free_tracks: List[Tuple[int, int]]
+    latest_start: int
 
     def __init__(self, timeline:Timeline, window: Window): 
         self.window = window
         self.timeline = timeline 
-        self.windowed_events = [window.map_event(e) for e in self.timeline.events]
+        self.windowed_events = self._map_events(self.timeline.events) 
         self._do_layout()
+
+    def _map_events(self, events: List[Event]) -> List[Event]: 
+        """Maps events into the window in one vectorized pass, as map_event 
+        does for each"""
+        n = len(events) 
+        starts, ends = self.window.map_times( 
+            np.fromiter((e.start for e in events), dtype=np.float64, count=n), 
+            np.fromiter((e.end for e in events), dtype=np.float64, count=n) 
+        ) 
+        return [Event(s, e, event) for s, e, event in zip(starts.tolist(), ends.tolist(), events)]
     
     def _do_layout(self): 
         self.event_tracks = {} 
         self.track_events = {}
         self.tracks = 0 
+        self.track_ends = [] 
+        # (end position, track) for every track, smallest end first -- entries 
+        # go stale when an out-of-order event extends a track, and are skipped 
+        self.free_tracks = [] 
+        self.latest_start = None 
+        for windowed in self.windowed_events: 
+            self._place(windowed) 
 
-        for event in self.timeline.events: 
-            event_track = 0
-            while event_track < self.tracks and self.track_events[event_track][-1].overlaps(event): 
-                event_track += 1
-            if event_track > self.tracks: 
-                self.tracks = event_track 
-                self.track_events[event_track] = [] 
-            self.track_events[event_track].append(event) 
-            self.event_tracks[event] = event_track 
-    
-    def _render_event(self,event: Event, buffer:StringBuffer): 
-        for i in range(event.start, event.end+1): 
-            buffer[i] = '-'
+    def add_event(self, event: Event): 
+        """Adds an event to the timeline, and lays it out on a track"""
+        self.timeline.add_event(event) 
+        windowed = self.window.map_event(event) 
+        insort(self.windowed_events, windowed) 
+        self._place(windowed) 
+
+    def _place(self, windowed: Event): 
+        in_order = self.latest_start is None or windowed.start >= self.latest_start 
+        if in_order: 
+            self.latest_start = windowed.start 
+            track = self._earliest_free_track(windowed.start) 
+        else: 
+            track = self._first_fitting_track(windowed) 
+        if track is None: 
+            track = self.tracks 
+            self.tracks += 1 
+            self.track_events[track] = [] 
+            self.track_ends.append(windowed.end) 
+            in_order = True 
+        events = self.track_events[track] 
+        if not events or not (windowed < events[-1]): 
+            events.append(windowed) 
+        else: 
+            insort(events, windowed) 
+        if in_order or windowed.end > self.track_ends[track]: 
+            self.track_ends[track] = max(self.track_ends[track], windowed.end) 
+            heappush(self.free_tracks, (self.track_ends[track], track)) 
+        self.event_tracks[windowed.data] = track 
+
+    def _earliest_free_track(self, start: int) -> int: 
+        """The track which frees up earliest, if it is free before 'start'"""
+        heap = self.free_tracks 
+        while heap: 
+            end, track = heap[0] 
+            if end != self.track_ends[track]: 
+                heappop(heap) 
+            elif end < start: 
+                heappop(heap) 
+                return track 
+            else: 
+                return None 
+        return None 
+
+    def _first_fitting_track(self, windowed: Event) -> int: 
+        for track in range(self.tracks): 
+            events = self.track_events[track] 
+            i = bisect(events, windowed) 
+            if i > 0 and events[i - 1].end >= windowed.start: 
+                continue 
+            if i < len(events) and events[i].start <= windowed.end: 
+                continue 
+            return track 
+        return None 
     
     def _render(self) -> Iterable[str]: 
-        for i in range(self.tracks-1, -1, -1): 
-            b = StringBuffer(self.window.target_width)
-            for e in self.track_events[i]: 
-                self._render_event(e, b)
+        if self.tracks == 0: 
+            return [] 
+        events = [(e, track) for track in range(self.tracks) for e in self.track_events[track]] 
+        n = len(events) 
+        return render_rows( 
+            np.fromiter((e.start - self.window.x1 for e, _ in events), dtype=np.int64, count=n), 
+            np.fromiter((e.end - self.window.x1 for e, _ in events), dtype=np.int64, count=n), 
+            # the highest track is drawn first 
+            np.fromiter((self.tracks - 1 - track for _, track in events), dtype=np.int64, count=n), 
+            self.tracks, 
+            self.window.target_width 
+        ) 
     
-    def display(self, console: Console):
+    def display(self, console: 'Console'):
         for line in self._render(): 
             console.print(line)
     
     def as_string(self) -> str: 
         return '\n'.join(self._render())
-
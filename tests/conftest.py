@@ -0,0 +1,26 @@
+import pytest
+
+from plans.plan import Action, Steps, Options, Requirements, Alternatives, Loop, Ensure, IfElse, Optional, Fail
+from plans.math import UniformRange
+
+@pytest.fixture
+def mixed_plan():
+    """A plan with every kind of node, and an action shared by a Loop and an Ensure"""
+    action = Action("try", duration=UniformRange(1, 3), success_prob=0.6)
+    return Steps(
+        "s",
+        Options("o", Action("a", success_prob=0.8, duration=1), Action("b", success_prob=0.95, duration=2)),
+        Requirements("r", Loop(action, 3), Action("c", success_prob=0.9, duration=4)),
+        Alternatives("alt", Action("d", success_prob=0.5, duration=3), Ensure(action)),
+        IfElse(Action("test", success_prob=0.5), Action("yes", duration=2), Optional(Fail()))
+    )
+
+@pytest.fixture
+def retry_plan():
+    """A small plan which retries an action, and runs it again alongside another"""
+    action = Action("try", duration=UniformRange(1, 5), success_prob=0.6)
+    return Steps(
+        "s",
+        Loop(action, 3),
+        Requirements("r", Action("a", success_prob=0.9, duration=UniformRange(2, 4)), action)
+    )
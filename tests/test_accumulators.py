@@ -0,0 +1,65 @@
+import numpy as np
+
+from plans.plan import Action, Requirements, Loop
+from plans.math import UniformRange
+from plans.outcomes import Status
+from plans.evaluations.outcomes import OutcomeSampler
+from plans.evaluations.distribution import outcome_distribution
+from plans.evaluations.accumulators import KLLSketch, DurationAccumulator, OutcomeAccumulator, accumulate_outcomes
+
+def test_histogram_is_exact():
+    rng = np.random.default_rng(1)
+    durations = rng.integers(0, 100, 10000)
+    acc = DurationAccumulator()
+    for chunk in np.array_split(durations, 7):
+        acc.add(chunk)
+    assert acc.is_exact and acc.count == 10000 and acc.mean() == durations.mean()
+    for q in [0.0, 0.25, 0.5, 0.95, 0.99, 1.0]:
+        assert acc.quantile(q) == int(np.quantile(durations, q, method='inverted_cdf'))
+
+def test_sketch_takes_over_wide_ranges():
+    rng = np.random.default_rng(2)
+    durations = rng.integers(0, 10**9, 10**6)
+    acc = DurationAccumulator(max_bins=1000)
+    durations[:10] %= 1000
+    acc.add(durations[:10])
+    assert acc.is_exact
+    for chunk in np.array_split(durations[10:], 100):
+        acc.add(chunk)
+    assert not acc.is_exact and acc.count == 10**6
+    assert len(acc.sketch) < 2000
+    ordered = np.sort(durations)
+    for q in [0.01, 0.5, 0.95, 0.99]:
+        rank = np.searchsorted(ordered, acc.quantile(q)) / len(ordered)
+        assert abs(rank - q) < 0.01
+
+def test_sketches_merge():
+    rng = np.random.default_rng(3)
+    parts = [rng.normal(1000, 100 * (i + 1), 50000).astype(np.int64) for i in range(4)]
+    merged = KLLSketch()
+    for part in parts:
+        s = KLLSketch()
+        s.add(part)
+        merged.merge(s)
+    everything = np.sort(np.concatenate(parts))
+    assert merged.count == len(everything)
+    for q in [0.05, 0.5, 0.95]:
+        rank = np.searchsorted(everything, merged.quantile(q)) / len(everything)
+        assert abs(rank - q) < 0.01
+
+def test_outcomes_by_status():
+    p = Requirements("r", Loop(Action("a", success_prob=0.5, duration=UniformRange(1, 4)), 3), Action("b", success_prob=0.8, duration=5))
+    exact = outcome_distribution(p)
+    acc = accumulate_outcomes(p, 100000, seed=4)
+    assert acc.count == 100000
+    assert abs(acc.probability(Status.SUCCESS) - exact.success_probability) < 0.01
+    for status in [Status.SUCCESS, Status.FAILURE, None]:
+        assert abs(acc.mean(status) - exact.mean(status)) < 0.05
+        assert acc.quantile(0.5, status) == exact.quantile(0.5, status)
+    # single outcomes, as from OutcomeSampler, merge with batches
+    single = OutcomeAccumulator()
+    sampler = OutcomeSampler()
+    for _ in range(100):
+        single.add_outcome(sampler.evaluate_plan(p))
+    single.merge(acc)
+    assert single.count == 100100
@@ -0,0 +1,75 @@
+
+import numpy as np
+
+from plans.plan import Action, Steps, Options, Requirements, Alternatives, Loop, Ensure, IfElse, Optional, Fail
+from plans.evaluations.batch import sample_outcomes, estimate_success_probability
+from plans.evaluations import success_probability
+
+def close_to(value, target, eps=0.01) -> bool:
+    return abs(value - target) <= eps
+
+def test_batch_constant_steps():
+    s = Steps(
+        "Feed the cat",
+        Action("Get the cat food", duration=1),
+        Action("Fill the cat food bowl", duration=3)
+    )
+    statuses, durations = sample_outcomes(s, 10)
+    assert statuses.all()
+    assert (durations == 4).all()
+
+def test_batch_steps_stop_at_failure():
+    s = Steps("s", Fail(), Action("never", duration=5))
+    statuses, durations = sample_outcomes(s, 10)
+    assert not statuses.any()
+    assert (durations == 0).all()
+
+def test_batch_requirements_and_alternatives():
+    r = Requirements(
+        "b",
+        Action("D", duration=3, success_prob=0.9),
+        Action("E", duration=2, success_prob=0.5)
+    )
+    statuses, durations = sample_outcomes(r, 20000, np.random.default_rng(1))
+    assert close_to(statuses.mean(), 0.45)
+    assert close_to(durations.mean(), 2.5, eps=0.05)
+
+    a = Alternatives(
+        "a",
+        Action("D", duration=3, success_prob=0.5),
+        Action("E", duration=1, success_prob=0.5)
+    )
+    statuses, durations = sample_outcomes(a, 20000, np.random.default_rng(2))
+    assert close_to(statuses.mean(), 0.75)
+    # E succeeds: 1, E fails and D succeeds: 3, both fail: 3
+    assert close_to(durations.mean(), 2.0, eps=0.05)
+
+def test_batch_loops():
+    action = Action("try", duration=1, success_prob=0.5)
+    loop = Loop(action, 3)
+    statuses, durations = sample_outcomes(loop, 20000, np.random.default_rng(3))
+    assert close_to(statuses.mean(), success_probability(loop))
+    assert durations.max() == 3
+
+    statuses, durations = sample_outcomes(Ensure(action), 20000, np.random.default_rng(4))
+    assert statuses.all()
+    assert close_to(durations.mean(), 2.0, eps=0.05)
+
+def test_batch_ifelse_and_optional():
+    p = IfElse(
+        Action("test", success_prob=0.5, duration=1),
+        Action("yes", duration=2),
+        Optional(Fail())
+    )
+    statuses, durations = sample_outcomes(p, 20000, np.random.default_rng(5))
+    assert statuses.all()
+    assert close_to(durations.mean(), 2.0, eps=0.05)
+
+def test_estimate_success_probability():
+    p = Options(
+        "buy",
+        Action("Buy cat chow", success_prob=0.8, duration=1),
+        Action("Buy fuzzy feline", success_prob=0.95, duration=2)
+    )
+    estimate = estimate_success_probability(p, 20000, np.random.default_rng(6))
+    assert close_to(estimate, success_probability(p))
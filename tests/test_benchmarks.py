@@ -0,0 +1,58 @@
+from benchmarks.generators import SHAPES, generate_plan, shape_plan
+from benchmarks.run import BENCHMARKS, run_suite, regressions, failures
+from benchmarks.bench_deep import compare, EVALUATORS
+from plans.plan import Requirements, Steps
+
+def depth(plan):
+    stack, deepest = [(plan, 1)], 0
+    while stack:
+        p, d = stack.pop()
+        deepest = max(deepest, d)
+        stack.extend((c, d + 1) for c in p.children)
+    return deepest
+
+def test_generated_plans_repeat_by_seed():
+    assert generate_plan(1, 300).structural_digest() == generate_plan(1, 300).structural_digest()
+    assert generate_plan(1, 300).structural_digest() != generate_plan(2, 300).structural_digest()
+
+def test_shapes():
+    wide = shape_plan('wide_requirements')
+    assert isinstance(wide, Requirements) and len(wide.children) >= 50
+    deep = shape_plan('deep_steps')
+    assert isinstance(deep, Steps) and depth(deep) > 300
+    for shape in SHAPES:
+        nodes = sum(1 for _ in shape_plan(shape, scale=0.1).descendants())
+        assert 0 < nodes <= SHAPES[shape]['size'] * 0.1
+
+def test_suite_and_regressions():
+    current = run_suite(['sample_history', 'serialize'], ['balanced'], n=1, scale=0.05, repeat=1)
+    assert set(current['results']) == {'sample_history/balanced', 'serialize/balanced'}
+    assert set(BENCHMARKS) >= {'sample_outcome', 'deserialize', 'timeline_layout'}
+    assert regressions(current, current, 0.1) == []
+    slower = {'results': {k: dict(r, throughput=r['throughput'] * 2) for k, r in current['results'].items()}}
+    assert len(regressions(current, slower, 0.1)) == 2
+
+def test_every_benchmark_on_every_shape():
+    current = run_suite(n=1, scale=0.05, repeat=1)
+    assert len(current['results']) == len(BENCHMARKS) * len(SHAPES)
+    assert failures(current) == []
+    # the deep shape, at its full depth
+    assert failures(run_suite(shapes=['deep_steps'], n=1, repeat=1)) == []
+
+def test_failures_are_recorded(monkeypatch):
+    def fail(plan, n):
+        raise RecursionError("too deep")
+    monkeypatch.setitem(BENCHMARKS, 'fail', fail)
+    current = run_suite(['fail', 'serialize'], ['balanced'], n=1, scale=0.05, repeat=1)
+    assert failures(current) == ["fail/balanced: RecursionError: too deep"]
+    assert 'throughput' in current['results']['serialize/balanced']
+    baseline = run_suite(['serialize'], ['balanced'], n=1, scale=0.05, repeat=1)
+    baseline['results']['fail/balanced'] = current['results']['serialize/balanced']
+    assert len(regressions(current, baseline, 10.0)) == 1
+
+def test_deep_comparison():
+    results = compare([200], ['sample_outcome', 'to_dict'])
+    assert set(results) == {'sample_outcome/200', 'to_dict/200'}
+    for r in results.values():
+        assert r['stack'] > 0 and r['recursive'] > 0
+    assert set(EVALUATORS) >= {'success_probability', 'sample_history'}
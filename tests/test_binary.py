@@ -0,0 +1,78 @@
+
+import io
+import sys
+
+from plans.plan import Action, Steps, Options, Requirements, Alternatives, Ensure, Loop, IfElse, Fail, Optional
+from plans.math import Constant, UniformRange, DistributionSum
+from plans.evaluations.serialization import serialize, deserialize
+from plans.evaluations.binary import serialize_binary, deserialize_binary, deserialize_binary_history, BinaryPlanReader
+from plans.evaluations.histories import sample_history
+
+def example_plan(): 
+    a = Action("a", "first", 0.5, UniformRange(1, 3))
+    b = Action("b", "second", 0.9, DistributionSum(Constant(2), UniformRange(0, 4)))
+    return Steps(
+        "top",
+        Requirements("reqs", a, Loop(b, 3)),
+        Options("opts", Ensure(Action("c", success_prob=0.8, duration=1)), Fail()),
+        Alternatives("alts", Optional(a), IfElse(b, Action("d", duration=2), Action("e")))
+    )
+
+def test_round_trip_preserves_structure(): 
+    p = example_plan()
+    q = deserialize_binary(serialize_binary(p))
+    assert q.structural_digest() == p.structural_digest()
+    assert serialize(q) == serialize(p)
+
+def test_shared_plans_stay_shared(): 
+    p = example_plan()
+    q = deserialize_binary(serialize_binary(p))
+    reqs, _, alts = q.children
+    assert reqs.children[0] is alts.children[0].children[0]
+
+def test_dict_round_trip(): 
+    p = example_plan()
+    assert deserialize(serialize(p)).structural_digest() == p.structural_digest()
+
+def test_history_round_trip(): 
+    p = example_plan()
+    h = sample_history(p, seed=3)
+    h2 = deserialize_binary_history(serialize_binary(p, h))
+    assert h2.result.plan.structural_digest() == p.structural_digest()
+    def key(e): 
+        return (e.plan.structural_digest(), e.start_time, e.end_time, e.status)
+    assert h2.result == h2.all_events()[-1]
+    assert key(h2.result) == key(h.result)
+    assert sorted(map(key, h2.events)) == sorted(map(key, h.events))
+
+def test_reader_loads_single_subtree(): 
+    p = example_plan()
+    reader = BinaryPlanReader(io.BytesIO(serialize_binary(p)))
+    assert not reader.has_history
+    assert reader.plan_type(0) == 'Steps'
+    children = reader.children(0)
+    assert [reader.name(i) for i in children] == ["reqs", "opts", "alts"]
+    opts = reader.load_subtree(children[1])
+    assert opts.structural_digest() == p.children[1].structural_digest()
+    # the Optional in 'alts' refers back to the Action shared with 'reqs'
+    alts = reader.load_subtree(children[2])
+    assert alts.structural_digest() == p.children[2].structural_digest()
+
+def test_deep_plans_do_not_recurse(): 
+    p = Action("leaf", duration=1)
+    for i in range(sys.getrecursionlimit() * 2): 
+        p = Optional(p, name="o")
+    q = deserialize_binary(serialize_binary(p))
+    depth = 0
+    while q.children: 
+        q = q.children[0]
+        depth += 1
+    assert depth == sys.getrecursionlimit() * 2
+    assert q.name == "leaf"
+
+def test_rejects_other_data(): 
+    try: 
+        BinaryPlanReader(b'{"type": "Action"}')
+        assert False
+    except ValueError: 
+        pass
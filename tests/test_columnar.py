@@ -0,0 +1,50 @@
+
+from random import Random
+
+import numpy as np
+
+from plans.plan import Action, Steps
+from plans.outcomes import Status
+from plans.compiled import compile_plan
+from plans.columnar import ColumnarHistory
+from plans.evaluations.compiled import CompiledSampler
+from plans.evaluations.histories import sample_histories
+
+def test_columnar_round_trip(retry_plan):
+    p = retry_plan
+    cp = compile_plan(p)
+    for seed in range(20):
+        history = CompiledSampler(cp, Random(seed)).sample_history()
+        columnar = ColumnarHistory.from_history(history, cp)
+        assert columnar.result == history.result
+        assert columnar.result_status == history.result.status
+        assert (columnar.start_time, columnar.end_time) == (history.start_time, history.end_time)
+        assert sorted(columnar.to_history().all_events()) == sorted(history.all_events())
+
+def test_columnar_sampling_matches_records(retry_plan):
+    p = retry_plan
+    cp = compile_plan(p)
+    columnar = CompiledSampler(cp, Random(3)).sample_columnar_history()
+    history = CompiledSampler(cp, Random(3)).sample_history()
+    assert len(columnar) == len(history.all_events())
+    assert columnar.result == history.result
+
+def test_columnar_filtering_and_sorting():
+    action = Action("a", duration=2)
+    p = Steps("s", action, Action("b", duration=1), action)
+    columnar = ColumnarHistory.from_history(CompiledSampler(compile_plan(p)).sample_history())
+
+    ordered = columnar.sorted()
+    assert list(ordered.start[:-1]) == sorted(ordered.start[:-1])
+    assert ordered.result == columnar.result
+
+    only_a = columnar.for_plan(action)
+    assert len(only_a) == 3
+    assert sorted(only_a.start[:-1]) == [0, 3]
+    assert len(columnar.select(columnar.mask_overlapping(4, 4))) == 2
+    assert len(columnar.select(columnar.mask_status(Status.FAILURE))) == 1
+
+def test_sample_columnar_histories(retry_plan):
+    histories = sample_histories(retry_plan, 10, seed=1, columnar=True)
+    assert all(isinstance(h, ColumnarHistory) for h in histories)
+    assert (histories[0].durations >= 0).all()
@@ -0,0 +1,44 @@
+import numpy as np
+
+from plans.plan import Action, Steps, Loop, Alternatives
+from plans.math import UniformRange
+from plans.evaluations import success_probability
+from plans.evaluations.distribution import outcome_distribution
+from plans.evaluations.comparison import compare_plans
+
+def example_plans():
+    prep = Action("prep", success_prob=0.9, duration=UniformRange(1, 5))
+    cook = Action("cook", success_prob=0.8, duration=UniformRange(2, 8))
+    taste = Action("taste", success_prob=0.98, duration=1)
+    return Steps("dinner", prep, cook), Steps("careful dinner", prep, cook, taste)
+
+def test_paired_differences():
+    a, b = example_plans()
+    c = compare_plans(a, b, n=20000, seed=1)
+    s = c.success_difference(1)
+    assert s.low <= success_probability(b) - success_probability(a) <= s.high
+    d = c.duration_difference(1)
+    assert d.low <= outcome_distribution(b).mean() - outcome_distribution(a).mean() <= d.high
+    # the shared steps cancel, leaving only the noise of the extra step
+    independent = np.sqrt(sum(p * (1 - p) for p in c.success_rates) / c.n)
+    assert s.stderr < independent / 4
+
+def test_identical_plans_do_not_differ():
+    a, _ = example_plans()
+    c = compare_plans(a, a, n=1000, seed=2)
+    s, d = c.success_difference(1), c.duration_difference(1)
+    assert s.estimate == 0 and s.stderr == 0
+    assert d.estimate == 0 and d.stderr == 0
+
+def test_retries_share_draws():
+    a = Action("a", success_prob=0.4, duration=UniformRange(1, 3))
+    c = compare_plans(Loop(a, 2), Loop(a, 4), Alternatives("alt", a, Loop(a, 2)), n=5000, seed=3)
+    # every sample that succeeds within two tries succeeds within four
+    assert (c.statuses[1] >= c.statuses[0]).all()
+    assert (c.durations[1][c.statuses[0]] == c.durations[0][c.statuses[0]]).all()
+    assert c.success_difference(1).low > 0
+
+def test_seeded_comparisons_repeat():
+    a, b = example_plans()
+    c1, c2 = compare_plans(a, b, n=500, seed=4), compare_plans(a, b, n=500, seed=4)
+    assert (c1.durations == c2.durations).all() and (c1.statuses == c2.statuses).all()
@@ -0,0 +1,47 @@
+
+from random import Random
+
+from plans.plan import Action, Steps, Loop
+from plans.compiled import compile_plan, NodeKind
+from plans.evaluations import success_probability
+from plans.evaluations.duration import max_duration
+from plans.evaluations.outcomes import OutcomeSampler
+from plans.evaluations.histories import HistorySampler
+from plans.evaluations.compiled import (
+    CompiledSampler, compiled_success_probability, compiled_max_duration, compiled_average_duration
+)
+
+def test_compiled_layout():
+    action = Action("shared", duration=2)
+    p = Steps("s", action, Loop(action, 2))
+    cp = compile_plan(p)
+    assert len(cp) == 3
+    assert cp.root == 2
+    assert cp.kind[cp.root] == NodeKind.STEPS
+    assert cp.plan_at(cp.index_of(action)) is action
+    assert list(cp.child_indices(cp.root)) == [cp.index_of(action), 1]
+    assert cp.max_loops[1] == 2
+    assert cp.duration_low[0] == cp.duration_high[0] == 2
+
+def test_compiled_deterministic_evaluations(mixed_plan):
+    p = mixed_plan
+    cp = compile_plan(p)
+    assert abs(compiled_success_probability(cp) - success_probability(p)) < 1e-12
+    assert compiled_max_duration(cp) == max_duration(p)
+
+def test_compiled_sampler_matches_recursive_samplers(mixed_plan):
+    p = mixed_plan
+    cp = compile_plan(p)
+    for seed in range(20):
+        recursive = OutcomeSampler()
+        recursive.rand = Random(seed)
+        assert CompiledSampler(cp, Random(seed)).sample_outcome() == recursive.evaluate_plan(p)
+
+        expected = HistorySampler(rand=Random(seed)).evaluate_plan(p)
+        history = CompiledSampler(cp, Random(seed)).sample_history()
+        assert history.result == expected.result
+        assert sorted(history.all_events()) == sorted(expected.all_events())
+
+def test_compiled_average_duration():
+    p = Steps("s", Action("a", duration=1), Action("b", duration=3))
+    assert compiled_average_duration(compile_plan(p)) == 4
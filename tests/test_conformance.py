@@ -0,0 +1,137 @@
+from random import Random
+
+from plans.plan import Action, Steps, Requirements, Options, Alternatives, Ensure, Loop, IfElse, Optional, Fail, Event
+from plans.math import UniformRange
+from plans.outcomes import Status
+from plans.evaluations import conformance
+from plans.evaluations.conformance import ConformanceChecker, check_trace, check_history, check_traces
+from plans.evaluations.histories import HistorySampler
+from plans.evaluations.streaming import iter_events
+
+S, F = Status.SUCCESS, Status.FAILURE
+
+def example_plan():
+    def act(name, p, high=4):
+        return Action(name, success_prob=p, duration=UniformRange(0, high))
+    shared = act("shared", 0.7)
+    return Steps(
+        "root",
+        Requirements("req", Steps("s", act("a", 0.8), act("b", 0.8)), act("c", 0.7)),
+        Alternatives("alt", Loop(act("d", 0.3), 3), Options("o", act("e", 0.2), act("f", 0.6))),
+        IfElse(act("test", 0.5), Optional(shared), Ensure(act("g", 0.5, 1))),
+        Requirements("r2", shared, Steps("x", act("y", 0.9, 0), Fail()))
+    )
+
+def test_sampled_executions_conform():
+    p = example_plan()
+    checker = ConformanceChecker(p)
+    for seed in range(500):
+        history = HistorySampler(rand=Random(seed)).evaluate_plan(p)
+        assert check_history(p, history) is None
+        events = list(iter_events(p, seed=seed))
+        assert checker.check(events) is None
+        assert checker.check(events, 0) is None
+
+def test_steps_run_in_order():
+    a, b = Action("a", duration=1), Action("b", duration=1)
+    p = Steps("s", a, b)
+    assert check_trace(p, [Event.complete(a, 0, 1, S), Event.complete(b, 1, 2, S), Event.complete(p, 0, 2, S)], 0) is None
+    v = check_trace(p, [Event.complete(b, 0, 1, S), Event.complete(a, 1, 2, S), Event.complete(p, 0, 2, S)], 0)
+    assert v.index == 0 and v.event.plan is b
+
+def test_compound_status_follows_children():
+    a, b = Action("a", duration=1), Action("b", duration=1)
+    p = Steps("s", a, b)
+    v = check_trace(p, [Event.complete(a, 0, 1, F), Event.complete(p, 0, 1, S)], 0)
+    assert v.index == 1
+    # the failed step ends the Steps, so b never runs
+    v = check_trace(p, [Event.complete(a, 0, 1, F), Event.complete(b, 1, 2, S), Event.complete(p, 0, 2, F)], 0)
+    assert v.index == 1 and v.event.plan is b
+
+def test_retry_bounds():
+    a = Action("a", duration=1)
+    loop = Loop(a, 2)
+    tries = [Event.complete(a, i, i + 1, F) for i in range(3)]
+    assert check_trace(loop, tries[:2] + [Event.complete(loop, 0, 2, F)], 0) is None
+    v = check_trace(loop, tries + [Event.complete(loop, 0, 3, F)], 0)
+    assert v.index == 2
+    ensure = Ensure(a)
+    assert check_trace(ensure, tries + [Event.complete(a, 3, 4, S), Event.complete(ensure, 0, 4, S)], 0) is None
+    assert check_trace(ensure, tries + [Event.complete(ensure, 0, 3, F)], 0).index == 3
+
+def test_branches():
+    t, yes, no = Action("t", duration=1), Action("yes", duration=1), Action("no", duration=1)
+    p = IfElse(t, yes, no)
+    assert check_trace(p, [Event.complete(t, 0, 1, S), Event.complete(yes, 1, 2, F), Event.complete(p, 0, 2, F)], 0) is None
+    v = check_trace(p, [Event.complete(t, 0, 1, S), Event.complete(no, 1, 2, S), Event.complete(p, 0, 2, S)], 0)
+    assert v.index == 1 and v.event.plan is no
+
+def test_aborted_children():
+    a, b, c = Action("a", duration=5), Action("b", duration=2), Action("c", duration=1)
+    p = Requirements("r", a, Steps("s", b, c))
+    # b fails at 2, and a is aborted then
+    assert check_trace(p, [
+        Event.complete(b, 0, 2, F), Event.complete(p.children[1], 0, 2, F),
+        Event.complete(a, 0, 2, F), Event.complete(p, 0, 2, F)
+    ], 0) is None
+    # ... so it cannot run on until 5, and r cannot end without it
+    v = check_trace(p, [
+        Event.complete(b, 0, 2, F), Event.complete(p.children[1], 0, 2, F),
+        Event.complete(p, 0, 2, F), Event.complete(a, 0, 5, S)
+    ], 0)
+    assert v.index == 2 and v.event.plan is p
+
+def test_ties_in_any_order():
+    a, b = Action("a", duration=0), Action("b", duration=0)
+    p = Steps("s", Optional(a), b)
+    events = [Event.complete(b, 0, 0, S), Event.complete(p, 0, 0, S), Event.complete(a, 0, 0, F), Event.complete(p.children[0], 0, 0, S)]
+    assert check_trace(p, events, 0) is None
+    assert check_trace(p, events) is None
+
+def test_tied_retries_conform():
+    # zero-length retries, and a node in several places, on both sides of aborts
+    def act(name, p):
+        return Action(name, success_prob=p, duration=UniformRange(0, 1))
+    shared = act("shared", 0.5)
+    p = Loop(Requirements(
+        "r",
+        Options("o", Ensure(act("e", 0.6)), shared),
+        act("a", 0.8),
+        Alternatives("alt", IfElse(act("t", 0.7), act("y", 0.4), shared), Steps("s", shared, act("z", 0.5)))
+    ), 3)
+    checker = ConformanceChecker(p)
+    # each of these was once rejected, by matching ties greedily
+    for seed in [0, 9, 26, 36]:
+        assert check_history(p, HistorySampler(rand=Random(seed)).evaluate_plan(p)) is None
+        assert checker.check(list(iter_events(p, seed=seed))) is None
+
+def test_wide_shared_loops_conform():
+    # many alike Steps of one shared action, whose events tie with each other's
+    shared = Action("shared", success_prob=.9, duration=UniformRange(0, 1))
+    for k in (4, 6, 8):
+        p = Loop(Requirements(*[Steps(f"s{i}", shared, shared) for i in range(k)]), 3)
+        checker = ConformanceChecker(p)
+        for seed in range(20):
+            assert checker.check(list(iter_events(p, seed=seed))) is None
+            assert check_history(p, HistorySampler(rand=Random(seed)).evaluate_plan(p)) is None
+
+def test_incomplete_and_foreign_traces():
+    a, b = Action("a", duration=1), Action("b", duration=1)
+    p = Steps("s", a, b)
+    v = check_trace(p, [Event.complete(a, 0, 1, S), Event.complete(b, 1, 2, S)], 0)
+    assert v.index == 2 and v.event is None
+    v = check_trace(p, [Event.complete(Action("other"), 0, 1, S)], 0)
+    assert v.index == 0 and 'not part' in v.reason
+    v = check_trace(p, [Event.complete(a, 0, 3, S), Event.complete(b, 1, 2, S)], 0)
+    assert v.index == 1
+
+def test_batches_match_serial_checks(monkeypatch):
+    p = example_plan()
+    traces = [list(iter_events(p, seed=seed)) for seed in range(40)]
+    # cut every other trace short
+    traces = [t if i % 2 else t[:-1] for i, t in enumerate(traces)]
+    serial = check_traces(p, traces)
+    monkeypatch.setattr(conformance, 'SHARD_SIZE', 50)
+    parallel = check_traces(p, traces, workers=2)
+    assert [v is None for v in serial] == [i % 2 == 1 for i in range(40)]
+    assert [(v.index, v.reason, v.event) for v in serial if v] == [(v.index, v.reason, v.event) for v in parallel if v]
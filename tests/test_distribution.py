@@ -0,0 +1,62 @@
+
+import numpy as np
+
+from plans.plan import Action, Steps, Options, Requirements, Alternatives, Loop, Ensure, IfElse, Optional, Fail
+from plans.math import UniformRange
+from plans.outcomes import Status
+from plans.evaluations import success_probability
+from plans.evaluations.batch import sample_outcomes
+from plans.evaluations.distribution import outcome_distribution
+
+def close_to(value, target, eps=1e-9) -> bool:
+    return abs(value - target) <= eps
+
+def test_action_distribution():
+    d = outcome_distribution(Action("Feed the cat", success_prob=0.5, duration=UniformRange(2, 4)))
+    assert close_to(d.success_probability, 0.5)
+    assert close_to(d.mean(), 3.0)
+    assert close_to(d.variance(), 2.0 / 3.0)
+    assert d.quantile(0.5) == 3
+    assert d.max_duration == 4
+    assert close_to(d.probability_within(2), 1.0 / 3.0)
+    assert close_to(d.probability_within(2, Status.SUCCESS), 1.0 / 6.0)
+
+def test_steps_and_requirements_distribution():
+    s = Steps(
+        "Feed the cat",
+        Action("Get the cat food", duration=1, success_prob=0.5),
+        Action("Fill the cat food bowl", duration=3, success_prob=0.5)
+    )
+    d = outcome_distribution(s)
+    assert close_to(d.success_probability, 0.25)
+    assert close_to(d.mean(), 2.5)
+
+    r = Requirements(
+        "b",
+        Action("D", duration=3, success_prob=0.9),
+        Action("E", duration=2, success_prob=0.5)
+    )
+    d = outcome_distribution(r)
+    assert close_to(d.success_probability, 0.45)
+    assert close_to(d.mean(), 2.5)
+
+def test_distributions_agree_with_success_probability():
+    action = Action("try", duration=UniformRange(1, 3), success_prob=0.6)
+    plans = [
+        Options("o", Action("a", success_prob=0.8, duration=1), Action("b", success_prob=0.95, duration=2)),
+        Alternatives("a", Action("a", success_prob=0.5, duration=3), Action("b", success_prob=0.5, duration=1)),
+        Loop(action, 3),
+        IfElse(action, Action("yes", duration=2, success_prob=0.9), Optional(Fail())),
+    ]
+    for p in plans:
+        d = outcome_distribution(p)
+        assert close_to(d.success_probability, success_probability(p))
+        assert close_to(d.success_probability + d.failure_probability, 1.0)
+
+def test_distribution_agrees_with_sampling():
+    action = Action("try", duration=UniformRange(1, 3), success_prob=0.6)
+    p = Steps("s", Ensure(action), Alternatives("a", Loop(action, 2), Action("b", duration=4, success_prob=0.5)))
+    d = outcome_distribution(p)
+    statuses, durations = sample_outcomes(p, 50000, np.random.default_rng(7))
+    assert close_to(d.success_probability, statuses.mean(), eps=0.01)
+    assert close_to(d.mean(), durations.mean(), eps=0.05)
@@ -0,0 +1,36 @@
+
+import numpy as np
+
+from plans.plan import Action, Steps
+from plans.math import UniformRange
+from plans.evaluations.duration import estimate_duration, RunningMoments
+
+def test_running_moments():
+    values = np.arange(100, dtype=float) ** 1.5
+    m = RunningMoments()
+    m.add_batch(values[:30])
+    other = RunningMoments()
+    other.add_batch(values[30:])
+    m.merge(other)
+    assert m.count == 100
+    assert abs(m.mean - values.mean()) < 1e-9
+    assert abs(m.variance - values.var(ddof=1)) < 1e-6
+
+def test_estimate_stops_on_absolute_width():
+    p = Steps("s", Action("a", duration=UniformRange(2, 4)), Action("b", duration=UniformRange(0, 10), success_prob=0.9))
+    estimate = estimate_duration(p, abs_width=0.1, seed=1)
+    lower, upper = estimate.interval
+    assert upper - lower <= 0.1
+    assert abs(estimate.mean - 8.0) < 0.1
+    assert estimate.samples < 1000000
+
+def test_estimate_deterministic_plan_stops_after_one_batch():
+    estimate = estimate_duration(Action("a", duration=3), rel_width=0.01, batch_size=100)
+    assert estimate.mean == 3
+    assert estimate.standard_error == 0
+    assert estimate.samples == 100
+
+def test_estimate_respects_sample_limit():
+    p = Action("a", duration=UniformRange(0, 100))
+    estimate = estimate_duration(p, abs_width=1e-6, batch_size=500, max_samples=2000)
+    assert estimate.samples == 2000
@@ -0,0 +1,85 @@
+from plans.plan import Action, Steps, Requirements, Options, Loop, Plan
+from plans.math import Constant
+from plans.evaluations import success_probability
+from plans.evaluations.success import SuccessEvaluator
+from plans.evaluations.duration import max_duration
+from plans.editing import edit_plan
+
+def wide_plan(width=30, depth=3):
+    def build(d):
+        if d == 0:
+            return Action(f"a{d}", success_prob=0.99, duration=1)
+        kind = Steps if d % 2 else Options
+        return kind(f"n{d}", *[build(d - 1) for _ in range(width)])
+    return build(depth)
+
+def counting(evaluator):
+    calls = []
+    original = evaluator.evaluate_action
+    def evaluate_action(action, c=None):
+        calls.append(action)
+        return original(action, c)
+    evaluator.evaluate_action = evaluate_action
+    return calls
+
+def test_edits_reevaluate_the_dirty_path():
+    p = wide_plan()
+    editor = edit_plan(p)
+    assert editor.size() == 1 + 30 + 900 + 27000
+    assert abs(editor.success_probability() - success_probability(p)) < 1e-12
+    other = wide_plan(3, 2)
+    editor.success_probability(other)
+    calls = counting(editor.success)
+    leaf = p.children[3].children[4].children[5]
+    leaf.success_prob = 0.5
+    editor.size()
+    assert abs(editor.success_probability() - success_probability(p)) < 1e-12
+    assert calls == [leaf]
+    # the values of other plans were kept
+    editor.success_probability(other)
+    assert calls == [leaf]
+
+def test_digests_and_durations_follow_edits():
+    p = wide_plan(4, 3)
+    editor = edit_plan(p)
+    before = editor.structural_digest()
+    assert editor.max_duration() == max_duration(p)
+    p.number_steps()
+    assert editor.structural_digest() != before
+    p.children[1].children[0].children[0].duration = Constant(5)
+    assert editor.max_duration() == max_duration(p)
+
+def test_changing_children():
+    a, b, c = Action("a", success_prob=0.5), Action("b", success_prob=0.5), Action("c", success_prob=0.9)
+    inner = Steps("inner", a)
+    p = Requirements("r", inner, Loop(b, 2))
+    editor = edit_plan(p)
+    assert editor.parents(a) == [inner]
+    editor.success_probability()
+    editor.insert_child(inner, 1, c)
+    assert editor.parents(c) == [inner]
+    assert abs(editor.success_probability() - 0.5 * 0.9 * 0.75) < 1e-12
+    assert editor.remove_child(inner, 0) is a
+    assert editor.parents(a) == []
+    assert abs(editor.success_probability() - 0.9 * 0.75) < 1e-12
+    editor.replace_child(p, 1, b)
+    assert abs(editor.success_probability() - 0.9 * 0.5) < 1e-12
+    editor.close()
+    c.success_prob = 0.1
+    assert abs(success_probability(p) - 0.1 * 0.5) < 1e-12
+
+def test_detached_children_see_later_edits():
+    a = Action("a", success_prob=0.5)
+    p = Steps("p", a, Action("b"))
+    editor = edit_plan(p)
+    editor.success_probability()
+    assert editor.remove_child(p, 0) is a
+    editor.close()
+    x = Steps("x", a)
+    assert a.parents() == [x]
+    v = SuccessEvaluator()
+    assert v.evaluate_plan(x) == 0.5
+    digest = x.structural_digest()
+    a.success_prob = 0.9
+    assert x.structural_digest() != digest
+    assert v.evaluate_plan(x) == 0.9
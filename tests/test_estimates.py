@@ -0,0 +1,66 @@
+import numpy as np
+
+from plans.plan import Action, Steps, Requirements, Loop
+from plans.math import Constant, UniformRange
+from plans.outcomes import Status
+from plans.evaluations.distribution import outcome_distribution
+from plans.evaluations.estimates import estimate_outcomes
+from plans.evaluations.draws import CommonDraws, LatinHypercubeDraws
+
+def reliable_plan(k=20):
+    return Steps("s", *[
+        Action(f"a{i}", success_prob=0.999, duration=UniformRange(1, 3)) for i in range(k)
+    ])
+
+def test_modes_agree_with_exact():
+    p = Requirements("r",
+        Loop(Action("a", success_prob=0.6, duration=UniformRange(1, 4)), 3),
+        Action("b", success_prob=0.9, duration=UniformRange(2, 6))
+    )
+    exact = outcome_distribution(p)
+    for mode in ['independent', 'antithetic', 'latin', 'importance']:
+        e = estimate_outcomes(p, 20000, mode, seed=1)
+        assert abs(e.probability(Status.SUCCESS) - exact.success_probability) < 0.02
+        assert abs(e.mean() - exact.mean()) < 0.1
+
+def test_latin_hypercube_stratifies():
+    a = Action("a", success_prob=0.3, duration=UniformRange(0, 9))
+    e = estimate_outcomes(a, 100, 'latin', seed=2)
+    assert e.statuses.sum() == 30
+    assert (np.bincount(e.durations) == 10).all()
+
+def test_antithetic_pairs():
+    a = Action("a", success_prob=0.5, duration=UniformRange(0, 10))
+    e = estimate_outcomes(a, 1000, 'antithetic', seed=3)
+    assert (e.statuses[:500] != e.statuses[500:]).all()
+    assert (e.durations[:500] + e.durations[500:] == 10).all()
+    assert e.mean() == 5.0
+
+def test_importance_sampling_finds_rare_failures():
+    p = reliable_plan()
+    exact = outcome_distribution(p)
+    e = estimate_outcomes(p, 2000, 'importance', seed=4, tilt=20)
+    assert (~e.statuses).sum() > 500
+    assert abs(e.probability(Status.FAILURE) / exact.failure_probability - 1) < 0.1
+    assert abs(e.mean(Status.FAILURE) - exact.mean(Status.FAILURE)) < 2.0
+    assert 0 < e.effective_sample_size < e.n
+    plain = estimate_outcomes(p, 2000, seed=4)
+    assert plain.effective_sample_size == plain.n
+    assert (~plain.statuses).sum() < 100
+
+def test_uniforms_computed_per_sample():
+    for draws in [CommonDraws(1001, 5), LatinHypercubeDraws(1001, 5)]:
+        everything = draws.uniforms("a", 0, np.arange(1001))
+        some = np.array([3, 500, 1000])
+        assert (draws.uniforms("a", 0, some) == everything[:, some]).all()
+        assert (draws.uniforms("a", 1, some) != everything[:, some]).all()
+        assert ((0 <= everything) & (everything < 1)).all()
+    strata = np.floor(everything * 1001).astype(int)
+    assert (np.sort(strata, axis=1) == np.arange(1001)).all()
+
+def test_large_durations_invert_in_closed_form():
+    p = Steps("s", Action("big", duration=10**8), Action("range", duration=UniformRange(10**8, 2 * 10**8)))
+    e = estimate_outcomes(p, 1000, 'latin', seed=6)
+    assert (e.durations >= 2 * 10**8).all() and (e.durations <= 3 * 10**8).all()
+    assert (Constant(-1).quantiles(np.array([0.5])) == -1).all()
+    assert (UniformRange(0, 3).quantiles(np.array([0.0, 0.3, 0.99])) == [0, 1, 3]).all()
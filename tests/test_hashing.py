@@ -0,0 +1,60 @@
+
+from plans.plan import Action, Steps, Options, Loop, finite_loop
+from plans.math import UniformRange
+from plans.compiled import compile_plan
+from plans.interning import PlanInterner, intern_plan
+from plans.evaluations.success import SuccessEvaluator, success_probability
+
+def test_structural_digest_ignores_identity():
+    a1 = Action("a", success_prob=0.5, duration=UniformRange(1, 3))
+    a2 = Action("a", success_prob=0.5, duration=UniformRange(1, 3))
+    assert a1 != a2
+    assert a1.structural_digest() == a2.structural_digest()
+    assert Steps("s", a1).structural_digest() == Steps("s", a2).structural_digest()
+
+def test_structural_digest_sees_parameters():
+    a = Action("a", success_prob=0.5, duration=1)
+    digests = {
+        a.structural_digest(),
+        Action("b", success_prob=0.5, duration=1).structural_digest(),
+        Action("a", success_prob=0.6, duration=1).structural_digest(),
+        Action("a", success_prob=0.5, duration=2).structural_digest(),
+        Loop(a, 2).structural_digest(),
+        Loop(a, 3).structural_digest(),
+        Options("s", a).structural_digest(),
+        Steps("s", a).structural_digest(),
+    }
+    assert len(digests) == 8
+
+def test_structural_digest_follows_mutation():
+    a = Action("a", success_prob=0.5)
+    s = Steps("s", a)
+    before = s.structural_digest()
+    a.success_prob = 0.6
+    assert s.structural_digest() != before
+
+def test_interning_shares_identical_subtrees():
+    p = finite_loop(5, lambda: Steps("try", Action("a", success_prob=0.5), Action("b", success_prob=0.5)))
+    interned = intern_plan(p)
+    assert len(compile_plan(p)) == 16
+    assert len(compile_plan(interned)) == 4
+    assert interned.children[0] is interned.children[4]
+    assert success_probability(interned) == success_probability(p)
+
+def test_interner_factory():
+    interner = PlanInterner()
+    a1 = interner.make(Action, "a", duration=1)
+    a2 = interner.make(Action, "a", duration=1)
+    assert a1 is a2
+    assert interner(Steps("s", Action("a", duration=1))).children[0] is a1
+    assert len(interner) == 2
+
+def test_structural_memoization():
+    v = SuccessEvaluator(structural=True, shared_only=False)
+    p = Steps("s", Action("a", success_prob=0.5), Action("a", success_prob=0.5))
+    assert v.evaluate_plan(p) == 0.25
+    assert len(v.cache) == 2
+    # by default, only the root is cached, as the two actions have a parent each
+    v = SuccessEvaluator(structural=True)
+    assert v.evaluate_plan(p) == 0.25
+    assert len(v.cache) == 1
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+# cumulative time, in microseconds, that 'import plans' may take -- it was over 
+# 100ms when rich, numpy and plans.evaluations were imported eagerly
+IMPORT_BUDGET_US = 80000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_python(*args) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+def test_import_is_lazy():
+    script = (
+        "import sys, plans, plans.parsing\n"
+        "print(' '.join(m for m in ['rich', 'numpy', 'sentence_splitter', 'plans.evaluations'] if m in sys.modules))\n"
+        "import plans.timelines.timeline\n"
+        "print('rich' in sys.modules)"
+    )
+    assert run_python("-c", script).stdout.split() == ["False"]
+
+def test_lazy_names_resolve():
+    script = (
+        "import plans, plans.evaluations as e\n"
+        "from plans import *\n"
+        "print(success_probability(Action('a', success_prob=0.5)), e.compare_plans.__module__, e.batch.__name__)"
+    )
+    assert run_python("-c", script).stdout.split() == ["0.5", "plans.evaluations.comparison", "plans.evaluations.batch"]
+
+def test_import_time_budget():
+    # the best of a few runs, as the first may find cold caches
+    times = []
+    for _ in range(3):
+        lines = run_python("-X", "importtime", "-c", "import plans").stderr.splitlines()
+        total = [line for line in lines if line.rstrip().endswith("| plans")]
+        times.append(int(total[-1].split("|")[1]))
+    assert min(times) < IMPORT_BUDGET_US
+
+def test_subpackages_resolve():
+    script = (
+        "import plans\n"
+        "print(plans.evaluations.success_probability(plans.Action('a', success_prob=0.5)))\n"
+        "print(plans.timelines.__name__, plans.parsing.__name__, plans.editing.__name__)\n"
+        "print(hasattr(plans, 'no_such_module'))"
+    )
+    assert run_python("-c", script).stdout.split() == [
+        "0.5", "plans.timelines", "plans.parsing", "plans.editing", "False"
+    ]
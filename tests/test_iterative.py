@@ -0,0 +1,156 @@
+
+import sys
+import json
+import numpy as np
+from random import Random
+
+from plans.plan import Action, Steps, Options, Optional, Ensure, Fail, Requirements, Plan, Event, History, IterativeEvaluator
+from plans.outcomes import Status
+from plans.context import Context
+from plans.evaluations.success import success_probability
+from plans.evaluations.outcomes import sample_outcome, OutcomeSampler
+from plans.evaluations.histories import sample_history
+from plans.evaluations.duration import max_duration
+from plans.evaluations.serialization import DictTranslator, serialize, deserialize
+from plans.evaluations.transformer import EnsureAction
+from plans.evaluations.compiled import CompiledSampler
+from plans.compiled import compile_plan
+
+DEPTH = 100000
+
+def deep_chain(depth: int) -> Plan: 
+    p = Action("leaf", success_prob=0.5, duration=1)
+    for i in range(depth): 
+        p = Steps(f"s{i}", p, Action("x", duration=1))
+    return p
+
+def test_deep_plans_evaluate_without_recursion(): 
+    limit = sys.getrecursionlimit()
+    p = deep_chain(DEPTH)
+    assert success_probability(p) == 0.5
+    assert max_duration(p) == DEPTH + 1
+    outcome = sample_outcome(p, seed=1)
+    assert outcome.duration in (1, DEPTH + 1)
+    d = DictTranslator().evaluate_plan(p, Context())
+    assert d['name'] == f"s{DEPTH - 1}"
+    q = EnsureAction().evaluate_plan(p)
+    assert q.children[1].plan_type == 'Ensure'
+    assert sys.getrecursionlimit() == limit
+
+def test_deep_history(): 
+    p = Optional(Action("leaf", duration=1))
+    for i in range(DEPTH): 
+        p = Steps(f"s{i}", p)
+    h = sample_history(p, seed=1)
+    assert h.end_time == 1
+    assert len(h.events) == DEPTH + 1
+    # a failure aborts everything running beside it, at every level 
+    p = Action("leaf", duration=1)
+    for i in range(10000): 
+        p = Requirements(f"r{i}", p, Action("fails", duration=0, success_prob=0.0))
+    h = sample_history(p, seed=1)
+    assert len(h.events) == 2 * 10000
+    assert all((e.end_time, e.status) == (0, Status.FAILURE) for e in h.all_events())
+
+def test_nested_aborts(): 
+    a, b, s, f, r, r2 = Action("a"), Action("b"), Steps("s"), Action("f"), Requirements("r"), Requirements("r2")
+    steps = History.with_children(
+        Event.complete(s, 0, 5, Status.SUCCESS), 
+        History(Event.complete(a, 0, 2, Status.SUCCESS)), 
+        History(Event.complete(b, 2, 5, Status.SUCCESS)) 
+    )
+    h = History.with_abortable_children(
+        Event.complete(r, 0, 3, Status.FAILURE), steps, History(Event.complete(f, 0, 3, Status.FAILURE))
+    )
+    assert h.events == sorted([
+        Event.complete(a, 0, 2, Status.SUCCESS), Event.complete(b, 2, 3, Status.FAILURE), 
+        Event.complete(s, 0, 3, Status.FAILURE), Event.complete(f, 0, 3, Status.FAILURE)
+    ])
+    h = History.with_abortable_children(Event.complete(r2, 0, 1, Status.FAILURE), h)
+    assert h.events == sorted([
+        Event.complete(a, 0, 1, Status.FAILURE), Event.complete(s, 0, 1, Status.FAILURE), 
+        Event.complete(f, 0, 1, Status.FAILURE), Event.complete(r, 0, 1, Status.FAILURE)
+    ])
+
+def test_deep_serialization(): 
+    p = deep_chain(DEPTH)
+    text = serialize(p)
+    assert deserialize(text).structural_digest() == p.structural_digest()
+    q = deep_chain(10)
+    assert serialize(q) == json.dumps(DictTranslator().evaluate_plan(q, Context()))
+
+def test_matches_compiled_sampler(): 
+    p = Options("o", Steps("s", Action("a", success_prob=0.3, duration=2), Action("b", success_prob=0.6, duration=3)), Action("c", success_prob=0.5, duration=1))
+    cp = compile_plan(p)
+    for seed in range(20): 
+        assert sample_outcome(p, seed) == CompiledSampler(cp, Random(seed)).sample_outcome()
+    assert abs(success_probability(p) - (1 - (1 - 0.18) * 0.5)) < 1e-12
+
+def test_errors_reach_the_caller(): 
+    p = Steps("s", Action("a"), Ensure(Fail()))
+    try: 
+        success_probability(p)
+        assert False
+    except ValueError: 
+        pass
+
+class Depth(IterativeEvaluator[int]): 
+
+    def evaluate_action(self, action, c=None): 
+        return 1
+
+    def evaluate_steps(self, steps, c=None): 
+        depths = yield steps.children
+        return 1 + max(depths, default=0)
+
+    def evaluate_optional(self, opt, c=None): 
+        try: 
+            return 1 + (yield opt.children[0])
+        except ValueError: 
+            return 0
+
+    def evaluate_fail(self, failure, c=None): 
+        raise ValueError("fail")
+
+def test_generator_protocol(): 
+    assert Depth().evaluate_plan(Steps("s", Action("a"), Steps("t", Action("b")))) == 3
+    assert Depth().evaluate_plan(Steps("empty")) == 1
+    assert Depth().evaluate_plan(Steps("s", Optional(Fail()))) == 1
+
+def test_depth_threshold(): 
+    # the recursive path, the explicit stack and a switch between them agree 
+    p = Steps("s", Action("a"), Steps("t", Action("b"), Optional(Fail())), Steps("u"))
+    for limit in (0, 1, 2, 50): 
+        d = Depth()
+        d.max_recursion_depth = limit
+        assert d.evaluate_plan(p) == 3
+    p = deep_chain(300)
+    outcomes = []
+    for limit in (0, 20, 100): 
+        sampler = OutcomeSampler(Random(3))
+        sampler.max_recursion_depth = limit
+        outcomes.append([sampler.evaluate_plan(p) for _ in range(5)])
+    assert outcomes[0] == outcomes[1] == outcomes[2]
+    # bottom_up methods, on either path 
+    dicts = []
+    for limit in (0, 20, 100): 
+        translator = DictTranslator()
+        translator.max_recursion_depth = limit
+        dicts.append(translator.evaluate_plan(p, Context()))
+    assert dicts[0] == dicts[1] == dicts[2]
+
+def test_deep_batch_sampling(): 
+    from plans.evaluations.batch import sample_outcomes
+    from plans.evaluations.estimates import estimate_outcomes
+    from plans.evaluations.accumulators import accumulate_outcomes
+    from plans.evaluations.comparison import compare_plans
+    from plans.evaluations.duration import average_duration
+    p = Action("leaf", duration=1)
+    for i in range(5000): 
+        p = Steps(f"s{i}", p, Action("x", duration=1))
+    statuses, durations = sample_outcomes(p, 50, np.random.default_rng(0))
+    assert statuses.all() and (durations == 5001).all()
+    assert estimate_outcomes(p, 20, seed=0).n == 20
+    assert accumulate_outcomes(p, 20, seed=0).count == 20
+    assert compare_plans(p, p, n=20, seed=0).success_rates.tolist() == [1.0, 1.0]
+    assert average_duration(p, 20, seed=0) == 5001
@@ -0,0 +1,93 @@
+import pickle
+
+
+from plans.plan import Action, Steps, Ensure, Plan
+from plans.context import Context
+from plans.evaluations.success import SuccessEvaluator, success_probability
+from plans.evaluations.duration import MaxDurationEvaluator, max_duration
+from plans.evaluations.serialization import serialize
+
+class CountingSuccessEvaluator(SuccessEvaluator):
+
+    def __init__(self, max_cache_size: int = 100000):
+        SuccessEvaluator.__init__(self, max_cache_size)
+        self.actions = 0
+
+    def evaluate_action(self, action, c=None):
+        self.actions += 1
+        return SuccessEvaluator.evaluate_action(self, action, c)
+
+def shared_tower(depth: int) -> Plan:
+    p = Action("a", success_prob=1.0, duration=1)
+    for i in range(depth):
+        p = Steps(f"level {i}", p, p)
+    return p
+
+def test_shared_subtrees_evaluated_once():
+    p = shared_tower(60)
+    v = CountingSuccessEvaluator()
+    assert v.evaluate_plan(p, Context()) == 1.0
+    assert v.actions == 1
+    assert max_duration(p) == 2 ** 60
+    assert max_duration(Ensure(p)) == 2 ** 60
+    assert len(serialize(shared_tower(10))) > 0
+
+def test_cache_invalidated_by_mutation():
+    a = Action("a", success_prob=0.5)
+    p = Steps("s", a, a)
+    v = SuccessEvaluator()
+    assert v.evaluate_plan(p) == 0.25
+    a.success_prob = 0.1
+    assert abs(v.evaluate_plan(p) - 0.01) < 1e-12
+
+def test_cache_is_bounded():
+    v = SuccessEvaluator(max_cache_size=3)
+    v.evaluate_plan(shared_tower(10))
+    assert len(v.cache) == 3
+
+def test_cache_keyed_on_context():
+    a = Action("a", success_prob=0.5)
+    v = SuccessEvaluator()
+    v.evaluate_plan(a, Context(x=1))
+    v.evaluate_plan(a, Context(x=2))
+    assert len(v.cache) == 2
+    v.evaluate_plan(a, Context(x=[1]))
+    assert len(v.cache) == 2
+
+def test_only_shared_nodes_and_roots_cached():
+    a = Action("a", success_prob=0.5)
+    p = Steps("s", Steps("t", a, Action("b")), a)
+    v = SuccessEvaluator()
+    assert v.evaluate_plan(p) == 0.25
+    # a, with two parents, and the root
+    assert len(v.cache) == 2
+
+def test_context_read_once_per_call():
+    a = Action("a", success_prob=0.5)
+    v = SuccessEvaluator()
+    c = Context(x=1)
+    v.evaluate_plan(a, c)
+    c['x'] = 2
+    v.evaluate_plan(a, c)
+    assert len(v.cache) == 2
+
+def test_mutation_invalidates_only_ancestors():
+    a, b = Action("a", success_prob=0.5), Action("b", success_prob=0.5)
+    p, q = Steps("p", a, a), Steps("q", b, b)
+    v = CountingSuccessEvaluator()
+    v.evaluate_plan(p)
+    v.evaluate_plan(q)
+    a.success_prob = 0.1
+    v.actions = 0
+    assert abs(v.evaluate_plan(p) - 0.01) < 1e-12
+    assert v.evaluate_plan(q) == 0.25
+    assert v.actions == 1
+
+def test_parent_links_survive_pickling():
+    p = pickle.loads(pickle.dumps(Steps("s", Action("a", success_prob=0.5), Action("b"))))
+    a = p.children[0]
+    assert a.parents() == [p]
+    v = SuccessEvaluator()
+    assert v.evaluate_plan(p) == 0.5
+    a.success_prob = 0.1
+    assert v.evaluate_plan(p) == 0.1
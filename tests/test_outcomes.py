@@ -23,4 +23,15 @@ def test_outcome_equality():
     assert o1 == o1 
     assert o1 == o2 
     assert o1 != o3 
-    assert o1 != o4 
\ No newline at end of file
+    assert o1 != o4 
+
+def test_outcome_is_immutable(): 
+    o = Outcome(Status.SUCCESS, 1) 
+    assert not hasattr(o, '__dict__')
+    try: 
+        o.duration = 2
+        assert False
+    except AttributeError: 
+        pass 
+    assert o.duration == 1
+    assert hash(o) == hash(Outcome(Status.SUCCESS, 1))
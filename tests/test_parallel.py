@@ -0,0 +1,42 @@
+
+from plans.plan import Action, Steps, Options, Requirements, Loop
+from plans.math import UniformRange
+from plans.evaluations import average_duration, sample_outcome, sample_history
+from plans.evaluations.batch import sample_outcomes, estimate_success_probability
+from plans.evaluations.histories import sample_histories
+from plans.evaluations.parallel import shard_sizes
+
+def example_plan():
+    action = Action("try", duration=UniformRange(1, 5), success_prob=0.6)
+    return Steps(
+        "s",
+        Loop(action, 3),
+        Requirements("r", Action("a", success_prob=0.9, duration=UniformRange(2, 4)), action)
+    )
+
+def test_shard_sizes():
+    assert shard_sizes(10, 4) == [4, 4, 2]
+    assert shard_sizes(8, 4) == [4, 4]
+
+def test_seeded_average_duration_independent_of_workers():
+    p = example_plan()
+    serial = average_duration(p, n=150000, seed=42)
+    assert average_duration(p, n=150000, seed=42, workers=3) == serial
+    assert average_duration(p, n=150000, seed=43) != serial
+
+def test_seeded_outcomes_independent_of_workers():
+    p = example_plan()
+    statuses, durations = sample_outcomes(p, 100000, seed=7)
+    statuses2, durations2 = sample_outcomes(p, 100000, seed=7, workers=2)
+    assert (statuses == statuses2).all()
+    assert (durations == durations2).all()
+    assert estimate_success_probability(p, 100000, seed=7, workers=2) == statuses.mean()
+    assert sample_outcome(p, seed=3) == sample_outcome(p, seed=3)
+
+def test_seeded_histories_independent_of_workers():
+    p = example_plan()
+    histories = sample_histories(p, 2500, seed=11)
+    histories2 = sample_histories(p, 2500, seed=11, workers=2)
+    assert len(histories) == 2500
+    assert [h.all_events() for h in histories] == [h.all_events() for h in histories2]
+    assert sample_history(p, seed=5).all_events() == sample_history(p, seed=5).all_events()
@@ -16,4 +16,19 @@ def test_action_equality():
     assert p3 == p3 
     assert p1 != p2 
     assert p2 != p3 
-    assert p1 != p3 
\ No newline at end of file
+    assert p1 != p3 
+
+def test_event_value_semantics(): 
+    from plans.plan import Event, Start, End
+    from plans.outcomes import Status
+    a = Action("Foo") 
+    e1 = Event.complete(a, 1, 3, Status.SUCCESS) 
+    e2 = Event(Start(a, 1), End(3, Status.SUCCESS)) 
+    assert e1 == e2 
+    assert hash(e1) == hash(e2) 
+    assert e1.start == Start(a, 1) 
+    assert e1.end == End(3, Status.SUCCESS) 
+    assert not hasattr(e1, '__dict__')
+    assert e1 < Event.complete(a, 1, 3, Status.FAILURE) or e1 > Event.complete(a, 1, 3, Status.FAILURE)
+    assert e1.abort(2) == Event.complete(a, 1, 2, Status.FAILURE) 
+    assert e1.overlaps_event(Event.complete(a, 2, 5, Status.SUCCESS))
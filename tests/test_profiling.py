@@ -0,0 +1,55 @@
+from collections import Counter
+from random import Random
+
+import numpy as np
+
+from plans.plan import Action, Steps, Requirements, Loop, Optional
+from plans.math import UniformRange
+from plans.evaluations.histories import HistorySampler
+from plans.evaluations.batch import BatchOutcomeSampler
+from plans.evaluations.success import SuccessEvaluator
+from plans.profiling import profile_evaluator
+
+def example_plan():
+    a = Action("a", success_prob=0.6, duration=UniformRange(1, 3))
+    return Steps("root", Requirements("req", Loop(a, 3), Action("b", duration=2)), Optional(Action("c", success_prob=0.5)))
+
+def test_counts_match_the_history():
+    p = example_plan()
+    sampler = HistorySampler(rand=Random(1))
+    before = dict(vars(HistorySampler))
+    with profile_evaluator(sampler) as profiler:
+        history = sampler.evaluate_plan(p)
+    assert dict(vars(HistorySampler)) == before
+    events = history.all_events()
+    assert {k: s.calls for k, s in profiler.by_type.items()} == Counter(e.plan.plan_type for e in events)
+    assert {k: s.calls for k, s in profiler.by_node.items()} == Counter(e.plan.id for e in events)
+    root = profiler.by_node[p.id]
+    assert root.cumulative >= sum(s.self_time for s in profiler.by_node.values()) * 0.999
+    assert profiler.by_type['Steps'].cumulative == root.cumulative
+
+def test_collapsed_stacks():
+    p = example_plan()
+    with profile_evaluator(HistorySampler) as profiler:
+        for seed in range(20):
+            HistorySampler(rand=Random(seed)).evaluate_plan(p)
+    lines = profiler.collapsed_stacks().splitlines()
+    paths = [line.rsplit(' ', 1)[0] for line in lines]
+    assert all(path.startswith("Steps:root") for path in paths)
+    assert "Steps:root;Requirements:req;Loop:Loop a;Action:a" in paths
+    assert all(int(line.rsplit(' ', 1)[1]) >= 0 for line in lines)
+    table = profiler.format_table(by='node', limit=3)
+    assert len(table.splitlines()) == 4
+
+def test_recursive_and_memoizing_evaluators():
+    p = example_plan()
+    with profile_evaluator(BatchOutcomeSampler) as profiler:
+        BatchOutcomeSampler(np.arange(100), np.random.default_rng(0)).evaluate_plan(p)
+    assert profiler.by_type['Steps'].calls == 1 and profiler.by_type['Action'].calls >= 3
+    evaluator = SuccessEvaluator()
+    with profile_evaluator(evaluator) as profiler:
+        evaluator.evaluate_plan(p)
+        evaluator.evaluate_plan(p)
+    # the second evaluation comes from the cache
+    assert profiler.by_node[p.id].calls == 1
+    assert vars(SuccessEvaluator)['evaluate_steps'].__qualname__ == 'SuccessEvaluator.evaluate_steps'
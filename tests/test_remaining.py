@@ -0,0 +1,107 @@
+
+from random import Random
+
+from plans.plan import Action, Steps, Requirements, Options, Alternatives, Ensure, Loop, IfElse, Optional, Fail, Event, History
+from plans.outcomes import Status
+from plans.evaluations.remaining import RemainingPlanTracker, RemainingPlanEngine, remaining_plan
+from plans.evaluations.success import success_probability
+from plans.evaluations.streaming import iter_events
+
+def test_steps_drop_finished_children(): 
+    a, b, c = Action("a", success_prob=0.5, duration=1), Action("b", success_prob=0.5, duration=2), Action("c", success_prob=0.5, duration=3)
+    p = Steps("s", a, b, c)
+    tracker = RemainingPlanTracker(p, 0)
+    assert tracker.remaining is p
+    assert tracker.success_probability() == 0.125
+    assert abs(tracker.expected_duration() - (0.5 * 1 + 0.25 * 3 + 0.25 * 6)) < 1e-12
+    r = tracker.observe(Event.complete(a, 0, 1, Status.SUCCESS))
+    assert r.plan_type == 'Steps' and r.children == [b, c]
+    assert tracker.success_probability() == 0.25
+    assert tracker.max_duration() == 5
+    assert abs(tracker.expected_duration() - (0.5 * 2 + 0.5 * 5)) < 1e-12
+    tracker.observe(Event.complete(b, 1, 3, Status.FAILURE))
+    assert tracker.finished and tracker.status == Status.FAILURE
+    assert tracker.remaining is None
+    assert tracker.success_probability() == 0.0
+    assert tracker.expected_duration() == 0.0
+
+def test_nested_paths_are_rebuilt_and_the_rest_reused(): 
+    a = Action("a", success_prob=0.5, duration=1)
+    b = Action("b", success_prob=0.5, duration=1)
+    other = Steps("other", Action("x"), Action("y"))
+    p = Requirements("r", Steps("s", a, b), other)
+    tracker = RemainingPlanTracker(p, 0)
+    r = tracker.observe(Event.complete(a, 0, 1, Status.SUCCESS))
+    assert r is not p and r.children[1] is other
+    assert r.children[0].children == [b]
+
+def test_retries_count_down(): 
+    a = Action("a", success_prob=0.5, duration=1)
+    loop = Loop(a, 3)
+    tracker = RemainingPlanTracker(loop, 0)
+    r = tracker.observe(Event.complete(a, 0, 1, Status.FAILURE))
+    assert r.plan_type == 'Loop' and r.max_loops == 2 and r.children[0] is a
+    assert tracker.success_probability() == 0.75
+    ensure = Ensure(Steps("s", a, Action("b")))
+    tracker = RemainingPlanTracker(ensure, 0)
+    r = tracker.observe(Event.complete(a, 0, 1, Status.SUCCESS))
+    assert r.plan_type == 'Options' and r.children[1] is ensure
+    assert tracker.success_probability() == 1.0
+
+def test_ifelse_becomes_its_branch(): 
+    test, yes, no = Action("t"), Action("yes", duration=1), Action("no", duration=5)
+    tracker = RemainingPlanTracker(IfElse(test, yes, no), 0)
+    assert tracker.observe(Event.complete(test, 0, 0, Status.FAILURE)) is no
+
+def random_plan(rand: Random, depth: int): 
+    if depth == 0 or rand.random() < 0.3: 
+        return Action(f"a{rand.randint(0, 99)}", success_prob=rand.choice([0.3, 0.7, 1.0]), duration=rand.randint(0, 3))
+    kind = rand.randint(0, 6)
+    children = [random_plan(rand, depth - 1) for i in range(rand.randint(1, 3))]
+    if kind == 0: return Steps("s", *children)
+    if kind == 1: return Options("o", *children)
+    if kind == 2: return Requirements("r", *children)
+    if kind == 3: return Alternatives("alt", *children)
+    if kind == 4: return Loop(children[0], rand.randint(1, 3))
+    if kind == 5: return Optional(children[0])
+    return IfElse(random_plan(rand, depth - 1), random_plan(rand, depth - 1), random_plan(rand, depth - 1))
+
+def test_tracks_simulated_executions_to_their_end(): 
+    rand = Random(4)
+    for i in range(200): 
+        p = random_plan(rand, 4)
+        events = list(iter_events(p, seed=i))
+        tracker = RemainingPlanTracker(p, 0)
+        for e in events[:-1]: 
+            tracker.observe(e)
+            if not tracker.finished: 
+                assert 0.0 <= tracker.success_probability() <= 1.0
+        tracker.observe(events[-1])
+        assert tracker.finished 
+        assert tracker.status == events[-1].status
+        assert tracker.end_time == events[-1].end_time
+
+def test_remaining_plan_of_partial_history(): 
+    a, b = Action("a", success_prob=0.5, duration=1), Action("b", success_prob=0.5, duration=2)
+    p = Steps("s", a, b)
+    h = History(Event.complete(a, 0, 1, Status.SUCCESS))
+    assert remaining_plan(p, h).children == [b]
+
+def test_engine_shares_evaluations(): 
+    p = Steps("s", *[Steps(f"part {i}", Action("a", success_prob=0.9, duration=1), Action("b", success_prob=0.9, duration=1)) for i in range(50)])
+    engine = RemainingPlanEngine()
+    for k in range(100): 
+        engine.start(k, p, 0)
+    first = p.children[0].children[0]
+    for k in range(100): 
+        engine.observe(k, Event.complete(first, 0, 0, Status.SUCCESS))
+        assert abs(engine[k].success_probability() - 0.9 ** 99) < 1e-12
+        # a step of one time unit runs for as long as every step before it succeeded
+        assert abs(engine[k].expected_duration() - sum(0.9 ** i for i in range(99))) < 1e-9
+    # each execution rebuilt only the two nodes on the changed path
+    assert len(engine.success.cache) < 151 + 2 * 100
+    assert len(engine.distributions.cache) < 151 + 2 * 100
+    assert len(engine) == 100
+    assert engine[1].distributions is engine[2].distributions
+    engine.finish(0)
+    assert 0 not in engine
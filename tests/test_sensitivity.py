@@ -0,0 +1,54 @@
+from plans.plan import Action, Steps, Requirements, Options, Alternatives, Ensure, Loop, IfElse, Optional, Fail
+from plans.evaluations import success_probability
+from plans.evaluations.sensitivity import success_sensitivity
+
+def example_plan():
+    shared = Action("shared", success_prob=0.7)
+    return Steps(
+        "root",
+        Requirements("req", Action("a", success_prob=0.9), Options("o", Action("b", success_prob=0.4), Action("c", success_prob=0.5))),
+        Alternatives("alt", Loop(Action("d", success_prob=0.3), 3), Fail()),
+        IfElse(Action("test", success_prob=0.6), shared, Ensure(Action("g", success_prob=0.2))),
+        Optional(Action("opt", success_prob=0.1)),
+        Requirements("r2", shared, Action("e", success_prob=0.95))
+    )
+
+def test_derivatives_match_finite_differences():
+    p = example_plan()
+    s = success_sensitivity(p)
+    assert abs(s.probability - success_probability(p)) < 1e-12
+    h = 1e-6
+    for action in p.descendants():
+        if action.plan_type != "Action":
+            continue
+        before = action.success_prob
+        action.success_prob = before + h
+        up = success_probability(p)
+        action.success_prob = before - h
+        down = success_probability(p)
+        action.success_prob = before
+        assert abs(s.derivative(action) - (up - down) / (2 * h)) < 1e-6
+
+def test_loop_gains():
+    p = example_plan()
+    s = success_sensitivity(p)
+    loop = p.children[1].children[0]
+    gain = s.loop_gain(loop)
+    before = success_probability(p)
+    loop.max_loops += 1
+    # the plan is linear in the loop's success probability, as it isn't shared
+    assert abs(success_probability(p) - before - gain) < 1e-12
+
+def test_bottlenecks_are_ranked():
+    weak, strong = Action("weak", success_prob=0.5), Action("strong", success_prob=0.99)
+    p = Steps("s", weak, strong, Optional(Action("irrelevant", success_prob=0.1)))
+    report = success_sensitivity(p).bottlenecks()
+    assert [b.plan for b in report][:2] == [weak, strong]
+    assert report[-1].sensitivity == 0.0
+    assert len(success_sensitivity(p).bottlenecks(1)) == 1
+
+def test_large_plans():
+    actions = [Action(f"a{i}", success_prob=0.9999) for i in range(20000)]
+    p = Steps("s", *actions)
+    s = success_sensitivity(p)
+    assert abs(s.derivative(actions[0]) - s.probability / 0.9999) < 1e-12
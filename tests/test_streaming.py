@@ -0,0 +1,84 @@
+
+from itertools import islice
+from random import Random
+
+from plans.plan import Action, Steps, Requirements, Alternatives, Ensure
+from plans.outcomes import Status
+from plans.evaluations import success_probability
+from plans.evaluations.histories import HistorySampler
+from plans.evaluations.streaming import iter_events, replay_history
+
+def test_events_in_end_time_order(mixed_plan):
+    p = mixed_plan
+    for seed in range(50):
+        events = list(iter_events(p, seed=seed))
+        assert [e.end_time for e in events] == sorted(e.end_time for e in events)
+        root = events[-1]
+        assert root.plan == p
+        assert all(root.contains_event(e) for e in events)
+
+def test_steps_events():
+    p = Steps("s", Action("a", duration=1), Action("b", duration=2))
+    events = list(iter_events(p, start_time=10))
+    assert [(e.plan.name, e.start_time, e.end_time) for e in events] == [
+        ("a", 10, 11), ("b", 11, 13), ("s", 10, 13)
+    ]
+
+def test_parallel_aborts():
+    p = Requirements("r", Action("slow", duration=5), Action("fails", duration=2, success_prob=0.0))
+    events = {e.plan.name: e for e in iter_events(p)}
+    assert events["fails"].status == Status.FAILURE
+    assert (events["slow"].end_time, events["slow"].status) == (2, Status.FAILURE)
+    assert (events["r"].end_time, events["r"].status) == (2, Status.FAILURE)
+
+    p = Alternatives("a", Steps("slow", Action("x", duration=3), Action("y", duration=3)), Action("fast", duration=4))
+    events = [(e.plan.name, e.end_time, e.status) for e in iter_events(p)]
+    assert events == [
+        ("x", 3, Status.SUCCESS),
+        ("fast", 4, Status.SUCCESS),
+        ("y", 4, Status.FAILURE),
+        ("slow", 4, Status.FAILURE),
+        ("a", 4, Status.SUCCESS),
+    ]
+
+def test_streamed_success_rate(mixed_plan):
+    p = mixed_plan
+    successes = sum(1 for seed in range(4000) if list(iter_events(p, seed=seed))[-1].status)
+    assert abs(successes / 4000 - success_probability(p)) < 0.03
+
+def test_streaming_is_lazy():
+    p = Ensure(Action("almost never", duration=1, success_prob=1e-12))
+    events = list(islice(iter_events(p), 1000))
+    assert len(events) == 1000
+    assert events[-1].end_time == 1000
+
+def test_deep_chain():
+    p = Action("a", duration=1)
+    for i in range(5000):
+        p = Steps(f"s{i}", p)
+    events = list(iter_events(p))
+    assert len(events) == 5001
+    assert all((e.end_time, e.status) == (1, Status.SUCCESS) for e in events)
+
+    p = Requirements("r", p, Action("fails", duration=0, success_prob=0.0))
+    events = list(iter_events(p))
+    assert len(events) == 5003
+    assert [e.plan.name for e in events[:2]] == ["fails", "a"]
+    assert all((e.end_time, e.status) == (0, Status.FAILURE) for e in events)
+
+def test_replayed_histories(mixed_plan):
+    p = mixed_plan
+    for seed in range(50):
+        history = HistorySampler(rand=Random(seed)).evaluate_plan(p)
+        events = replay_history(history)
+        assert [e.end_time for e in events] == sorted(e.end_time for e in events)
+        assert events[-1].plan == p
+        assert sorted(events) == sorted(history.all_events())
+
+    # the failure which ends r comes after the success tied with it, which the
+    # history keeps
+    p = Requirements("r", Action("fails", duration=0, success_prob=0.0), Action("x", duration=0))
+    events = replay_history(HistorySampler(rand=Random(0)).evaluate_plan(p))
+    assert [(e.plan.name, e.status) for e in events] == [
+        ("x", Status.SUCCESS), ("fails", Status.FAILURE), ("r", Status.FAILURE)
+    ]
@@ -0,0 +1,41 @@
+
+import numpy as np
+
+from plans.plan import Action, Steps, Requirements
+from plans.evaluations.histories import sample_history
+from plans.columnar import ColumnarHistory
+from plans.timelines import Event
+from plans.timelines.timeline import Window, render_rows, density_levels
+from plans.timelines.gantt import render_history
+
+def test_map_times_matches_map_event(): 
+    w = Window(3, 250, 10, 90)
+    events = [Event(s, s + d) for s in range(0, 300, 7) for d in (0, 5, 40)]
+    starts, ends = w.map_times([e.start for e in events], [e.end for e in events])
+    assert [w.map_event(e).start for e in events] == starts.tolist()
+    assert [w.map_event(e).end for e in events] == ends.tolist()
+
+def test_density_levels(): 
+    assert density_levels(np.array([0, 1, 2, 3, 4, 5, 8, 9, 16, 17, 1000])).tolist() == [0, 1, 2, 3, 3, 4, 4, 5, 5, 6, 6]
+
+def test_render_rows(): 
+    rows = render_rows(
+        np.array([0, 2, 2, -5, 8]), 
+        np.array([3, 4, 2, 1, 20]), 
+        np.array([0, 0, 0, 1, 1]), 
+        2, 
+        10
+    )
+    assert rows == ['--+=-     ', '--      --']
+
+def test_render_history(): 
+    p = Steps("s", Action("a", duration=4), Requirements("r", Action("b", duration=2), Action("c", duration=4)))
+    h = sample_history(p, seed=1)
+    rows = render_history(h, width=9)
+    assert rows == [
+        '---------', 
+        '----=----', 
+        '    ===--', 
+    ]
+    assert render_history(ColumnarHistory.from_history(h), width=9) == rows
+    assert render_history(h, width=4, t1=4, t2=7) == ['----', '=---', '===-']
@@ -0,0 +1,46 @@
+
+from random import Random
+
+from plans.timelines import Timeline, Event
+from plans.timelines.intervals import IntervalTree
+
+def random_events(n: int, seed: int = 0): 
+    rand = Random(seed)
+    events = []
+    for i in range(n): 
+        start = rand.randint(0, 1000)
+        events.append(Event(start, start + rand.randint(0, 50), i))
+    return events
+
+def test_tree_matches_linear_scans(): 
+    events = random_events(500)
+    built = IntervalTree(events, seed=1)
+    added = IntervalTree(seed=2)
+    for e in events: 
+        added.add(e)
+    for tree in (built, added): 
+        assert len(tree) == 500
+        assert list(tree) == sorted(events)
+        rand = Random(3)
+        for i in range(200): 
+            t1 = rand.randint(-10, 1060)
+            t2 = t1 + rand.randint(0, 80)
+            assert list(tree.at(t1)) == sorted(e for e in events if e.contains_time(t1))
+            assert list(tree.overlapping(t1, t2)) == sorted(e for e in events if e.overlaps(Event(t1, t2)))
+            assert list(tree.within(t1, t2)) == sorted(e for e in events if Event(t1, t2).contains(e))
+
+def test_empty_tree(): 
+    tree = IntervalTree()
+    assert list(tree) == []
+    assert list(tree.at(0)) == []
+    assert list(tree.within(0, 10)) == []
+
+def test_timeline_queries(): 
+    t = Timeline([Event(0, 10, "a"), Event(5, 7, "b")])
+    t.add_event(Event(8, 20, "c"))
+    t.add_event(Event(1, 2, "d"))
+    assert [e.data for e in t.events] == ["a", "d", "b", "c"]
+    assert [e.data for e in t.events_at(6)] == ["a", "b"]
+    assert [e.data for e in t.events_overlapping(9, 9)] == ["a", "c"]
+    assert [e.data for e in t.events_within(0, 8)] == ["d", "b"]
+    assert len(t) == 4
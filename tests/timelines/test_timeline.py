@@ -9,4 +9,14 @@ def test_timeline_holds_events():
     t.add_event(Event(1, 2))
     assert len(t.events) == 2 
     t.add_event(Event(3, 4)) 
-    assert len(t.events) == 3 
\ No newline at end of file
+    assert len(t.events) == 3
+
+def test_timeline_iterates_in_order(): 
+    t = Timeline([Event(5, 9), Event(1, 2)]) 
+    for e in [Event(3, 4), Event(0, 7), Event(5, 6)]: 
+        t.add_event(e) 
+    assert list(t) == t.events == [Event(0, 7), Event(1, 2), Event(3, 4), Event(5, 6), Event(5, 9)] 
+    assert len(t) == 5 
+    assert t.events is t.events 
+    t.add_event(Event(2, 3)) 
+    assert t.events == [Event(0, 7), Event(1, 2), Event(2, 3), Event(3, 4), Event(5, 6), Event(5, 9)] 
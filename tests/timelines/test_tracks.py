@@ -0,0 +1,60 @@
+
+from random import Random
+
+from plans.timelines import Timeline, Event
+from plans.timelines.timeline import TrackedTimeline, Window
+
+def random_events(n: int, seed: int = 0): 
+    rand = Random(seed)
+    events = []
+    for i in range(n): 
+        start = rand.randint(0, 200)
+        events.append(Event(start, start + rand.randint(0, 20), i))
+    return events
+
+def max_overlap(events): 
+    return max(sum(1 for e in events if e.contains_time(t)) for t in range(0, 250))
+
+def assert_valid_layout(tt: TrackedTimeline): 
+    for track, events in tt.track_events.items(): 
+        for a, b in zip(events, events[1:]): 
+            assert a.end < b.start
+        for e in events: 
+            assert tt.event_tracks[e.data] == track
+    assert sum(len(es) for es in tt.track_events.values()) == len(tt.timeline)
+
+def test_layout_uses_fewest_tracks(): 
+    events = random_events(300)
+    tt = TrackedTimeline(Timeline(events), Window(0, 250, 0, 250))
+    assert_valid_layout(tt)
+    assert tt.tracks == max_overlap(events)
+
+def test_windowed_events_match_map_event(): 
+    events = random_events(300, seed=3)
+    window = Window(0, 250, 0, 97)
+    tt = TrackedTimeline(Timeline(events), window)
+    expected = [window.map_event(e) for e in Timeline(events)]
+    assert [(w.start, w.end) for w in tt.windowed_events] == [(w.start, w.end) for w in expected]
+    assert [w.data for w in tt.windowed_events] == [w.data for w in expected]
+
+def test_in_order_additions_match_full_layout(): 
+    events = sorted(random_events(300, seed=1))
+    window = Window(0, 250, 0, 250)
+    tt = TrackedTimeline(Timeline(), window)
+    for e in events: 
+        tt.add_event(e)
+    assert_valid_layout(tt)
+    assert tt.tracks == TrackedTimeline(Timeline(events), window).tracks
+
+def test_out_of_order_additions_stay_valid(): 
+    events = random_events(300, seed=2)
+    tt = TrackedTimeline(Timeline(), Window(0, 250, 0, 250))
+    for e in events: 
+        tt.add_event(e)
+    assert_valid_layout(tt)
+    assert tt.tracks >= max_overlap(events)
+
+def test_as_string(): 
+    tt = TrackedTimeline(Timeline([Event(0, 2, "a"), Event(1, 3, "b"), Event(5, 6, "c")]), Window(0, 10, 0, 10))
+    assert tt.tracks == 2
+    assert tt.as_string() == ' ---      \n---  --   '